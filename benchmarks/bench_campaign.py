@@ -0,0 +1,176 @@
+"""
+Campaign-scale benchmark of the turn pipeline used by main.py.
+
+Drives `TurnEngine.play()` on a CampaignState for a synthetic campaign,
+fully offline (in-memory local store, hash encoder, scripted LLM), so every
+product stage is measured: waiting for the write-behind pipeline, retrieval,
+context assembly, the LLM call, parsing, local extraction, quest updates and
+the background summarize -> embed -> persist -> flush. Reports per-stage
+p50/p99 latency (from each turn's TurnRecord), the player-visible turn time,
+startup time, RSS and Mongo round-trips per turn. Results are written as
+JSON for comparison with benchmarks/compare.py.
+
+Run from the repo root, e.g.:
+    python -m benchmarks.bench_campaign --turns 100 1000 --npcs 10 100
+    python -m benchmarks.bench_campaign --turns 100000 --npcs 1000 --out results/large.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import (
+    use_offline_environment, StageTimer, summarize_counts,
+    rss_mb, peak_rss_mb, print_stage_table
+)
+
+use_offline_environment()
+
+from memory.local_store import LocalMongoClient  # noqa: E402
+from llm.backends import ScriptedBackend, set_backend  # noqa: E402
+from llm.context_assembler import ContextAssembler  # noqa: E402
+from llm.turn_engine import TurnEngine  # noqa: E402
+from memory.schema import ensure_indexes  # noqa: E402
+from memory.session_manager import CampaignState  # noqa: E402
+from utils.config import MONGO_DB_NAME, SINGLE_CALL_TURNS  # noqa: E402
+from utils.metrics import Metrics  # noqa: E402
+
+ACTIONS = [
+    "look around", "search the ruins", "follow the river north", "rest at the inn",
+    "examine the shard", "ask about the king", "head to the archives", "inspect the altar",
+]
+
+
+def player_inputs(turns, npcs, seed):
+    """Yield a reproducible mix of free actions and 'talk to <npc>' turns."""
+    rng = random.Random(seed)
+    names = [f"Npc {i:04d}" for i in range(npcs)]
+    for _ in range(turns):
+        if rng.random() < 0.5:
+            yield f"talk to {rng.choice(names)}"
+        else:
+            yield rng.choice(ACTIONS)
+
+
+class _RecordCollector:
+    """Metrics exporter that hands every finished TurnRecord to the benchmark."""
+
+    def __init__(self):
+        self.records = []
+
+    def start(self, metrics):
+        pass
+
+    def export_turn(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+
+def open_campaign(client, snapshot_dir):
+    return CampaignState("bench", client=client, snapshot_dir=snapshot_dir)
+
+
+def run_campaign(turns, npcs, seed=0, llm_latency_ms=0.0, single_call=SINGLE_CALL_TURNS, write_behind=True):
+    set_backend(ScriptedBackend(latency_ms=llm_latency_ms))
+    client = LocalMongoClient()
+    ensure_indexes(client[MONGO_DB_NAME])
+    snapshot_dir = tempfile.mkdtemp(prefix="dnd-bench-")
+    timer = StageTimer()
+    collector = _RecordCollector()
+    rss_start = rss_mb()
+
+    try:
+        start = time.perf_counter()
+        campaign = open_campaign(client, snapshot_dir)
+        startup_empty = time.perf_counter() - start
+
+        engine = TurnEngine(
+            campaign, assembler=ContextAssembler(), metrics=Metrics(exporter=collector),
+            write_behind=write_behind, single_call=single_call
+        )
+        for player_input in player_inputs(turns, npcs, seed):
+            t0 = time.perf_counter()
+            engine.play(player_input)
+            timer.add("turn.player_visible", time.perf_counter() - t0)
+        campaign.pipeline.drain()
+
+        for record in collector.records:
+            for name, seconds in record.stages.items():
+                timer.add(name, seconds)
+        values = [record.values for record in collector.records]
+        rss_after = rss_mb()
+
+        # Restart costs against the populated store: snapshot + watermark vs. full reload
+        campaign.close()
+        start = time.perf_counter()
+        open_campaign(client, snapshot_dir).close()
+        startup_snapshot = time.perf_counter() - start
+        empty_dir = tempfile.mkdtemp(prefix="dnd-bench-cold-")
+        try:
+            start = time.perf_counter()
+            open_campaign(client, empty_dir).close()
+            startup_cold = time.perf_counter() - start
+        finally:
+            shutil.rmtree(empty_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    return {
+        "config": {"turns": turns, "npcs": npcs, "seed": seed, "llm_latency_ms": llm_latency_ms,
+                   "single_call": single_call, "write_behind": write_behind},
+        "stages": timer.summary(),
+        "startup_s": {"empty": startup_empty, "cold_reload": startup_cold, "snapshot": startup_snapshot},
+        "rss_mb": {"start": rss_start, "end": rss_after, "peak": peak_rss_mb()},
+        "mongo_round_trips_per_turn": summarize_counts([v.get("mongo_round_trips", 0) for v in values]),
+        "prompt_chars": summarize_counts([v.get("prompt_chars", 0) for v in values]),
+        "response_chars": summarize_counts([v.get("response_chars", 0) for v in values]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--npcs", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Injected scripted-LLM latency per call")
+    parser.add_argument("--single-call", action=argparse.BooleanOptionalAction, default=SINGLE_CALL_TURNS,
+                        help="memory_summary in the DM's JSON instead of a separate summarizer call")
+    parser.add_argument("--inline-writes", action="store_true", help="Persist each turn before play() returns (as the web app does)")
+    parser.add_argument("--out", default=None, help="Write JSON results here (default: benchmarks/results/campaign-<time>.json)")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for turns in args.turns:
+        for npcs in args.npcs:
+            print(f"\n▶ campaign: {turns} turns, {npcs} NPCs")
+            result = run_campaign(turns, npcs, seed=args.seed, llm_latency_ms=args.llm_latency_ms,
+                                  single_call=args.single_call, write_behind=not args.inline_writes)
+            print_stage_table(result["stages"])
+            rt = result["mongo_round_trips_per_turn"]
+            print(f"startup (s): {result['startup_s']}")
+            print(f"RSS (MB): {result['rss_mb']}")
+            print(f"Mongo round-trips/turn: mean {rt['mean']:.2f}, p99 {rt['p99']:.0f}")
+            runs.append(result)
+
+    out = args.out or os.path.join(os.path.dirname(__file__), "results", f"campaign-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "benchmark": "campaign",
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "runs": runs,
+        }, f, indent=2)
+    print(f"\n📄 Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: stored size and load time of embedding encodings.
+
+For each encoding (legacy BSON array, packed float32/float16/int8) builds
+memory-collection documents, then measures the BSON bytes per document and
+the time to decode a batch from raw BSON into a float32 matrix, the work the
+memory loaders do at startup. Also reports the worst cosine error introduced
+by quantization.
+
+Run from the repo root:
+    python -m benchmarks.bench_embedding_storage
+"""
+import sys
+import os
+import time
+
+import bson
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.embedding_codec import encode_embedding, decode_embedding
+
+DIM = 384
+DOCS = 10_000
+SUMMARY = "The party crossed the ruined bridge and met the ferryman, who spoke of the shattered crown."
+ENCODINGS = ["list", "float32", "float16", "int8"]
+
+
+def _encode(vector, encoding):
+    return vector.tolist() if encoding == "list" else encode_embedding(vector, encoding)
+
+
+def bench(encoding, vectors):
+    raw = b"".join(
+        bson.encode({"_id": bson.ObjectId(), "summary": SUMMARY, "embedding": _encode(v, encoding)})
+        for v in vectors
+    )
+    start = time.perf_counter()
+    docs = bson.decode_all(raw)
+    matrix = np.stack([decode_embedding(d["embedding"]) for d in docs])
+    load_s = time.perf_counter() - start
+
+    cosine = np.sum(matrix * vectors, axis=1) / np.linalg.norm(matrix, axis=1)
+    return len(raw) / len(vectors), load_s, float(1 - cosine.min())
+
+
+def main():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((DOCS, DIM)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    print(f"{DOCS} documents, dim {DIM}")
+    print(f"{'encoding':>9} {'bytes/doc':>10} {'load (ms)':>10} {'max cos err':>12}")
+    for encoding in ENCODINGS:
+        size, load_s, err = bench(encoding, vectors)
+        print(f"{encoding:>9} {size:10.0f} {load_s * 1000:10.1f} {err:12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Accuracy and latency of the local interaction extractor
+(memory/interaction_extractor.py) against labelled turns.
+
+Turns come from an LLM recording (RecordReplayBackend JSONL, see
+LLM_RECORD_PATH) or are synthesized with the scripted LLM. Either way the
+labels are the NPC/quest JSON the DM itself emitted (parse_llm_output), and
+the extractor only sees the narrative. As in a campaign, it learns each
+turn's labelled names after the turn is scored. A "Started" label for a quest
+that is already active counts as an update, which is how TurnEngine applies
+it. Reports NPC and quest-name precision/recall, quest event accuracy, how
+often the analyzer would fall back to the LLM, and extraction latency.
+
+Scripted turns are templated, so they mostly check the plumbing; score a
+recording of real Gemini turns for representative numbers.
+
+Run from the repo root, e.g.:
+    python -m benchmarks.bench_interaction_extractor --turns 2000
+    python -m benchmarks.bench_interaction_extractor --recordings storage/llm_recordings.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from benchmarks.harness import use_offline_environment, summarize_ms
+
+use_offline_environment()
+
+from llm.backends import ScriptedBackend  # noqa: E402
+from llm.prompt_builder import build_prompt  # noqa: E402
+from memory.interaction_extractor import InteractionExtractor  # noqa: E402
+from memory.npc_and_quest_parser import parse_llm_output  # noqa: E402
+from utils.config import LOCAL_EXTRACTOR_MIN_CONFIDENCE, MODEL_NAME  # noqa: E402
+
+ACTIONS = ["look around", "search the ruins", "follow the river north", "ask about the king", "inspect the altar"]
+EVENTS = {"Started": "started", "In Progress": "updated", "Completed": "completed"}
+
+
+def recorded_turns(path):
+    """(player_input, dm_response) for every DM turn in a recording; the prompt is not recorded."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                response = json.loads(line)["response"]
+                if '"npcs"' in response:
+                    yield "", response
+
+
+def scripted_turns(turns, seed):
+    rng = random.Random(seed)
+    backend = ScriptedBackend()
+    for i in range(turns):
+        if rng.random() < 0.4:
+            player_input = f"talk to {rng.choice(ScriptedBackend.NPCS).lower()}"
+        else:
+            player_input = f"{rng.choice(ACTIONS)} ({i})"
+        yield player_input, backend.generate(build_prompt("", "", player_input), MODEL_NAME)
+
+
+def _ratio(a, b):
+    return a / b if b else None
+
+
+def run(turns, min_confidence):
+    extractor = InteractionExtractor()
+    active = set()
+    counts = dict.fromkeys(["npc_tp", "npc_fp", "npc_fn", "quest_tp", "quest_fp", "quest_fn", "event_ok", "fallbacks"], 0)
+    latencies = []
+
+    for player_input, response in turns:
+        dm_text, npcs, quests, _ = parse_llm_output(response, include_summary=True)
+        want_npcs = {n["npc_name"].lower() for n in npcs if n.get("npc_name")}
+        want_quests = {}
+        for q in quests:
+            event = EVENTS.get(q["progress"], "started")
+            if event == "started" and q["quest_name"] in active:
+                event = "updated"
+            want_quests[q["quest_name"].lower()] = event
+
+        start = time.perf_counter()
+        data, confidence = extractor.extract(player_input, dm_text)
+        latencies.append(time.perf_counter() - start)
+
+        got_npcs = {n.lower() for n in data["npcs"]}
+        got_quests = {q["quest_name"].lower(): q["event_type"] for q in data["quests"]}
+        counts["npc_tp"] += len(got_npcs & want_npcs)
+        counts["npc_fp"] += len(got_npcs - want_npcs)
+        counts["npc_fn"] += len(want_npcs - got_npcs)
+        counts["quest_tp"] += len(got_quests.keys() & want_quests.keys())
+        counts["quest_fp"] += len(got_quests.keys() - want_quests.keys())
+        counts["quest_fn"] += len(want_quests.keys() - got_quests.keys())
+        counts["event_ok"] += sum(got_quests[q] == want_quests[q] for q in got_quests.keys() & want_quests.keys())
+        counts["fallbacks"] += confidence < min_confidence
+
+        # What the campaign's stores would know after this turn is persisted
+        for n in npcs:
+            if n.get("npc_name"):
+                extractor.add_npc(n["npc_name"])
+        for q in quests:
+            extractor.add_quest(q["quest_name"], q.get("mandatory", False), active=q["progress"] != "Completed")
+            (active.discard if q["progress"] == "Completed" else active.add)(q["quest_name"])
+
+    c = counts
+    npc_p, npc_r = _ratio(c["npc_tp"], c["npc_tp"] + c["npc_fp"]), _ratio(c["npc_tp"], c["npc_tp"] + c["npc_fn"])
+    return {
+        "turns": len(latencies),
+        "min_confidence": min_confidence,
+        "npc_precision": npc_p,
+        "npc_recall": npc_r,
+        "npc_f1": _ratio(2 * npc_p * npc_r, npc_p + npc_r) if npc_p and npc_r else None,
+        "quest_precision": _ratio(c["quest_tp"], c["quest_tp"] + c["quest_fp"]),
+        "quest_recall": _ratio(c["quest_tp"], c["quest_tp"] + c["quest_fn"]),
+        "quest_event_accuracy": _ratio(c["event_ok"], c["quest_tp"]),
+        "llm_fallback_rate": _ratio(c["fallbacks"], len(latencies)),
+        "latency": summarize_ms(latencies),
+        "counts": counts,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recordings", default=None, help="RecordReplayBackend JSONL to score against")
+    parser.add_argument("--turns", type=int, default=1000, help="Synthesized turns (without --recordings)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-confidence", type=float, default=LOCAL_EXTRACTOR_MIN_CONFIDENCE)
+    parser.add_argument("--out", default=None, help="Also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    turns = recorded_turns(args.recordings) if args.recordings else scripted_turns(args.turns, args.seed)
+    r = run(turns, args.min_confidence)
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    print(f"{r['turns']} turns ({'recorded' if args.recordings else 'scripted'})")
+    print(f"NPCs    precision {fmt(r['npc_precision'])}  recall {fmt(r['npc_recall'])}  F1 {fmt(r['npc_f1'])}")
+    print(f"Quests  precision {fmt(r['quest_precision'])}  recall {fmt(r['quest_recall'])}  "
+          f"event accuracy {fmt(r['quest_event_accuracy'])}")
+    print(f"LLM fallback rate at confidence < {args.min_confidence}: {fmt(r['llm_fallback_rate'])}")
+    lat = r["latency"]
+    if lat["count"]:
+        print(f"Local extraction  p50 {lat['p50_ms']:.3f} ms  p99 {lat['p99_ms']:.3f} ms  max {lat['max_ms']:.3f} ms")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"benchmark": "interaction_extractor", "timestamp": time.time(), **r}, f, indent=2)
+        print(f"\n📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+The Gemini client layer against a fake Gemini server with injected latency
+and errors (benchmarks/fake_gemini_server.py).
+
+The same workload is sent through the bare REST client, through
+ResilientBackend (deadlines + jittered retries), and through
+ResilientBackend with hedging. For each it reports the success rate, call
+latency p50/p95/p99/max, and retries, hedges and timeouts. Streams go
+through the resilient client too, measuring time to the first chunk.
+
+Run from the repo root, e.g.:
+    python -m benchmarks.bench_llm_client
+    python -m benchmarks.bench_llm_client --calls 400 --error-rate 0.2 --slow-rate 0.1 --hang-rate 0.01
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.harness import use_offline_environment
+
+use_offline_environment()
+
+from benchmarks.fake_gemini_server import FakeGeminiServer  # noqa: E402
+from llm.backends import GeminiRestBackend, ResilientBackend  # noqa: E402
+from utils.config import MODEL_NAME  # noqa: E402
+
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def run_client(name, backend, calls, concurrency, stream=False):
+    latencies, errors = [], {}
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            if stream:
+                chunks = backend.stream(f"turn {i}", MODEL_NAME)
+                next(chunks)
+                latency = time.perf_counter() - start
+                for _ in chunks:
+                    pass
+            else:
+                backend.generate(f"turn {i}", MODEL_NAME)
+                latency = time.perf_counter() - start
+            latencies.append(latency)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(calls)))
+    return {
+        "client": name,
+        "success_rate": len(latencies) / calls,
+        "latency": _percentiles(latencies),
+        "errors": errors,
+        "stats": getattr(backend, "stats", {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--hang-rate", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--attempt-timeout-s", type=float, default=3.0)
+    parser.add_argument("--deadline-s", type=float, default=10.0)
+    parser.add_argument("--requests-per-minute", type=float, default=0.0, help="Client token bucket (0 = unlimited)")
+    parser.add_argument("--out", default=None, help="Also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    server = FakeGeminiServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms,
+        hang_rate=args.hang_rate, error_rate=args.error_rate
+    )
+    endpoint = server.start()
+
+    def resilient(hedge):
+        # Warm up the latency window so hedging is active from the first measured call
+        backend = ResilientBackend(
+            GeminiRestBackend(api_key="bench", endpoint=endpoint, timeout=args.attempt_timeout_s),
+            deadline_s=args.deadline_s, attempt_timeout_s=args.attempt_timeout_s,
+            requests_per_minute=args.requests_per_minute, hedge=hedge, max_concurrency=4 * args.concurrency
+        )
+        for _ in range(backend.hedge_min_samples):
+            backend.latency.observe((args.latency_ms + args.jitter_ms) / 1000)
+        return backend
+
+    print(f"fake server: {args.latency_ms:.0f} ms (+{args.jitter_ms:.0f} ms jitter), {args.slow_rate:.0%} slow "
+          f"({args.slow_ms:.0f} ms), {args.hang_rate:.1%} hang, {args.error_rate:.0%} errors; "
+          f"{args.calls} calls, {args.concurrency} at a time")
+    print(f"{'client':<24} {'success':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'retries':>8} {'hedges':>7} {'timeouts':>9}")
+
+    clients = [
+        ("bare", GeminiRestBackend(api_key="bench", endpoint=endpoint, timeout=args.deadline_s), False),
+        ("retry", resilient(hedge=False), False),
+        ("retry+hedge", resilient(hedge=True), False),
+        ("retry (stream, 1st chunk)", resilient(hedge=False), True),
+    ]
+    results = []
+    try:
+        for name, backend, stream in clients:
+            r = run_client(name, backend, args.calls, args.concurrency, stream=stream)
+            lat, stats = r["latency"], r["stats"]
+            cols = " ".join(f"{lat[k]:8.1f}" if lat["count"] else f"{'-':>8}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+            print(f"{name:<24} {r['success_rate']:8.1%} {cols} {stats.get('retries', '-'):>8} "
+                  f"{stats.get('hedges', '-'):>7} {stats.get('timeouts', '-'):>9}")
+            results.append(r)
+            if isinstance(backend, ResilientBackend):
+                backend.close()
+    finally:
+        server.stop()
+    print(f"server saw: {dict(server.counts)}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"benchmark": "llm_client", "timestamp": time.time(), "config": vars(args), "runs": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
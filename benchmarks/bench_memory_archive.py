@@ -0,0 +1,123 @@
+"""
+Benchmark: long-term memory archive (IVF-PQ) vs. exact search.
+
+Builds an ArchiveIndex over a synthetic, clustered history of unit vectors
+(campaign memories are topical, not uniform noise) and reports, per history
+size: build time, index bytes per memory, recall@k of the approximate
+candidates after exact re-ranking (what PersistentMemory returns) and of the
+raw approximate scores, and query latency against a brute-force exact scan.
+The exact re-rank runs on in-memory vectors here; in the game it adds one
+`_id $in` Mongo read per turn.
+
+Run from the repo root:
+    python -m benchmarks.bench_memory_archive                  # 10k, 100k, 1M
+    python -m benchmarks.bench_memory_archive --sizes 10000 --queries 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.harness import summarize_ms  # noqa: E402
+from memory.archive_index import ArchiveIndex  # noqa: E402
+from utils.config import ARCHIVE_RERANK_FACTOR  # noqa: E402
+
+DIM = 384
+MEMORIES_PER_TOPIC = 100
+BATCH = 10_000
+
+
+def synthetic_history(n, rng):
+    """`n` unit vectors scattered around n / MEMORIES_PER_TOPIC topic centres."""
+    topics = max(1, n // MEMORIES_PER_TOPIC)
+    centres = rng.standard_normal((topics, DIM)).astype("float32")
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    vectors = np.empty((n, DIM), dtype="float32")
+    for start in range(0, n, BATCH):
+        stop = min(start + BATCH, n)
+        noise = rng.standard_normal((stop - start, DIM)).astype("float32") * 0.04
+        chunk = centres[rng.integers(0, topics, stop - start)] + noise
+        vectors[start:stop] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors, query, k):
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def bench(n, queries, top_k, rng):
+    vectors = synthetic_history(n, rng)
+
+    def source(after=None):
+        # Big-endian 12-byte counters sort like ObjectIds
+        for start in range(0, n, BATCH):
+            stop = min(start + BATCH, n)
+            yield [i.to_bytes(12, "big") for i in range(start, stop)], vectors[start:stop]
+
+    archive = ArchiveIndex(source=source)
+    start = time.perf_counter()
+    archive.rebuild()
+    build_s = time.perf_counter() - start
+
+    picks = rng.integers(0, n, queries)
+    noise = rng.standard_normal((queries, DIM)).astype("float32") * 0.03
+    query_vectors = vectors[picks] + noise
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    exact_s, approx_s = [], []
+    recall_reranked, recall_raw = [], []
+    for query in query_vectors:
+        t0 = time.perf_counter()
+        truth = exact_top_k(vectors, query, top_k)
+        exact_s.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        candidates = archive.search(query, top_k * ARCHIVE_RERANK_FACTOR)
+        rows = np.array([int.from_bytes(key, "big") for key, _ in candidates])
+        reranked = rows[np.argsort(-(vectors[rows] @ query))[:top_k]]
+        approx_s.append(time.perf_counter() - t0)
+
+        truth = set(truth.tolist())
+        recall_reranked.append(len(truth & set(reranked.tolist())) / top_k)
+        recall_raw.append(len(truth & set(rows[:top_k].tolist())) / top_k)
+
+    code_bytes = archive._index.code_size + 12  # PQ code + key
+    archive.close()
+    return {
+        "memories": n,
+        "build_s": build_s,
+        "bytes_per_memory": {"archive": code_bytes, "exact": DIM * 4},
+        f"recall@{top_k}": {"reranked": float(np.mean(recall_reranked)), "raw": float(np.mean(recall_raw))},
+        "latency": {"exact": summarize_ms(exact_s), "archive": summarize_ms(approx_s)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'memories':>9} {'build s':>8} {'B/mem':>6} {'recall':>7} {'raw':>6} "
+          f"{'exact p50':>10} {'exact p99':>10} {'ann p50':>8} {'ann p99':>8}")
+    for n in args.sizes:
+        r = bench(n, args.queries, args.top_k, rng)
+        recall = r[f"recall@{args.top_k}"]
+        lat = r["latency"]
+        print(f"{n:>9} {r['build_s']:8.1f} {r['bytes_per_memory']['archive']:6d} "
+              f"{recall['reranked']:7.3f} {recall['raw']:6.3f} "
+              f"{lat['exact']['p50_ms']:10.2f} {lat['exact']['p99_ms']:10.2f} "
+              f"{lat['archive']['p50_ms']:8.2f} {lat['archive']['p99_ms']:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: per-insert cost of the PersistentMemory vector window.
+
+Compares the RingVectorIndex insert against the previous approach (rebuild a
+matrix from every cached entry, reset the FAISS index and re-add it all) as
+the window capacity grows.
+
+Run from the repo root:
+    python -m benchmarks.bench_persistent_insert
+"""
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from memory.vector_store import RingVectorIndex
+
+DIM = 384
+CAPACITIES = [500, 5_000, 20_000, 100_000]
+RING_INSERTS = 2_000
+REBUILD_INSERTS = 5
+
+
+def _random_unit_vectors(n, dim, rng):
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_ring(capacity, rng):
+    index = RingVectorIndex(capacity, DIM)
+    for v in _random_unit_vectors(capacity, DIM, rng):
+        index.add(v, "filler")
+
+    batch = _random_unit_vectors(RING_INSERTS, DIM, rng)
+    start = time.perf_counter()
+    for v in batch:
+        index.add(v, "new")
+    return (time.perf_counter() - start) / RING_INSERTS
+
+
+def bench_rebuild(capacity, rng):
+    import faiss
+
+    cache = [{"summary": "filler", "embedding": v.tolist()} for v in _random_unit_vectors(capacity, DIM, rng)]
+    index = faiss.IndexFlatIP(DIM)
+
+    batch = _random_unit_vectors(REBUILD_INSERTS, DIM, rng)
+    start = time.perf_counter()
+    for v in batch:
+        cache.append({"summary": "new", "embedding": v.tolist()})
+        cache.pop(0)
+        vectors = np.array([d["embedding"] for d in cache], dtype="float32")
+        index.reset()
+        index.add(vectors)
+    return (time.perf_counter() - start) / REBUILD_INSERTS
+
+
+def main():
+    rng = np.random.default_rng(0)
+    try:
+        import faiss  # noqa: F401
+        has_faiss = True
+    except ImportError:
+        has_faiss = False
+
+    print(f"{'capacity':>10} | {'ring insert (us)':>17} | {'full rebuild (us)':>18}")
+    print("-" * 52)
+    for capacity in CAPACITIES:
+        ring_us = bench_ring(capacity, rng) * 1e6
+        rebuild = f"{bench_rebuild(capacity, rng) * 1e6:18.1f}" if has_faiss else f"{'n/a (no faiss)':>18}"
+        print(f"{capacity:>10} | {ring_us:17.2f} | {rebuild}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Load test of the asyncio game server (interface/server.py).
+
+Starts the server in-process on an ephemeral port, fully offline (in-memory
+local store, hash encoder, scripted LLM with injected latency), then drives
+N concurrent player sessions, each in its own campaign. Every session is a
+closed loop: it sends a turn, waits for the DM, and sends the next one.
+Sessions that get 429/503 honour Retry-After and try again. For each session
+count it reports turns/sec, turn latency p50/p95/p99 (and time to first
+narrative chunk over WebSocket), and how many turns were rejected.
+
+The load generator shares the process (and GIL) with the server, so absolute
+numbers are a lower bound; compare runs with the same settings.
+
+Run from the repo root, e.g.:
+    python -m benchmarks.bench_server                                   # 1, 10, 100 sessions over HTTP
+    python -m benchmarks.bench_server --transport ws --llm-latency-ms 500 --chunk-latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.harness import use_offline_environment
+
+use_offline_environment()
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from interface.server import GameServer  # noqa: E402
+from llm.backends import ScriptedBackend, set_backend  # noqa: E402
+from memory.local_store import LocalMongoClient  # noqa: E402
+from memory.schema import ensure_indexes  # noqa: E402
+from memory.session_manager import SessionManager  # noqa: E402
+from memory.storage import set_client  # noqa: E402
+from utils.config import MONGO_DB_NAME, SERVER_WORKERS  # noqa: E402
+from utils.metrics import Metrics  # noqa: E402
+
+ACTIONS = ["look around", "talk to Elder Mira", "search the ruins", "ask about the king", "inspect the altar"]
+
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+async def _http_session(http, base, campaign_id, turns, stats):
+    url = f"{base}/campaigns/{campaign_id}/turns"
+    for i in range(turns):
+        payload = {"input": f"{ACTIONS[i % len(ACTIONS)]} ({i})"}
+        start = time.perf_counter()
+        while True:
+            async with http.post(url, json=payload) as resp:
+                if resp.status in (429, 503):
+                    stats["rejected"] += 1
+                    await asyncio.sleep(float(resp.headers.get("Retry-After", "1")))
+                    continue
+                resp.raise_for_status()
+                await resp.read()
+                break
+        stats["latency"].append(time.perf_counter() - start)
+
+
+async def _ws_session(http, base, campaign_id, turns, stats):
+    async with http.ws_connect(f"{base}/campaigns/{campaign_id}/ws") as ws:
+        for i in range(turns):
+            payload = {"input": f"{ACTIONS[i % len(ACTIONS)]} ({i})"}
+            start = time.perf_counter()
+            first_chunk = None
+            await ws.send_json(payload)
+            while True:
+                msg = json.loads((await ws.receive()).data)
+                if msg["type"] == "chunk" and first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                elif msg["type"] == "error" and msg["status"] in (429, 503):
+                    stats["rejected"] += 1
+                    await asyncio.sleep(1)
+                    await ws.send_json(payload)
+                elif msg["type"] == "error":
+                    raise RuntimeError(msg["error"])
+                elif msg["type"] == "turn":
+                    break
+            stats["latency"].append(time.perf_counter() - start)
+            if first_chunk is not None:
+                stats["first_chunk"].append(first_chunk)
+
+
+async def run_load(sessions, turns, transport, workers, snapshot_dir):
+    manager = SessionManager(max_campaigns=max(sessions, 1), snapshot_dir=snapshot_dir)
+    server = GameServer(manager=manager, workers=workers, metrics=Metrics())
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    stats = {"latency": [], "first_chunk": [], "rejected": 0}
+    session_fn = _ws_session if transport == "ws" else _http_session
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=None)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            # Load every campaign first so the run measures turns, not cold starts
+            async def load(campaign_id):
+                async with http.get(f"{base}/campaigns/{campaign_id}/quests") as resp:
+                    resp.raise_for_status()
+
+            await asyncio.gather(*(load(f"load-{s:03d}") for s in range(sessions)))
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                session_fn(http, base, f"load-{s:03d}", turns, stats) for s in range(sessions)
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+    return {
+        "sessions": sessions,
+        "transport": transport,
+        "turns": len(stats["latency"]),
+        "elapsed_s": elapsed,
+        "turns_per_s": len(stats["latency"]) / elapsed,
+        "latency": _percentiles(stats["latency"]),
+        "first_chunk": _percentiles(stats["first_chunk"]),
+        "rejected": stats["rejected"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session")
+    parser.add_argument("--transport", choices=["http", "ws"], default="http")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Scripted LLM latency per call")
+    parser.add_argument("--chunk-latency-ms", type=float, default=0.0, help="Scripted LLM delay between streamed chunks")
+    parser.add_argument("--out", default=None, help="Also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    set_backend(ScriptedBackend(latency_ms=args.llm_latency_ms, chunk_latency_ms=args.chunk_latency_ms))
+    print(f"transport {args.transport}, {args.workers} workers, {args.turns} turns/session, "
+          f"LLM latency {args.llm_latency_ms:.0f} ms")
+    print(f"{'sessions':>8} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'1st chunk p50':>14} {'rejected':>9}")
+
+    results = []
+    for sessions in args.sessions:
+        client = LocalMongoClient()
+        ensure_indexes(client[MONGO_DB_NAME])
+        set_client(client)
+        snapshot_dir = tempfile.mkdtemp(prefix="dnd-server-bench-")
+        try:
+            r = asyncio.run(run_load(sessions, args.turns, args.transport, args.workers, snapshot_dir))
+        finally:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+        lat, first = r["latency"], r["first_chunk"]
+        first_p50 = f"{first['p50_ms']:14.1f}" if first["count"] else f"{'-':>14}"
+        print(f"{sessions:>8} {r['turns_per_s']:8.1f} {lat['p50_ms']:8.1f} {lat['p95_ms']:8.1f} "
+              f"{lat['p99_ms']:8.1f} {first_p50} {r['rejected']:>9}")
+        results.append(r)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"benchmark": "server", "timestamp": time.time(), "runs": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare two benchmark result files and flag per-stage latency regressions.
+
+    python -m benchmarks.compare old.json new.json [--threshold 20]
+
+Exits with status 1 if any stage's p50 or p99 got slower by more than
+`--threshold` percent.
+"""
+import argparse
+import json
+import sys
+
+
+def _runs_by_key(results):
+    return {(r["config"]["turns"], r["config"]["npcs"]): r for r in results["runs"]}
+
+
+def _change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = _runs_by_key(json.load(f))
+    with open(args.candidate) as f:
+        candidate = _runs_by_key(json.load(f))
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old_stages = baseline[key]["stages"]
+        new_stages = candidate[key]["stages"]
+        print(f"\n▶ {key[0]} turns, {key[1]} NPCs")
+        print(f"{'stage':<28} {'p50 old':>9} {'p50 new':>9} {'Δ%':>7} {'p99 old':>9} {'p99 new':>9} {'Δ%':>7}")
+        for name in sorted(old_stages.keys() & new_stages.keys()):
+            old, new = old_stages[name], new_stages[name]
+            if not old.get("count") or not new.get("count"):
+                continue
+            d50 = _change(old["p50_ms"], new["p50_ms"])
+            d99 = _change(old["p99_ms"], new["p99_ms"])
+            flag = ""
+            if d50 > args.threshold or d99 > args.threshold:
+                flag = "  ⚠️ regression"
+                regressions += 1
+            print(f"{name:<28} {old['p50_ms']:>9.3f} {new['p50_ms']:>9.3f} {d50:>+7.1f} "
+                  f"{old['p99_ms']:>9.3f} {new['p99_ms']:>9.3f} {d99:>+7.1f}{flag}")
+
+        old_rt = baseline[key]["mongo_round_trips_per_turn"]["mean"]
+        new_rt = candidate[key]["mongo_round_trips_per_turn"]["mean"]
+        print(f"Mongo round-trips/turn: {old_rt:.2f} -> {new_rt:.2f}")
+
+    if regressions:
+        print(f"\n❌ {regressions} stage(s) regressed by more than {args.threshold:.0f}%")
+        sys.exit(1)
+    print("\n✅ No regressions above threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Local stand-in for the Gemini REST API that injects latency and errors, for
+exercising the LLM client layer (ResilientBackend in llm/backends.py)
+without a network or API quota.
+
+    POST /v1beta/models/{model}:generateContent
+    POST /v1beta/models/{model}:streamGenerateContent?alt=sse
+
+Every request first sleeps `latency_ms` plus exponential jitter; a
+`slow_rate` fraction sleeps `slow_ms` instead (the tail that hedging is
+for) and a `hang_rate` fraction never answers in time. An `error_rate`
+fraction fails with a status drawn from `error_statuses` (429 carries
+Retry-After). With `requests_per_minute`, each API key is held to that rate
+and gets 429 beyond it. The reply echoes the prompt; streams send it in
+chunks `chunk_latency_ms` apart.
+
+Run standalone and point the game at it:
+    python -m benchmarks.fake_gemini_server --port 8089 --error-rate 0.1 --slow-rate 0.05
+    LLM_BACKEND=gemini-rest GEMINI_API_ENDPOINT=http://127.0.0.1:8089 python main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+from collections import Counter
+
+from aiohttp import web
+
+from llm.resilience import TokenBucket
+
+
+class FakeGeminiServer:
+    def __init__(self, latency_ms=50.0, jitter_ms=10.0, slow_rate=0.0, slow_ms=2000.0, hang_rate=0.0,
+                 error_rate=0.0, error_statuses=(429, 500, 503), requests_per_minute=0.0,
+                 chunk_latency_ms=5.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.hang_rate = hang_rate
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.requests_per_minute = requests_per_minute
+        self.chunk_latency_ms = chunk_latency_ms
+        self.counts = Counter()
+        self._rng = random.Random(seed)
+        self._buckets = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([web.post("/v1beta/models/{call}", self.handle)])
+        return app
+
+    async def handle(self, request):
+        model, _, method = request.match_info["call"].partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            raise web.HTTPNotFound()
+        self.counts["requests"] += 1
+        body = await request.json()
+        prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+
+        key = request.headers.get("x-goog-api-key") or request.query.get("key", "")
+        if self.requests_per_minute:
+            bucket = self._buckets.setdefault(key, TokenBucket(self.requests_per_minute / 60, 1))
+            if not bucket.try_acquire():
+                self.counts["quota_429"] += 1
+                return self._error(429, "Quota exceeded")
+
+        roll = self._rng.random()
+        if roll < self.hang_rate:
+            self.counts["hangs"] += 1
+            await asyncio.sleep(3600)
+        elif roll < self.hang_rate + self.slow_rate:
+            self.counts["slow"] += 1
+            await asyncio.sleep(self.slow_ms / 1000)
+        else:
+            jitter = self._rng.expovariate(1 / self.jitter_ms) if self.jitter_ms else 0.0
+            await asyncio.sleep((self.latency_ms + jitter) / 1000)
+
+        if self._rng.random() < self.error_rate:
+            status = self._rng.choice(self.error_statuses)
+            self.counts[f"error_{status}"] += 1
+            return self._error(status, "Injected failure")
+
+        text = f"[{model}] You said: {prompt[-200:]}"
+        if method == "generateContent":
+            self.counts["ok"] += 1
+            return web.json_response(self._payload(text))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(0, len(text), 24):
+            if self.chunk_latency_ms:
+                await asyncio.sleep(self.chunk_latency_ms / 1000)
+            await response.write(f"data: {json.dumps(self._payload(text[i:i + 24]))}\r\n\r\n".encode())
+        await response.write_eof()
+        self.counts["ok"] += 1
+        return response
+
+    @staticmethod
+    def _payload(text):
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+    @staticmethod
+    def _error(status, message):
+        headers = {"Retry-After": "0.2"} if status == 429 else None
+        return web.json_response({"error": {"code": status, "message": message}}, status=status, headers=headers)
+
+    # --- in-process use (benchmarks) ---
+    def start(self, host="127.0.0.1", port=0):
+        """Serve on a background thread; returns the base URL."""
+        ready = threading.Event()
+        address = {}
+
+        async def serve():
+            self._runner = web.AppRunner(self.app(), shutdown_timeout=1.0)  # don't wait out hung requests
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, host, port)
+            await site.start()
+            address["port"] = site._server.sockets[0].getsockname()[1]
+            ready.set()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(serve(), self._loop)
+        ready.wait(10)
+        return f"http://{host}:{address['port']}"
+
+    def stop(self):
+        if self._loop is None:
+            return
+        async def shutdown():
+            await self._runner.cleanup()
+            # Hung requests are still sleeping; cancel them rather than leave them pending
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
+        self._loop = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--requests-per-minute", type=float, default=0.0)
+    parser.add_argument("--chunk-latency-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    server = FakeGeminiServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms,
+        hang_rate=args.hang_rate, error_rate=args.error_rate, error_statuses=args.error_statuses,
+        requests_per_minute=args.requests_per_minute, chunk_latency_ms=args.chunk_latency_ms
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
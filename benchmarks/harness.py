@@ -0,0 +1,101 @@
+"""
+Shared helpers for the benchmark suite: stage timers, percentiles, memory
+usage and an offline environment (local Mongo stand-in, hash encoder,
+scripted LLM) for driving the real turn pipeline.
+"""
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+
+def use_offline_environment():
+    """
+    Point the game at model-free, network-free backends. Must run before any
+    `memory.*` / `llm.*` import, since those read the config at import time.
+    """
+    os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+    os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+    os.environ.setdefault("LLM_BACKEND", "scripted")
+
+
+class StageTimer:
+    """Collects wall-clock samples per named stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def summary(self):
+        return {name: summarize_ms(values) for name, values in self.samples.items()}
+
+
+def summarize_ms(seconds):
+    """p50/p99/mean/max in milliseconds for a list of durations in seconds."""
+    values = np.asarray(seconds, dtype="float64") * 1000
+    if values.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(values.size),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values.max()),
+    }
+
+
+def summarize_counts(values):
+    values = np.asarray(values, dtype="float64")
+    if values.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def rss_mb():
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_stage_table(stages):
+    print(f"{'stage':<28} {'count':>7} {'p50 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}")
+    print("-" * 69)
+    for name, s in stages.items():
+        if s.get("count"):
+            print(f"{name:<28} {s['count']:>7} {s['p50_ms']:>10.3f} {s['p99_ms']:>10.3f} {s['max_ms']:>10.3f}")
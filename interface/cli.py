@@ -13,3 +13,15 @@ def display_output(text: str):
     Display the DM's response.
     """
     print(f"{COLOR_DM}{text}{COLOR_RESET}")
+
+def display_stream(chunks) -> str:
+    """
+    Display the DM's response as it streams in. Returns the full text shown.
+    """
+    shown = []
+    print(COLOR_DM, end="", flush=True)
+    for chunk in chunks:
+        print(chunk, end="", flush=True)
+        shown.append(chunk)
+    print(COLOR_RESET)
+    return "".join(shown)
@@ -0,0 +1,256 @@
+"""
+Asyncio HTTP/WebSocket game server: many players, one process.
+
+    POST /campaigns/{campaign_id}/turns    {"input": "..."} -> turn result (JSON)
+    GET  /campaigns/{campaign_id}/ws       WebSocket: send {"input": "..."}, receive
+                                           {"type": "chunk", "text": ...} while the DM
+                                           narrates, then {"type": "turn", ...}
+    GET  /campaigns/{campaign_id}/quests   active quests
+    GET  /healthz                          load and admission counters
+    GET  /metrics                          turn metrics (Prometheus text format)
+
+Each turn runs the shared TurnEngine for its campaign (memory/session_manager.py
+keeps hot campaigns loaded). The storage client and LLM SDK are blocking, so
+turns run on a bounded worker pool and the event loop only awaits them; it
+keeps accepting requests and streaming other players' output meanwhile.
+
+Admission control, checked before any work is queued:
+- per campaign, at most SERVER_CAMPAIGN_MAX_PENDING turns may be running or
+  waiting (turns of one campaign always run one at a time); more -> 429;
+- across the process, at most SERVER_MAX_PENDING_TURNS -> 503.
+Both carry Retry-After. On the WebSocket, narrative chunks pass through a
+bounded queue: a client that reads slowly stalls its own LLM stream, not the
+server. When sending fails or the client stalls for SERVER_STREAM_STALL_S,
+the rest of the narrative is dropped instead of queued; the turn still
+finishes and is persisted, so the campaign's lock and slots are freed.
+
+    python -m interface.server --port 8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web, WSMsgType
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm.context_assembler import ContextAssembler  # noqa: E402
+from llm.turn_engine import TurnEngine  # noqa: E402
+from memory.session_manager import SessionManager  # noqa: E402
+from memory.storage import check_campaign_id  # noqa: E402
+from utils.config import (  # noqa: E402
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_MAX_PENDING_TURNS,
+    SERVER_CAMPAIGN_MAX_PENDING, SERVER_STREAM_BUFFER, SERVER_STREAM_STALL_S
+)
+from utils.metrics import get_metrics  # noqa: E402
+
+_DONE = object()
+
+
+class GameServer:
+    def __init__(self, manager=None, workers=SERVER_WORKERS, max_pending=SERVER_MAX_PENDING_TURNS,
+                 campaign_max_pending=SERVER_CAMPAIGN_MAX_PENDING, metrics=None):
+        self.manager = manager or SessionManager()
+        self.metrics = metrics or get_metrics()
+        self.assembler = ContextAssembler()
+        self.max_pending = max_pending
+        self.campaign_max_pending = campaign_max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn-worker")
+
+        # Only touched from the event loop thread, so no locking
+        self.pending = 0
+        self._campaign_pending = defaultdict(int)
+        self.rejected = {"campaign": 0, "server": 0}
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/campaigns/{campaign_id}/turns", self.handle_turn),
+            web.get("/campaigns/{campaign_id}/ws", self.handle_ws),
+            web.get("/campaigns/{campaign_id}/quests", self.handle_quests),
+            web.get("/healthz", self.handle_health),
+            web.get("/metrics", self.handle_metrics),
+        ])
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    # --- admission ---
+    def _admit(self, campaign_id):
+        """Reserve a slot for one turn or raise 429/503."""
+        if self._campaign_pending[campaign_id] >= self.campaign_max_pending:
+            self.rejected["campaign"] += 1
+            raise web.HTTPTooManyRequests(
+                text=f"Campaign '{campaign_id}' already has {self.campaign_max_pending} turns queued",
+                headers={"Retry-After": "1"}
+            )
+        if self.pending >= self.max_pending:
+            self.rejected["server"] += 1
+            raise web.HTTPServiceUnavailable(text="Server is at capacity", headers={"Retry-After": "1"})
+        self._campaign_pending[campaign_id] += 1
+        self.pending += 1
+
+    def _release(self, campaign_id):
+        self.pending -= 1
+        self._campaign_pending[campaign_id] -= 1
+        if not self._campaign_pending[campaign_id]:
+            del self._campaign_pending[campaign_id]
+
+    @staticmethod
+    def _campaign_id(request):
+        try:
+            return check_campaign_id(request.match_info["campaign_id"])
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+    # --- turns (worker threads) ---
+    def _play(self, campaign_id, player_input, render=None):
+        """Run one turn; blocks, so it is only called on the worker pool."""
+        with self.manager.session(campaign_id) as campaign, campaign.lock:
+            events = []
+            engine = TurnEngine(campaign, assembler=self.assembler, metrics=self.metrics)
+            turn = engine.play(player_input, render=render, notify=events.append)
+        return {
+            "campaign_id": campaign_id,
+            "dm_text": turn.dm_text,
+            "npcs": [{"npc_name": name, "context": context} for name, context in turn.interactions],
+            "quests": turn.quests,
+            "events": events,
+        }
+
+    async def _run_turn(self, campaign_id, player_input, render=None):
+        self._admit(campaign_id)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, self._play, campaign_id, player_input, render)
+        finally:
+            self._release(campaign_id)
+
+    # --- handlers ---
+    async def handle_turn(self, request):
+        campaign_id = self._campaign_id(request)
+        try:
+            body = await request.json()
+            player_input = str(body["input"]).strip()
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='Expected a JSON body like {"input": "..."}')
+        if not player_input:
+            raise web.HTTPBadRequest(text="Empty input")
+        return web.json_response(await self._run_turn(campaign_id, player_input))
+
+    async def handle_ws(self, request):
+        campaign_id = self._campaign_id(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        loop = asyncio.get_running_loop()
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                player_input = str(msg.json()["input"]).strip()
+            except (ValueError, KeyError, TypeError):
+                await ws.send_json({"type": "error", "status": 400, "error": 'Expected {"input": "..."}'})
+                continue
+
+            # Bounded hand-off from the worker thread; when it is full the
+            # worker blocks, which stops pulling from the LLM stream
+            chunks = asyncio.Queue(maxsize=SERVER_STREAM_BUFFER)
+            dropped = threading.Event()  # client gone or stalled: stop handing it chunks
+
+            def render(narrative):
+                for chunk in narrative:
+                    if dropped.is_set() or ws.closed:
+                        continue  # keep consuming so the turn completes
+                    put = asyncio.wait_for(chunks.put(chunk), SERVER_STREAM_STALL_S)
+                    try:
+                        asyncio.run_coroutine_threadsafe(put, loop).result()
+                    except Exception:
+                        dropped.set()
+
+            async def forward():
+                # Drains until _DONE whatever happens, so `render` never waits on a dead sender
+                while (chunk := await chunks.get()) is not _DONE:
+                    if dropped.is_set() or ws.closed:
+                        continue
+                    try:
+                        await ws.send_json({"type": "chunk", "text": chunk})
+                    except Exception:
+                        dropped.set()
+
+            sender = asyncio.create_task(forward())
+            try:
+                result = await self._run_turn(campaign_id, player_input, render)
+                await chunks.put(_DONE)
+                await sender
+                reply = {"type": "turn", **result}
+            except web.HTTPException as e:
+                sender.cancel()
+                reply = {"type": "error", "status": e.status, "error": e.text}
+            except Exception as e:
+                sender.cancel()
+                reply = {"type": "error", "status": 500, "error": str(e)}
+            if ws.closed:
+                break
+            try:
+                await ws.send_json(reply)
+            except ConnectionError:
+                break
+        return ws
+
+    async def handle_quests(self, request):
+        campaign_id = self._campaign_id(request)
+
+        def active_quests():
+            with self.manager.session(campaign_id) as campaign:
+                return campaign.quest_log.get_active_quests()
+
+        quests = await asyncio.get_running_loop().run_in_executor(self._pool, active_quests)
+        return web.json_response({"campaign_id": campaign_id, "quests": quests}, dumps=_dumps)
+
+    async def handle_health(self, request):
+        return web.json_response({
+            "pending_turns": self.pending,
+            "busy_campaigns": len(self._campaign_pending),
+            "loaded_campaigns": len(self.manager),
+            "rejected": self.rejected,
+        })
+
+    async def handle_metrics(self, request):
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain")
+
+    async def _on_shutdown(self, app):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self):
+        """Finish running turns, then flush and unload every campaign and the embedding cache."""
+        from memory.embeddings import flush_embedding_cache
+
+        self._pool.shutdown(wait=True)
+        self.manager.close()
+        flush_embedding_cache()
+
+
+def _dumps(value):
+    return json.dumps(value, default=str)  # quest documents carry ObjectIds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dungeons N Destiny game server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Turns executed concurrently")
+    args = parser.parse_args(argv)
+
+    from memory.embeddings import warm_up
+    warm_up(background=True)
+    server = GameServer(workers=args.workers)
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+
+from llm.resilience import (
+    LLMHTTPError, LLMTimeoutError, LatencyTracker, backoff_delay, is_retryable, rate_limiter
+)
+from utils.config import (
+    GEMINI_API_KEY, GEMINI_API_ENDPOINT, LLM_BACKEND, LLM_RECORD_PATH, LLM_FAKE_LATENCY_MS,
+    LLM_DEADLINE_S, LLM_ATTEMPT_TIMEOUT_S, LLM_MAX_ATTEMPTS, LLM_BACKOFF_BASE_S, LLM_BACKOFF_MAX_S,
+    LLM_REQUESTS_PER_MINUTE, LLM_RATE_BURST, LLM_HEDGE, LLM_HEDGE_QUANTILE, LLM_HEDGE_MIN_SAMPLES,
+    LLM_LATENCY_WINDOW
+)
+
+
+class LLMBackend:
+    """Interface behind `generate_response`: turn a prompt into text."""
+
+    def generate(self, prompt: str, model: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, model: str):
+        """Yield text chunks; backends without native streaming yield one chunk."""
+        yield self.generate(prompt, model)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    google.generativeai, imported and configured on first use. One
+    GenerativeModel handle per model name is kept for the process, and every
+    request carries `timeout` so abandoned attempts do not run forever. A
+    non-default `endpoint` switches the SDK to its REST transport.
+    """
+
+    def __init__(self, api_key=GEMINI_API_KEY, endpoint=GEMINI_API_ENDPOINT, timeout=LLM_ATTEMPT_TIMEOUT_S):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def genai(self):
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    if self.endpoint and self.endpoint != GEMINI_API_ENDPOINT:
+                        genai.configure(api_key=self.api_key, transport="rest",
+                                        client_options={"api_endpoint": self.endpoint})
+                    else:
+                        genai.configure(api_key=self.api_key)
+                    self._genai = genai
+        return self._genai
+
+    def _model(self, model):
+        handle = self._models.get(model)
+        if handle is None:
+            genai = self.genai
+            with self._lock:
+                handle = self._models.get(model)
+                if handle is None:
+                    handle = self._models[model] = genai.GenerativeModel(model)
+        return handle
+
+    def generate(self, prompt, model):
+        response = self._model(model).generate_content(prompt, request_options={"timeout": self.timeout})
+        return response.text
+
+    def stream(self, prompt, model):
+        response = self._model(model).generate_content(prompt, stream=True, request_options={"timeout": self.timeout})
+        for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+
+class GeminiRestBackend(LLMBackend):
+    """
+    The Gemini generateContent REST API over `requests`, without the SDK.
+    Each thread keeps its own keep-alive session, so connections are reused
+    across calls. Point `endpoint` at benchmarks/fake_gemini_server.py to
+    exercise the client against injected latency and errors.
+    """
+
+    def __init__(self, api_key=GEMINI_API_KEY, endpoint=GEMINI_API_ENDPOINT, timeout=LLM_ATTEMPT_TIMEOUT_S):
+        self.api_key = api_key
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+            session.headers["x-goog-api-key"] = self.api_key or ""
+        return session
+
+    def _post(self, model, method, prompt, **params):
+        response = self.session.post(
+            f"{self.endpoint}/v1beta/models/{model}:{method}",
+            params=params,
+            json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+            timeout=self.timeout,
+            stream=method == "streamGenerateContent"
+        )
+        if response.status_code >= 400:
+            retry_after = response.headers.get("Retry-After")
+            message = response.text[:200]
+            response.close()
+            raise LLMHTTPError(response.status_code, message, float(retry_after) if retry_after else None)
+        return response
+
+    @staticmethod
+    def _text(payload):
+        return "".join(
+            part.get("text", "")
+            for candidate in payload.get("candidates", [])[:1]
+            for part in candidate.get("content", {}).get("parts", [])
+        )
+
+    def generate(self, prompt, model):
+        return self._text(self._post(model, "generateContent", prompt).json())
+
+    def stream(self, prompt, model):
+        with self._post(model, "streamGenerateContent", prompt, alt="sse") as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    text = self._text(json.loads(line[5:]))
+                    if text:
+                        yield text
+
+
+class ResilientBackend(LLMBackend):
+    """
+    Wraps a remote backend so that no call can stall a turn:
+
+    - every call has a deadline (`deadline_s`, retries included) and every
+      attempt a timeout (`attempt_timeout_s`); attempts run on a thread pool,
+      so even a backend that ignores its own timeout is abandoned in time;
+    - timeouts, connection errors, 429 and 5xx are retried with full-jitter
+      exponential backoff (at least the server's Retry-After);
+    - requests take a token from the process-wide bucket of their API key;
+    - with `hedge`, a second identical request is sent once the first has
+      taken longer than the recent `hedge_quantile` latency, and the first
+      reply wins (only when the bucket has a token to spare).
+
+    Streams are retried until their first chunk arrives; after that a
+    failure is raised, since the player has already seen part of the
+    narrative. Streams are never hedged.
+    """
+
+    def __init__(self, inner, api_key=None, deadline_s=LLM_DEADLINE_S, attempt_timeout_s=LLM_ATTEMPT_TIMEOUT_S,
+                 max_attempts=LLM_MAX_ATTEMPTS, backoff_base_s=LLM_BACKOFF_BASE_S, backoff_max_s=LLM_BACKOFF_MAX_S,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE, burst=LLM_RATE_BURST, hedge=LLM_HEDGE,
+                 hedge_quantile=LLM_HEDGE_QUANTILE, hedge_min_samples=LLM_HEDGE_MIN_SAMPLES,
+                 latency_window=LLM_LATENCY_WINDOW, max_concurrency=64, rng=None):
+        self.inner = inner
+        self.deadline_s = deadline_s
+        self.attempt_timeout_s = attempt_timeout_s
+        self.max_attempts = max_attempts
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker(latency_window)
+        self.bucket = rate_limiter(api_key if api_key is not None else getattr(inner, "api_key", None),
+                                   requests_per_minute, burst)
+        self._rng = rng or random.Random()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-call")
+        self._stats = dict.fromkeys(["calls", "attempts", "retries", "hedges", "hedge_wins", "timeouts", "failures"], 0)
+        self._stats_lock = threading.Lock()
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _take_token(self, deadline):
+        if self.bucket is not None and not self.bucket.acquire(timeout=deadline - time.monotonic()):
+            self._count("failures")
+            raise LLMTimeoutError("LLM rate limit: no request slot before the deadline")
+
+    def _retry(self, attempt, error, deadline):
+        """Sleep before the next attempt, or return False when out of attempts or time."""
+        delay = max(backoff_delay(attempt, self.backoff_base_s, self.backoff_max_s, self._rng),
+                    getattr(error, "retry_after", None) or 0)
+        if attempt + 1 >= self.max_attempts or time.monotonic() + delay >= deadline:
+            return False
+        print(f"⚠️ LLM call failed ({error}); retrying in {delay:.2f}s")
+        self._count("retries")
+        time.sleep(delay)
+        return True
+
+    def generate(self, prompt, model):
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline_s
+        for attempt in range(self.max_attempts):
+            self._take_token(deadline)
+            try:
+                return self._attempt(prompt, model, min(self.attempt_timeout_s, deadline - time.monotonic()))
+            except Exception as e:
+                if not is_retryable(e) or not self._retry(attempt, e, deadline):
+                    self._count("failures")
+                    raise
+
+    def _attempt(self, prompt, model, timeout):
+        """One request (plus its hedge); the first successful reply wins."""
+        self._count("attempts")
+        start = time.monotonic()
+        end = start + timeout
+        first = self._pool.submit(self.inner.generate, prompt, model)
+        pending = [first]
+
+        hedge_after = self.latency.quantile(self.hedge_quantile, self.hedge_min_samples) if self.hedge else None
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done and (self.bucket is None or self.bucket.try_acquire()):
+                self._count("hedges")
+                pending.append(self._pool.submit(self.inner.generate, prompt, model))
+
+        error = None
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                pending.remove(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                self.latency.observe(time.monotonic() - start)
+                if future is not first:
+                    self._count("hedge_wins")
+                for other in pending:
+                    other.cancel()
+                return result
+        if not pending and error is not None:
+            raise error
+        self._count("timeouts")
+        raise LLMTimeoutError(f"No LLM reply within {timeout:.1f}s")
+
+    def _next(self, chunks, timeout):
+        try:
+            return self._pool.submit(next, chunks, None).result(timeout=max(0.0, timeout))
+        except FutureTimeout:
+            self._count("timeouts")
+            raise LLMTimeoutError(f"No LLM output within {timeout:.1f}s")
+
+    def stream(self, prompt, model):
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline_s
+        for attempt in range(self.max_attempts):
+            self._take_token(deadline)
+            self._count("attempts")
+            chunks = self.inner.stream(prompt, model)
+            try:
+                chunk = self._next(chunks, min(self.attempt_timeout_s, deadline - time.monotonic()))
+                break
+            except Exception as e:
+                if not is_retryable(e) or not self._retry(attempt, e, deadline):
+                    self._count("failures")
+                    raise
+
+        while chunk is not None:
+            yield chunk
+            chunk = self._next(chunks, self.attempt_timeout_s)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Offline, deterministic stand-in for Gemini.
+
+    Replies are chosen from templates by hashing the prompt, so the same
+    prompt always gets the same answer. It recognizes the DM prompt (and
+    emits narrative plus the NPC/quest JSON contract, with memory_summary
+    when asked), the summarizer prompt and the interaction-analyzer prompt.
+    `latency_ms` is slept before replying; when streaming, `chunk_latency_ms`
+    is slept between chunks.
+    """
+
+    NPCS = ["Elder Mira", "Captain Thorne", "Sister Vell", "Old Brannoc", "The Hooded Stranger"]
+    PLACES = ["the ruined chapel", "Eryndor's market square", "the Whispering Woods", "the drowned crypt", "the royal archives"]
+    EVENTS = [
+        "a shard of the Crown of Concord glimmers in the rubble",
+        "cultists of the Ashen Veil watch from the shadows",
+        "a messenger brings rumors of King Alaric",
+        "corruption spreads through the roots of the old trees",
+        "rival nobles argue over the vacant throne",
+    ]
+    QUESTS = [
+        ("Recover the First Fragment", "Reclaim the crown shard guarded beneath the chapel.", "Fragment of Concord", True),
+        ("The Missing Courier", "Find the courier who vanished on the forest road.", "Bag of gold", False),
+        ("Secrets of the Archive", "Search the royal archives for clues about the King.", "Royal Seal", True),
+        ("Cleanse the Woods", "Burn the corrupted roots before the rot spreads.", "Druid's Charm", False),
+    ]
+
+    def __init__(self, latency_ms=LLM_FAKE_LATENCY_MS, chunk_latency_ms=0.0, quest_rate=0.3):
+        self.latency_ms = latency_ms
+        self.chunk_latency_ms = chunk_latency_ms
+        self.quest_rate = quest_rate
+
+    def _rng(self, prompt):
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest(), "big")
+        return random.Random(seed)
+
+    def generate(self, prompt, model):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        rng = self._rng(prompt)
+        if "Summarize the following text" in prompt:
+            return self._summary(prompt, rng)
+        if "You are an RPG analyzer" in prompt:
+            return json.dumps({"npcs": [], "quests": []})
+        return self._dm_turn(prompt, rng)
+
+    def stream(self, prompt, model):
+        text = self.generate(prompt, model)
+        for i in range(0, len(text), 24):
+            if self.chunk_latency_ms:
+                time.sleep(self.chunk_latency_ms / 1000)
+            yield text[i:i + 24]
+
+    def _summary(self, prompt, rng):
+        body = prompt.split("Text:", 1)[-1].split("Summary:", 1)[0].strip()
+        first = re.split(r"(?<=[.!?])\s", body, maxsplit=1)[0]
+        return first or f"The party lingers near {rng.choice(self.PLACES)}."
+
+    def _dm_turn(self, prompt, rng):
+        match = re.search(r"^Player: (.*)$", prompt, flags=re.MULTILINE)
+        player_input = match.group(1).strip() if match else "waits"
+        npc = rng.choice(self.NPCS)
+        if "talk to" in player_input.lower():
+            npc = player_input.lower().split("talk to")[-1].strip().title() or npc
+        place = rng.choice(self.PLACES)
+        event = rng.choice(self.EVENTS)
+        action = player_input.rstrip(".")
+        action = action[:1].lower() + action[1:]
+
+        narrative = (
+            f"You {action} in {place}. "
+            f"As you do, {event}. {npc} steps closer and speaks in a low voice."
+        )
+        data = {
+            "npcs": [{"npc_name": npc, "interaction": "spoke to", "context": f"Met the player in {place} as {event}."}],
+            "quests": [],
+        }
+        if rng.random() < self.quest_rate:
+            name, description, reward, mandatory = rng.choice(self.QUESTS)
+            progress = rng.choice(["Started", "In Progress"])
+            if progress == "Started":
+                narrative += f' {npc} asks you to take on the quest "{name}": {description}'
+            else:
+                narrative += f" You are one step closer on {name}."
+            data["quests"].append({
+                "quest_name": name,
+                "progress": progress,
+                "description": description,
+                "reward": reward,
+                "mandatory": mandatory,
+            })
+        if '"memory_summary"' in prompt:
+            data["memory_summary"] = f"In {place}, {event}; {npc} spoke with the player."
+        return f"{narrative}\n\n```json\n{json.dumps(data, indent=2)}\n```"
+
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Records responses of an inner backend to a JSON-lines file keyed by a hash
+    of (model, prompt), or replays them without touching the network.
+    In replay mode an unknown prompt raises KeyError unless a `fallback`
+    backend is given.
+    """
+
+    def __init__(self, path=LLM_RECORD_PATH, mode="replay", inner=None, fallback=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.fallback = fallback
+        self._responses = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._responses[entry["key"]] = entry["response"]
+
+    @staticmethod
+    def key(prompt, model):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def generate(self, prompt, model):
+        key = self.key(prompt, model)
+        with self._lock:
+            if key in self._responses:
+                return self._responses[key]
+        if self.mode == "replay":
+            if self.fallback is None:
+                raise KeyError(f"No recorded response for prompt {key[:12]}")
+            return self.fallback.generate(prompt, model)
+
+        response = self.inner.generate(prompt, model)
+        with self._lock:
+            self._responses[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "model": model, "response": response}, ensure_ascii=False) + "\n")
+        return response
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=LLM_BACKEND):
+    """Build a backend from its config name: gemini | gemini-rest | scripted | record | replay."""
+    if name == "gemini":
+        return ResilientBackend(GeminiBackend())
+    if name == "gemini-rest":
+        return ResilientBackend(GeminiRestBackend())
+    if name == "scripted":
+        return ScriptedBackend()
+    if name == "record":
+        return RecordReplayBackend(mode="record", inner=ResilientBackend(GeminiBackend()))
+    if name == "replay":
+        return RecordReplayBackend(mode="replay")
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+def get_backend() -> LLMBackend:
+    """Return the process-wide backend (created from LLM_BACKEND on first use)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Swap the process-wide backend (e.g. ScriptedBackend for benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+from utils.config import (
+    CONTEXT_TOKEN_BUDGETS, RETRIEVAL_SIMILARITY_THRESHOLD,
+    MMR_LAMBDA, NEAR_DUPLICATE_SIMILARITY
+)
+from utils.helpers import clean_text
+from utils.logger import setup_logger
+
+logger = setup_logger("ContextAssembler")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token); no tokenizer needed."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _take_within_budget(lines, budget):
+    """Keep lines in order until the next one would exceed `budget` tokens."""
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # +1 for the joining newline
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def mmr_select(candidates, budget, lambda_=MMR_LAMBDA, threshold=RETRIEVAL_SIMILARITY_THRESHOLD,
+               near_duplicate=NEAR_DUPLICATE_SIMILARITY, exclude=()):
+    """
+    Pick memories with maximal marginal relevance under a token budget.
+
+    `candidates` are (text, score, vector) tuples with unit-length vectors and
+    `score` = similarity to the query. Candidates below `threshold`, whose
+    text is in `exclude`, or that are near-duplicates of an already picked
+    memory are dropped. Returns picked texts, best first.
+    """
+    excluded = {clean_text(t) for t in exclude}
+    pool = []
+    seen = set()
+    for text, score, vector in candidates:
+        key = clean_text(text)
+        if score < threshold or key in excluded or key in seen:
+            continue
+        seen.add(key)
+        pool.append((text, score, np.asarray(vector, dtype="float32")))
+
+    picked, picked_vectors, used = [], [], 0
+    while pool:
+        if picked_vectors:
+            redundancy = np.stack([v for _, _, v in pool]) @ np.stack(picked_vectors).T
+            max_sim = redundancy.max(axis=1)
+        else:
+            max_sim = np.zeros(len(pool), dtype="float32")
+
+        mmr = [lambda_ * score - (1 - lambda_) * sim for (_, score, _), sim in zip(pool, max_sim)]
+        best = int(np.argmax(mmr))
+        text, _, vector = pool.pop(best)
+        if max_sim[best] >= near_duplicate:
+            continue
+
+        cost = estimate_tokens(text) + 1
+        if used + cost > budget:
+            continue
+        picked.append(text)
+        picked_vectors.append(vector)
+        used += cost
+    return picked
+
+
+class ContextAssembler:
+    """
+    Builds the bounded context sections that go into `build_prompt`.
+
+    Every section (retrieved, recent, npc, quests, rewards) gets its own token
+    budget. Retrieved memories are thresholded, de-duplicated with MMR and
+    stripped of anything already in the recent (working) context.
+    """
+
+    def __init__(self, budgets=None, lambda_=MMR_LAMBDA,
+                 threshold=RETRIEVAL_SIMILARITY_THRESHOLD, near_duplicate=NEAR_DUPLICATE_SIMILARITY):
+        self.budgets = {**CONTEXT_TOKEN_BUDGETS, **(budgets or {})}
+        self.lambda_ = lambda_
+        self.threshold = threshold
+        self.near_duplicate = near_duplicate
+
+    def assemble(self, recent=(), retrieved=(), npc_name=None, npc_history=(), quests=(), rewards=()):
+        """
+        Inputs:
+        - recent:      working-memory summaries, oldest first
+        - retrieved:   (text, score, vector) candidates from PersistentMemory.retrieve_scored
+        - npc_history: past interactions with `npc_name`, most relevant first
+        - quests:      preformatted active-quest entries
+        - rewards:     preformatted reward lines
+
+        Returns a dict with `working_context`, `retrieved_context`,
+        `reward_context` (ready for build_prompt) and per-section `tokens`.
+        """
+        # Newest recent entries win when the budget is tight; keep chronological order
+        recent_kept = _take_within_budget(list(reversed(list(recent))), self.budgets["recent"])[::-1]
+        retrieved_kept = mmr_select(
+            retrieved, self.budgets["retrieved"], lambda_=self.lambda_, threshold=self.threshold,
+            near_duplicate=self.near_duplicate, exclude=recent_kept
+        )
+        npc_kept = _take_within_budget(npc_history, self.budgets["npc"])
+        quests_kept = _take_within_budget(quests, self.budgets["quests"])
+        rewards_kept = _take_within_budget(rewards, self.budgets["rewards"])
+
+        sections = {
+            "retrieved": "\n".join(retrieved_kept),
+            "recent": "\n".join(recent_kept),
+            "npc": "\n".join(npc_kept),
+            "quests": "\n".join(quests_kept),
+            "rewards": "\n".join(rewards_kept),
+        }
+        tokens = {name: estimate_tokens(text) for name, text in sections.items()}
+        logger.debug(f"Context tokens per section: {tokens}")
+
+        retrieved_context = sections["retrieved"]
+        if npc_name and sections["npc"]:
+            retrieved_context += f"\nPrevious {npc_name} Interactions:\n{sections['npc']}"
+
+        return {
+            "working_context": sections["recent"] + f"\nActive Quests:\n{sections['quests']}",
+            "retrieved_context": retrieved_context,
+            "reward_context": sections["rewards"],
+            "tokens": tokens,
+        }
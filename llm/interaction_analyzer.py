@@ -1,17 +1,40 @@
 import json
 import re
-import google.generativeai as genai
-from utils.config import GEMINI_API_KEY
+from llm.story_engine import generate_response
+from memory.interaction_extractor import InteractionExtractor
+from utils.config import LOCAL_EXTRACTOR_MIN_CONFIDENCE
 
-genai.configure(api_key=GEMINI_API_KEY)
 
-def analyze_interaction(player_input, dm_response):
+def analyze_interaction(player_input, dm_response, extractor=None, min_confidence=LOCAL_EXTRACTOR_MIN_CONFIDENCE):
     """
     Analyze player and DM interaction to extract NPCs and quests automatically.
     Returns a dict with consistent quest schema:
     - "progress": string ("Started", "In Progress", "Completed")
     - "mandatory": bool (default False)
+
+    `extractor` is the campaign's InteractionExtractor (CampaignState.extractor),
+    so names never leak between campaigns; without one a fresh extractor is
+    used. It runs first; the LLM is only asked when its confidence is below
+    `min_confidence`, and the names it finds are taught to the extractor for
+    next time.
     """
+    if extractor is None:
+        extractor = InteractionExtractor()
+    data, confidence = extractor.extract(player_input, dm_response)
+    if confidence >= min_confidence:
+        return data
+
+    data = _analyze_with_llm(player_input, dm_response)
+    for name in data["npcs"]:
+        if isinstance(name, str):
+            extractor.add_npc(name)
+    for q in data["quests"]:
+        if q.get("quest_name"):
+            extractor.add_quest(q["quest_name"], q["mandatory"], q.get("progress_status", 0), q["progress"] != "Completed")
+    return data
+
+
+def _analyze_with_llm(player_input, dm_response):
     prompt = f"""
 You are an RPG analyzer. 
 Given a player's input and the Dungeon Master's response, extract structured data in JSON format.
@@ -42,9 +65,8 @@ DM Response: {dm_response}
 """
 
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        response = generate_response(prompt, model="gemini-2.5-flash")
+        text = response.strip()
 
         # Extract JSON 
         json_match = re.search(r"\{.*\}", text, re.DOTALL)
@@ -73,5 +95,5 @@ DM Response: {dm_response}
 
     except Exception as e:
         print(f"⚠️ Error parsing LLM output: {e}")
-        print("⚠️ Raw response:", response.text if 'response' in locals() else 'No response')
+        print("⚠️ Raw response:", response if 'response' in locals() else 'No response')
         return {"npcs": [], "quests": []}
@@ -1,4 +1,4 @@
-def build_prompt(working_context, retrieved_context, player_input, reward_context=""):
+def build_prompt(working_context, retrieved_context, player_input, reward_context="", include_memory_summary=False):
     """
     Builds a prompt for the Dungeon Master LLM that includes:
     - Persistent world knowledge
@@ -7,6 +7,9 @@ def build_prompt(working_context, retrieved_context, player_input, reward_contex
     - Reward context (items or info from completed quests)
     - Main storyline: "The Shattered Crown"
     - Optional side quests for extra rewards
+
+    With `include_memory_summary=True` the JSON contract also asks for a
+    `memory_summary` field, so no separate summarizer call is needed.
     """
 
     main_storyline = """
@@ -32,6 +35,12 @@ Potential Story Arcs:
 4. The Final Confrontation - Choices made in prior arcs determine endings.
 """
 
+    summary_rule = ""
+    summary_field = ""
+    if include_memory_summary:
+        summary_rule = "\n    3. memory_summary: 1-2 sentences summarizing this turn, preserving key characters, events, and locations"
+        summary_field = ',\n    "memory_summary": "The player met Elder Mira, who warned of the spreading darkness."'
+
     return f"""
 You are a Dungeon Master for a text-based tabletop RPG. Follow these rules:
 
@@ -44,7 +53,7 @@ You are a Dungeon Master for a text-based tabletop RPG. Follow these rules:
 - Player may give unrelated or unusual input; respond politely and keep narrative flowing.
 - After narrative, output a JSON object with:
     1. NPC interactions: npc_name, interaction, context
-    2. Quests: quest_name, progress (Started/In Progress/Completed), description, reward, mandatory (True for main story, False for optional)
+    2. Quests: quest_name, progress (Started/In Progress/Completed), description, reward, mandatory (True for main story, False for optional){summary_rule}
 
 ### Persistent World Knowledge:
 {retrieved_context}
@@ -70,7 +79,7 @@ Then, a JSON object like this (no extra text outside JSON):
     ],
     "quests": [
         {{"quest_name": "Retrieve the Ancient Sword", "progress": "Started", "description": "Player needs to retrieve the ancient sword from the haunted ruins.", "reward": "Legendary Sword", "mandatory": False}}
-    ]
+    ]{summary_field}
 }}
 
 Optional quests are side content only; mandatory quests progress the main storyline.
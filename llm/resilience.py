@@ -0,0 +1,123 @@
+"""
+Building blocks for calling a remote LLM without letting one slow or failing
+request stall a turn: error classification, full-jitter backoff, a token
+bucket per API key and a rolling latency window for hedging. Assembled into
+`ResilientBackend` in llm/backends.py.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMTimeoutError(TimeoutError):
+    """A call (or one attempt) ran past its deadline."""
+
+
+class LLMHTTPError(RuntimeError):
+    """Non-2xx reply from the model API; `code` is the HTTP status."""
+
+    def __init__(self, code, message, retry_after=None):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+        self.retry_after = retry_after
+
+
+def status_code(exc):
+    """HTTP status of an error, when it has one (LLMHTTPError, google.api_core errors)."""
+    code = getattr(exc, "code", None)
+    if callable(code):  # grpc errors expose code() -> StatusCode
+        return None
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc):
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError"):
+        return True  # requests' own hierarchy
+    return status_code(exc) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt, base, cap, rng=random):
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` banked. Thread-safe."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """Block until a token is free; False if that would take longer than `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def rate_limiter(api_key, requests_per_minute, burst):
+    """The process-wide bucket for `api_key` (None when unlimited)."""
+    if not requests_per_minute:
+        return None
+    key = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(requests_per_minute / 60, burst)
+        return bucket
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q, min_samples=1):
+        """q-th quantile in seconds, or None until `min_samples` were observed."""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            samples = list(self._samples)
+        return float(np.quantile(samples, q))
@@ -1,9 +1,13 @@
-import google.generativeai as genai
-from utils.config import GEMINI_API_KEY
+from llm.backends import get_backend
 
-genai.configure(api_key=GEMINI_API_KEY)
 
-def generate_response(prompt, model="gemini-2.5-flash"):
-    model = genai.GenerativeModel(model)
-    response = model.generate_content(prompt)
-    return response.text
+def generate_response(prompt, model="gemini-2.5-flash", stream=False):
+    """
+    Return the model's full text, or with `stream=True` a generator that
+    yields text chunks as they are produced. The backend (Gemini, scripted
+    stand-in, record/replay) is chosen by LLM_BACKEND in utils.config.
+    """
+    backend = get_backend()
+    if stream:
+        return backend.stream(prompt, model)
+    return backend.generate(prompt, model)
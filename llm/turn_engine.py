@@ -0,0 +1,312 @@
+"""
+One game turn, shared by the CLI (main.py) and the Streamlit app.
+
+`TurnEngine.play(player_input)` runs, for one campaign:
+
+    wait for the writes this turn reads -> retrieve (recent cache, persistent
+    memory, NPC history, quests, rewards) -> assemble context -> build prompt
+    -> LLM (narrative streamed to `render`) -> parse (local extraction when
+    the DM's JSON lists no NPCs or quests) -> quest updates
+
+and then summarize -> embed -> persist (memory, NPC interactions) -> flush,
+either on the campaign's write-behind pipeline (CLI: off the critical path)
+or inline. Every stage is timed into a TurnRecord, together with prompt and
+response sizes and Mongo round-trips, and reported to utils.metrics once the
+turn's flush has finished.
+"""
+import re
+import time
+from types import SimpleNamespace
+
+from llm.context_assembler import ContextAssembler
+from llm.interaction_analyzer import analyze_interaction
+from llm.prompt_builder import build_prompt
+from llm.story_engine import generate_response
+from memory.embeddings import embed_texts
+from memory.npc_and_quest_parser import parse_llm_output, StreamingResponseParser
+from memory.storage import round_trips
+from memory.summarizer import summarize_for_memory
+from memory.unit_of_work import TurnUnitOfWork
+from utils.config import (
+    RETRIEVAL_CANDIDATES, STREAM_RESPONSES, SINGLE_CALL_TURNS, MONGO_TURN_TRANSACTIONS, LOCAL_EXTRACTOR_MIN_CONFIDENCE
+)
+from utils.metrics import TurnRecord, get_metrics
+
+
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]?")
+
+
+def _consume(chunks):
+    for _ in chunks:
+        pass
+
+
+class TurnEngine:
+    """
+    `campaign` is a session_manager.CampaignState (or anything with the same
+    persistent_mem / character_mem / quest_log / recent_cache / pipeline /
+    extractor / client attributes). With `write_behind=False` the turn is fully persisted
+    before `play` returns.
+    """
+
+    def __init__(self, campaign, assembler=None, metrics=None, write_behind=True,
+                 stream=STREAM_RESPONSES, single_call=SINGLE_CALL_TURNS):
+        self.campaign = campaign
+        self.assembler = assembler or ContextAssembler()
+        self.metrics = metrics or get_metrics()
+        self.write_behind = write_behind
+        self.stream = stream
+        self.single_call = single_call
+
+    def play(self, player_input, render=None, confirm_quest=None, notify=None):
+        """
+        Play one turn and return SimpleNamespace(dm_text, npc_name,
+        npc_history, interactions, quests).
+
+        - `render(chunks)` consumes the DM narrative as an iterator of text
+          chunks (the whole text as one chunk when not streaming).
+        - `confirm_quest(quest) -> bool` is asked before an optional quest is
+          accepted; without it every quest is accepted.
+        - `notify(message)` receives quest status messages.
+        """
+        campaign = self.campaign
+        record = TurnRecord(campaign_id=getattr(campaign, "campaign_id", None))
+        render = render or _consume
+        notify = notify or (lambda message: None)
+        start, player_wait = time.perf_counter(), 0.0
+        start_round_trips = round_trips(campaign.client)
+
+        try:
+            # Detect NPC interaction
+            npc_name = None
+            if "talk to" in player_input.lower():
+                npc_name = player_input.split("talk to")[-1].strip().title()
+
+            # Only wait for the background writes this turn actually reads
+            with record.stage("wait_for_writes"):
+                campaign.pipeline.wait_for("story", *(["npc"] if npc_name else []))
+
+            with record.stage("retrieve"):
+                # Working memory: last 5 summaries from the in-memory queue (no DB read)
+                recent = list(campaign.recent_cache)[-5:]
+                retrieved = campaign.persistent_mem.retrieve_scored(player_input, top_k=RETRIEVAL_CANDIDATES)
+                npc_history = []
+                if npc_name:
+                    npc_history = campaign.character_mem.get_memory(npc_name, query=player_input, top_k=5)
+                quest_entries = campaign.quest_log.get_quest_entries()
+                reward_lines = campaign.quest_log.get_rewards_context().splitlines()
+
+            with record.stage("assemble_context"):
+                # Fit every section into its token budget (MMR + de-dup for retrieved memories)
+                context = self.assembler.assemble(
+                    recent=recent,
+                    retrieved=retrieved,
+                    npc_name=npc_name,
+                    npc_history=npc_history,
+                    quests=quest_entries,
+                    rewards=reward_lines
+                )
+            for section, n in context["tokens"].items():
+                record.set(f"tokens_{section}", n)
+
+            with record.stage("build_prompt"):
+                prompt = build_prompt(
+                    context["working_context"],
+                    context["retrieved_context"],
+                    player_input,
+                    reward_context=context["reward_context"],
+                    include_memory_summary=self.single_call
+                )
+            record.set("prompt_chars", len(prompt))
+
+            dm_text, npcs, quests, memory_summary = self._generate(prompt, render, record)
+            if not npcs and not quests:
+                npcs, quests = self._extract_locally(player_input, dm_text, record)
+
+            # Collect valid NPC interactions
+            interactions = []
+            for npc in npcs:
+                if npc.get("npc_name") and npc.get("context"):
+                    print(f"💬 Logging NPC interaction: {npc['npc_name']} -> {npc['context'][:60]}...")
+                    interactions.append((npc["npc_name"], npc["context"]))
+                else:
+                    print(f"⚠️ Skipped invalid NPC entry: {npc}")
+
+            # Every Mongo write of this turn is queued here and flushed as one bulk_write per collection
+            uow = TurnUnitOfWork(client=campaign.client, transactional=MONGO_TURN_TRANSACTIONS)
+            if self.write_behind:
+                # Summarize and embed in the background while the player types
+                campaign.pipeline.submit(self._finalize, record, dm_text, interactions, memory_summary, uow, keys=("story", "npc"))
+            else:
+                self._finalize(record, dm_text, interactions, memory_summary, uow)
+
+            player_wait = self._apply_quests(quests, player_input, uow, record, confirm_quest, notify)
+
+            # Teach the campaign's extractor this turn's names for the turns to come
+            for name, _ in interactions:
+                campaign.extractor.add_npc(name)
+            campaign.extractor.sync(quest_log=campaign.quest_log)
+            record.add("turn", time.perf_counter() - start - player_wait)
+
+            # Flush after the story task has queued its inserts (the pipeline is FIFO)
+            if self.write_behind:
+                campaign.pipeline.submit(self._flush, record, uow, start_round_trips, keys=("flush",))
+            else:
+                self._flush(record, uow, start_round_trips)
+        except Exception:
+            record.set("failed", True)
+            self.metrics.record_turn(record, failed=True)
+            raise
+
+        return SimpleNamespace(
+            dm_text=dm_text,
+            npc_name=npc_name,
+            npc_history=npc_history,
+            interactions=interactions,
+            quests=quests
+        )
+
+    def _generate(self, prompt, render, record):
+        """Call the LLM, hand the narrative to `render`, parse the JSON tail."""
+        start = time.perf_counter()
+        if self.stream:
+            stream_parser = StreamingResponseParser()
+
+            def timed(chunks):
+                first = True
+                for chunk in chunks:
+                    if first:
+                        record.add("llm_first_chunk", time.perf_counter() - start)
+                        first = False
+                    yield chunk
+
+            render(stream_parser.narrative(timed(generate_response(prompt, stream=True))))
+            record.add("llm", time.perf_counter() - start)
+            with record.stage("parse"):
+                dm_text, npcs, quests, memory_summary = stream_parser.result(include_summary=True)
+            response_chars = len(stream_parser.text)
+        else:
+            response = generate_response(prompt)
+            record.add("llm", time.perf_counter() - start)
+            with record.stage("parse"):
+                dm_text, npcs, quests, memory_summary = parse_llm_output(response, include_summary=True)
+            response_chars = len(response)
+            render(iter([dm_text]))
+        record.set("response_chars", response_chars)
+        return dm_text, npcs, quests, memory_summary
+
+    def _extract_locally(self, player_input, dm_text, record):
+        """
+        NPCs and quests in the DM JSON's shape, for a reply whose JSON listed
+        none (or was missing): from the campaign's local extractor, or from
+        the LLM analyzer when the extractor is unsure.
+        """
+        with record.stage("extract"):
+            data = analyze_interaction(
+                player_input, dm_text, extractor=self.campaign.extractor, min_confidence=LOCAL_EXTRACTOR_MIN_CONFIDENCE
+            )
+        sentences = _SENTENCE.findall(dm_text)
+        npcs = []
+        for name in data["npcs"]:
+            if not isinstance(name, str):
+                continue
+            context = next((s.strip() for s in sentences if name in s), None)
+            if context:
+                npcs.append({"npc_name": name, "context": context})
+        return npcs, [q for q in data["quests"] if q.get("quest_name")]
+
+    def _finalize(self, record, dm_text, interactions, memory_summary, uow):
+        """Summarize the turn and queue it plus NPC interactions on `uow`."""
+        campaign = self.campaign
+        try:
+            # Falls back to a summarizer LLM call only if the DM omitted memory_summary
+            with record.stage("summarize"):
+                summary = summarize_for_memory(dm_text, memory_summary if self.single_call else None)
+
+            # One batched encoder call for the summary and every NPC interaction
+            with record.stage("embed"):
+                vectors = embed_texts([summary] + [context for _, context in interactions])
+            with record.stage("persist.memory"):
+                campaign.persistent_mem.add_memory(summary, vectors[0], uow=uow)
+            with record.stage("persist.npc"):
+                campaign.character_mem.add_interactions(interactions, embeddings=vectors[1:], uow=uow)
+
+            # Future turns read the working-memory context from here (no DB read)
+            campaign.recent_cache.append(summary)
+        except Exception:
+            record.set("failed", True)
+            raise
+
+    def _apply_quests(self, quests, player_input, uow, record, confirm_quest, notify):
+        """
+        Apply quest updates (in-memory; writes go on `uow`): a new quest is
+        offered, an active one progressed or completed, and a completed or
+        abandoned one left alone. Returns seconds spent waiting on the player.
+        """
+        quest_log = self.campaign.quest_log
+        player_wait = 0.0
+
+        for quest in quests:
+            quest_name = quest["quest_name"]
+            mandatory = quest.get("mandatory", False)
+            kind = "Main" if mandatory else "Optional"
+            completed = quest.get("progress") == "Completed"
+
+            status = quest_log.quest_status(quest_name)
+            if status in ("completed", "abandoned"):
+                # Finished quests are not offered (or progressed) again
+                continue
+            if status == "active":
+                with record.stage("persist.quests"):
+                    quest_log.update_progress(
+                        quest_name, increment=10 if completed else 1, new_summary=quest["description"], uow=uow
+                    )
+                if completed:
+                    notify(f"🏆 {kind} Quest Completed: {quest_name}")
+                else:
+                    notify(f"📜 {kind} Quest Progress Updated: {quest_name}")
+                continue
+            if completed:
+                # Nothing to complete: the quest was never accepted
+                continue
+
+            # Main storyline quests are always added; optional ones may be declined
+            if not mandatory:
+                notify(f"🗺️ Optional Quest Available: {quest_name}\nDescription: {quest['description']}")
+                if confirm_quest is not None:
+                    asked = time.perf_counter()
+                    accepted = confirm_quest(quest)
+                    player_wait += time.perf_counter() - asked
+                    if not accepted:
+                        notify(f"❌ Optional Quest Declined: {quest_name}")
+                        continue
+
+            with record.stage("persist.quests"):
+                quest_log.add_quest(
+                    quest_name=quest_name,
+                    summary=quest["description"],
+                    reward=quest.get("reward", "unknown reward"),
+                    mandatory=mandatory,
+                    uow=uow
+                )
+            notify(f"📜 Main Quest Added: {quest_name}" if mandatory else f"✅ Optional Quest Accepted: {quest_name}")
+
+        # Abandon quests mid-way
+        if "abandon quest" in player_input.lower():
+            with record.stage("persist.quests"):
+                quest_log.abandon_all_quests(uow=uow)
+            notify("🛑 All active quests abandoned. No rewards received.")
+        return player_wait
+
+    def _flush(self, record, uow, start_round_trips):
+        """Write the turn's queued operations, then report the finished turn."""
+        try:
+            with record.stage("persist.flush"):
+                uow.flush()
+        except Exception:
+            record.set("failed", True)
+            raise
+        finally:
+            # Process-wide counter: concurrent campaigns' commands are included
+            record.set("mongo_round_trips", round_trips(self.campaign.client) - start_round_trips)
+            self.metrics.record_turn(record, failed=record.values.get("failed", False))
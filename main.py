@@ -1,153 +1,143 @@
-from interface.cli import get_player_input, display_output
-from memory.persistent import PersistentMemory
-from memory.character_memory import CharacterMemory
-from memory.quest_log import QuestLog
-from memory.npc_and_quest_parser import parse_llm_output
-from memory.summarizer import summarize_for_memory
-from memory.embeddings import embed_text
-from llm.story_engine import generate_response
-from llm.prompt_builder import build_prompt
-from collections import deque
-
-persistent_mem = PersistentMemory()
-character_mem = CharacterMemory()
-quest_log = QuestLog()
-
-# --- Load recent memories from DB once and keep an in-memory queue 
-RECENT_CACHE_SIZE = 500
-# get_recent_memories(n) should return a list of summary strings (same shape as used before)
-recent_cache = deque(persistent_mem.get_recent_memories(RECENT_CACHE_SIZE), maxlen=RECENT_CACHE_SIZE)
-
-print("🛡️ AI Dungeon Master is ready! Type 'start' to continue or 'exit' to quit.\n")
-print("📜 General Rules:")
-print("- Each turn, you (the player) provide input to interact with the world.")
-print("- You may talk to NPCs, explore locations, solve puzzles, or accept quests.")
-print("- Optional side quests can be accepted or declined; main storyline quests must be completed.")
-print("- Your progress in quests, items obtained, and key choices affect the main storyline.")
-print("- You can type 'abandon quest' to give up on optional quests (no rewards).")
-print("- Have fun and immerse yourself in the world of 'The Shattered Crown'!\n")
-
-
-while True:
-    player_input = get_player_input()
-    if player_input.lower() in ["exit", "quit"]:
-        print("Exiting AI Dungeon Master...")
-        break
-
-    # Detect NPC interaction
-    npc_name = None
-    if "talk to" in player_input.lower():
-        npc_name = player_input.split("talk to")[-1].strip().title()
-
-    # Working memory: last 5 summaries (use in-memory queue, avoid DB hit each turn)
-    working_context = "\n".join(list(recent_cache)[-5:])
-
-    # Persistent memory for storyline and plot progression
-    retrieved_context = "\n".join(persistent_mem.retrieve(player_input, top_k=500))
-
-    # Include NPC history
-    if npc_name:
-        npc_history = "\n".join(character_mem.get_memory(npc_name, query=player_input, top_k=5))
-        if npc_history:
-            retrieved_context += f"\nPrevious {npc_name} Interactions:\n{npc_history}"
-
-    # Quest context
-    active_quests = quest_log.get_active_quests()
-    quest_context = ""
-    if active_quests:
-        quest_context = "\n".join([
-            f"- {q['quest_name']} (Progress: {q['progress_status']}/10)\nSummary: {q.get('progress_summary', '')}"
-            for q in active_quests
-        ])
-
-    # Rewards context
-    reward_context = quest_log.get_rewards_context()
-
-    # Build LLM prompt
-    prompt = build_prompt(
-        working_context + f"\nActive Quests:\n{quest_context}",
-        retrieved_context,
-        player_input,
-        reward_context=reward_context
+import argparse
+import threading
+from types import SimpleNamespace
+
+from interface.cli import get_player_input, display_output, display_stream
+from utils.profiling import StartupProfiler
+
+
+class BackgroundStartup:
+    """
+    Imports and builds the heavy game components (LLM client, Mongo-backed
+    memories, encoder) on a worker thread, so the banner and first prompt
+    appear immediately. `wait()` blocks until everything is ready.
+    """
+
+    def __init__(self, profiler, campaign_id):
+        self.profiler = profiler
+        self.campaign_id = campaign_id
+        self._ready = threading.Event()
+        self._error = None
+        self._state = None
+        threading.Thread(target=self._run, name="startup", daemon=True).start()
+
+    def _run(self):
+        p = self.profiler
+        try:
+            with p.stage("import memory.embeddings"):
+                from memory import embeddings
+            # Encoder loads in parallel with the Mongo reads below
+            warmup = embeddings.warm_up(background=True, profiler=p)
+
+            with p.stage("import memory stores"):
+                from memory.session_manager import SessionManager
+            with p.stage("import llm + parser"):
+                from memory.npc_and_quest_parser import parse_llm_output  # noqa: F401
+                from memory.summarizer import summarize_for_memory  # noqa: F401
+                from llm.prompt_builder import build_prompt  # noqa: F401
+                from llm.context_assembler import ContextAssembler  # noqa: F401
+                from llm.turn_engine import TurnEngine  # noqa: F401
+                from llm.backends import get_backend
+            with p.stage("init LLM backend"):
+                get_backend()
+
+            with p.stage("connect storage"):
+                from memory.storage import get_client
+                get_client()
+            with p.stage("load campaign"):
+                # Memories, quest log and recent-summary cache, scoped to this campaign
+                manager = SessionManager()
+                campaign = manager.acquire(self.campaign_id)
+
+            self._state = SimpleNamespace(manager=manager, campaign=campaign, warmup=warmup)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def wait(self):
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._state
+
+
+def confirm_quest(quest):
+    """Ask the player whether to accept an optional quest."""
+    try:
+        player_choice = get_player_input("Do you want to accept this quest? (yes/no) ")
+    except TypeError:
+        player_choice = input("Do you want to accept this quest? (yes/no) ")
+    return player_choice.strip().lower() in ["yes", "y"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Dungeon Master (CLI)")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Wait for initialization and print where import/init time went before the first prompt."
     )
-
-    # Generate DM response
-    response = generate_response(prompt)
-    dm_text, npcs, quests = parse_llm_output(response)
-    display_output(dm_text)
-
-    # Summarize and persist story context
-    summary = summarize_for_memory(dm_text)
-    summary_emb = embed_text(summary)
-    persistent_mem.add_memory(summary, summary_emb)
-
-    # update in-memory recent cache so future turns use it (no DB read)
-    recent_cache.append(summary)
-
-    # Update NPC memory
-    for npc in npcs:
-        npc_name = npc["npc_name"]
-        context = npc["context"]
-        if npc_name and context:
-            print(f"💬 Logging NPC interaction: {npc_name} -> {context[:60]}...")
-            character_mem.add_interaction(npc_name, context)
-        else:
-            print(f"⚠️ Skipped invalid NPC entry: {npc}")
-
-    # Handle quests
-    for quest in quests:
-        quest_name = quest["quest_name"]
-        is_mandatory = quest.get("mandatory", False)
-
-        # --- Mandatory Main Storyline Quests ---
-        if is_mandatory:
-            if quest_log.get_active_quest_by_name(quest_name) is None:
-                quest_log.add_quest(
-                    quest_name=quest_name,
-                    summary=quest["description"],
-                    reward=quest.get("reward", "unknown reward"),
-                    mandatory=True
-                )
-                display_output(f"📜 Main Quest Added: {quest_name}")
-            else:
-                quest_log.update_progress(
-                    quest_name,
-                    increment=1,
-                    new_summary=quest["description"]
-                )
-                display_output(f"📜 Main Quest Progress Updated: {quest_name}")
-
-        # --- Optional Side Quests ---
-        else:
-            # Only offer to accept if not already active
-            if quest_log.get_active_quest_by_name(quest_name) is None:
-                display_output(f"🗺️ Optional Quest Available: {quest_name}\nDescription: {quest['description']}")
-                try:
-                    player_choice = get_player_input("Do you want to accept this quest? (yes/no) ").strip().lower()
-                except TypeError:
-                    player_choice = input("Do you want to accept this quest? (yes/no) ").strip().lower()
-                except Exception:
-                    player_choice = get_player_input().strip().lower()
-                if player_choice in ["yes", "y"]:
-                    new_quest = quest_log.add_quest(
-                        quest_name=quest_name,
-                        summary=quest["description"],
-                        reward=quest.get("reward", "unknown reward"),
-                        mandatory=False
-                    )
-                    display_output(f"✅ Optional Quest Accepted: {quest_name}")
-                    print(f"   -> DB id: {new_quest.get('_id')}")
-                else:
-                    display_output(f"❌ Optional Quest Declined: {quest_name}")
-            else:
-                quest_log.update_progress(
-                    quest_name,
-                    increment=1,
-                    new_summary=quest["description"]
-                )
-                display_output(f"📜 Optional Quest Progress Updated: {quest_name}")
-
-    # Abandon quests mid-way
-    if "abandon quest" in player_input.lower():
-        quest_log.abandon_all_quests()
-        display_output("🛑 All active quests abandoned. No rewards received.")
+    parser.add_argument(
+        "--campaign",
+        default=None,
+        help="Campaign to play (letters, digits, '-' and '_'); each campaign has its own memories and quests."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = StartupProfiler(enabled=args.profile_startup)
+    from utils.config import DEFAULT_CAMPAIGN
+    startup = BackgroundStartup(profiler, args.campaign or DEFAULT_CAMPAIGN)
+
+    print("🛡️ AI Dungeon Master is ready! Type 'start' to continue or 'exit' to quit.\n")
+    print("📜 General Rules:")
+    print("- Each turn, you (the player) provide input to interact with the world.")
+    print("- You may talk to NPCs, explore locations, solve puzzles, or accept quests.")
+    print("- Optional side quests can be accepted or declined; main storyline quests must be completed.")
+    print("- Your progress in quests, items obtained, and key choices affect the main storyline.")
+    print("- You can type 'abandon quest' to give up on optional quests (no rewards).")
+    print("- Have fun and immerse yourself in the world of 'The Shattered Crown'!\n")
+    profiler.mark("prompt ready")
+
+    if args.profile_startup:
+        ready = startup.wait()
+        if ready.warmup is not None:
+            ready.warmup.join()
+        print("⏱️ Startup profile:")
+        print(profiler.report() + "\n")
+
+    # Player can type while startup finishes; the first turn waits for it
+    state = None
+
+    while True:
+        player_input = get_player_input()
+        if player_input.lower() in ["exit", "quit"]:
+            print("Exiting AI Dungeon Master...")
+            if state is not None:
+                # Drains pending background writes, then snapshots the indexes
+                # so the next start only fetches newer documents
+                print("⏳ Saving the last turn...")
+                state.manager.release(state.campaign)
+                state.manager.close()
+                from memory.storage import close_client
+                close_client()
+                from utils.metrics import get_metrics
+                get_metrics().close()
+            from memory.embeddings import embedding_cache_stats, flush_embedding_cache
+            flush_embedding_cache()
+            stats = embedding_cache_stats()
+            print(f"🧮 Embedding cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, {stats['misses']} misses")
+            break
+
+        if state is None:
+            state = startup.wait()
+            from llm.turn_engine import TurnEngine
+            engine = TurnEngine(state.campaign)
+
+        engine.play(player_input, render=display_stream, confirm_quest=confirm_quest, notify=display_output)
+
+if __name__ == "__main__":
+    main()
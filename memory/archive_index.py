@@ -0,0 +1,324 @@
+"""
+Approximate nearest-neighbour index over the full long-term memory history.
+
+PersistentMemory keeps an exact vector window over the newest memories; this
+archive covers every memory ever stored, so events older than the window can
+still be retrieved. It is a FAISS IVF-PQ index (inner product over normalized
+vectors, ~`m` bytes per memory) plus a small exact buffer of recent additions:
+
+- `add` appends to the pending buffer; every `merge_every` additions the
+  buffer is encoded into the IVF-PQ index on a background thread (compaction).
+- Once the history grows `rebuild_growth` times past the size the index was
+  trained on (or reaches `min_train` with no index yet), the index is retrained
+  and rebuilt in the background by streaming the full history from `source`;
+  searches keep using the old index until the new one is swapped in.
+- Rows are kept in key order (keys are 12-byte Mongo ObjectIds, which grow
+  over time), so `search(..., below=key)` restricts results to memories older
+  than `key` with a row-range selector instead of a per-query mask.
+
+Scores are approximate; callers re-rank the candidates with exact vectors.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from memory.vector_store import _top_k
+from utils.config import (
+    ARCHIVE_NPROBE, ARCHIVE_MIN_TRAIN, ARCHIVE_MERGE_EVERY,
+    ARCHIVE_REBUILD_GROWTH, ARCHIVE_TRAIN_SAMPLE, ARCHIVE_PQ_BYTES
+)
+
+KEY_DTYPE = "S12"
+
+
+def _pq_subquantizers(dim, target=ARCHIVE_PQ_BYTES):
+    """Largest divisor of `dim` that is <= `target` (PQ needs dim % m == 0)."""
+    for m in range(min(target, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _reservoir_sample(batches, capacity, rng):
+    """Uniform sample of up to `capacity` vectors from a stream of (keys, vectors) batches."""
+    sample, seen = None, 0
+    for _, vectors in batches:
+        for vector in vectors:
+            if sample is None:
+                sample = np.empty((capacity, vector.shape[0]), dtype="float32")
+            if seen < capacity:
+                sample[seen] = vector
+            else:
+                slot = rng.integers(0, seen + 1)
+                if slot < capacity:
+                    sample[slot] = vector
+            seen += 1
+    if sample is None:
+        return None, 0
+    return sample[:min(seen, capacity)], seen
+
+
+class _PendingBuffer:
+    """Exact buffer of recent additions: keys plus a growable float32 matrix."""
+
+    def __init__(self):
+        self.keys = []
+        self._vectors = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def append(self, key, vector):
+        n = len(self.keys)
+        if self._vectors is None:
+            self._vectors = np.empty((64, vector.shape[0]), dtype="float32")
+        elif n == self._vectors.shape[0]:
+            grown = np.empty((2 * n, self._vectors.shape[1]), dtype="float32")
+            grown[:n] = self._vectors
+            self._vectors = grown
+        self._vectors[n] = vector
+        self.keys.append(bytes(key))
+
+    def vectors(self):
+        if self._vectors is None:
+            return np.empty((0, 0), dtype="float32")
+        return self._vectors[:len(self.keys)]
+
+    def keep_newer_than(self, last):
+        """Drop entries whose key is <= `last` (keys are in order, so this is a prefix)."""
+        cut = 0
+        while cut < len(self.keys) and self.keys[cut] <= last:
+            cut += 1
+        if cut:
+            rest = self.vectors()[cut:]
+            self.keys = self.keys[cut:]
+            self._vectors = rest.copy() if len(rest) else None
+
+
+class ArchiveIndex:
+    """
+    `source(after=None)` must yield (keys, vectors) batches of the stored
+    history in key order, restricted to keys greater than `after` when given;
+    without a source the archive never rebuilds and stays exact-only until
+    `rebuild(source)` is called.
+    """
+
+    def __init__(self, source=None, nprobe=ARCHIVE_NPROBE, min_train=ARCHIVE_MIN_TRAIN,
+                 merge_every=ARCHIVE_MERGE_EVERY, rebuild_growth=ARCHIVE_REBUILD_GROWTH,
+                 train_sample=ARCHIVE_TRAIN_SAMPLE):
+        self.source = source
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.merge_every = merge_every
+        self.rebuild_growth = rebuild_growth
+        self.train_sample = train_sample
+        self.dim = None
+
+        self._index = None                          # trained IVF-PQ; row i <-> self._keys[i]
+        self._keys = np.empty(0, dtype=KEY_DTYPE)
+        self._trained_size = 0
+        self._pending = _PendingBuffer()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-archive")
+        self._maintenance = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys) + len(self._pending)
+
+    @property
+    def nbytes(self):
+        """Approximate resident size: PQ codes and ids, coarse centroids, keys and the pending buffer."""
+        with self._lock:
+            size = self._keys.nbytes + self._pending.vectors().nbytes
+            if self._index is not None:
+                size += self._index.ntotal * (self._index.code_size + 8) + self._index.nlist * self._index.d * 4
+            return size
+
+    @property
+    def last_key(self):
+        """Newest key in the archive (bytes), or None if empty."""
+        with self._lock:
+            if self._pending:
+                return self._pending.keys[-1]
+            return self._keys[-1].ljust(12, b"\0") if len(self._keys) else None
+
+    # --- writes ---
+    def add(self, key, vector):
+        """Append one vector; `key` must be newer than every key already added."""
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vector.shape[0]
+            self._pending.append(key, vector)
+        self._schedule()
+
+    def _needs_rebuild(self):
+        total = len(self._keys) + len(self._pending)
+        if self.source is None:
+            return False
+        if self._index is None:
+            return total >= self.min_train
+        return total >= self.rebuild_growth * self._trained_size
+
+    def _schedule(self):
+        with self._lock:
+            if self._maintenance is not None and not self._maintenance.done():
+                return
+            if not (self._needs_rebuild() or (self._index is not None and len(self._pending) >= self.merge_every)):
+                return
+            self._maintenance = self._executor.submit(self._maintain)
+
+    def _maintain(self):
+        try:
+            with self._lock:
+                rebuild = self._needs_rebuild()
+            if rebuild:
+                self.rebuild()
+            else:
+                self.merge_pending()
+        except Exception as e:
+            print(f"⚠️ Memory archive maintenance failed: {e}")
+
+    def merge_pending(self):
+        """Encode the pending buffer into the IVF-PQ index (no-op before the first build)."""
+        with self._lock:
+            if self._index is None or not self._pending:
+                return
+            self._index.add(self._pending.vectors())
+            self._keys = np.concatenate([self._keys, np.array(self._pending.keys, dtype=KEY_DTYPE)])
+            self._pending = _PendingBuffer()
+
+    def rebuild(self, source=None):
+        """Train a fresh IVF-PQ index on a sample of the history and re-add everything."""
+        source = source or self.source
+        rng = np.random.default_rng(0)
+        sample, total = _reservoir_sample(source(), self.train_sample, rng)
+        if sample is None:
+            return
+        dim = sample.shape[1]
+        nlist = max(1, min(int(4 * math.sqrt(total)), len(sample) // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8, faiss.METRIC_INNER_PRODUCT)
+        index.pq.cp.niter = 10  # PQ k-means dominates training time; re-ranking absorbs the small loss
+        index.train(sample)
+
+        key_chunks = []
+        for keys, vectors in source():
+            index.add(np.ascontiguousarray(vectors, dtype="float32"))
+            key_chunks.append(np.asarray(keys, dtype=KEY_DTYPE))
+        keys = np.concatenate(key_chunks) if key_chunks else np.empty(0, dtype=KEY_DTYPE)
+        last = keys[-1].ljust(12, b"\0") if len(keys) else b""
+
+        with self._lock:
+            # Additions that raced the rebuild (newer than what it streamed) stay pending
+            self._pending.keep_newer_than(last)
+            self._index, self._keys = index, keys
+            self._trained_size = len(keys)
+            self.dim = dim
+
+    def catch_up(self, after=None):
+        """
+        Stream history newer than `after` from `source` into the archive. Stops
+        early and schedules a background rebuild once that would be cheaper.
+        """
+        for keys, vectors in self.source(after=after):
+            with self._lock:
+                for key, vector in zip(keys, vectors):
+                    self._pending.append(key, np.asarray(vector, dtype="float32"))
+                if self.dim is None and self._pending:
+                    self.dim = self._pending.vectors().shape[1]
+                rebuild = self._needs_rebuild()
+            if rebuild:
+                break
+        self._schedule()
+
+    def wait(self):
+        """Block until any scheduled merge/rebuild has finished."""
+        future = self._maintenance
+        if future is not None:
+            future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    # --- reads ---
+    def search(self, query, top_k, below=None, above=None):
+        """
+        Return up to `top_k` (key, approximate score) pairs, best first,
+        restricted to keys strictly between `above` and `below` when given.
+        """
+        query = np.asarray(query, dtype="float32").reshape(1, -1)
+        with self._lock:
+            hits = []
+            rows = len(self._keys) if below is None else int(np.searchsorted(self._keys, bytes(below), side="left"))
+            first = 0 if above is None else int(np.searchsorted(self._keys, bytes(above), side="right"))
+            if self._index is not None and rows > first:
+                params = faiss.SearchParametersIVF(nprobe=self.nprobe, sel=faiss.IDSelectorRange(first, rows))
+                scores, ids = self._index.search(query, top_k, params=params)
+                hits = [
+                    (self._keys[i].ljust(12, b"\0"), float(s))
+                    for i, s in zip(ids[0], scores[0]) if i >= 0
+                ]
+            if self._pending:
+                keys = self._pending.keys
+                # Keys are in order, so "older than `below`" is a prefix
+                start = 0 if above is None else bisect.bisect_right(keys, bytes(above))
+                count = len(keys) if below is None else bisect.bisect_left(keys, bytes(below))
+                if count > start:
+                    scores = self._pending.vectors()[start:count] @ query[0]
+                    hits += [(keys[start + i], float(scores[i])) for i in _top_k(scores, top_k)]
+        hits.sort(key=lambda h: -h[1])
+        return hits[:top_k]
+
+    # --- persistence ---
+    def save(self, path):
+        """Write the index, its keys and the pending buffer to `path`; meta.json is written last."""
+        with self._lock:
+            if self.dim is None:
+                return
+            os.makedirs(path, exist_ok=True)
+            if self._index is not None:
+                faiss.write_index(self._index, os.path.join(path, "archive.faiss"))
+            np.save(os.path.join(path, "keys.npy"), self._keys)
+            np.save(os.path.join(path, "pending_keys.npy"), np.array(self._pending.keys, dtype="V12"))
+            np.save(os.path.join(path, "pending_vectors.npy"), self._pending.vectors())
+            meta = {
+                "trained_size": self._trained_size,
+                "dim": self.dim,
+                "rows": len(self._keys),
+                "pending": len(self._pending),
+            }
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    def load(self, path):
+        """Load a saved archive; returns False if there is none (or it is inconsistent)."""
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            index = faiss.read_index(os.path.join(path, "archive.faiss")) if meta["rows"] else None
+            keys = np.load(os.path.join(path, "keys.npy"))
+            pending_keys = np.load(os.path.join(path, "pending_keys.npy"))
+            pending_vectors = np.load(os.path.join(path, "pending_vectors.npy"))
+        except (OSError, ValueError, KeyError, RuntimeError):
+            return False
+        if (index is not None and index.ntotal != meta["rows"]) or len(keys) != meta["rows"] \
+                or len(pending_keys) != meta["pending"] or len(pending_vectors) != meta["pending"]:
+            return False
+        with self._lock:
+            self._index, self._keys = index, keys.astype(KEY_DTYPE)
+            self._pending = _PendingBuffer()
+            for key, vector in zip(pending_keys, pending_vectors):
+                self._pending.append(key.tobytes(), vector)
+            self._trained_size = meta["trained_size"]
+            self.dim = meta["dim"]
+        return True
@@ -1,117 +1,184 @@
-import faiss
+from collections import deque
+
 import numpy as np
-from pymongo import MongoClient
-from memory.embeddings import embed_text
-from utils.config import MONGO_URI, MONGO_DB_NAME, CHARACTER_COLLECTION
+from bson import ObjectId
+from memory.storage import get_client, scoped, campaign_path, check_campaign_id, CAMPAIGN_FIELD
+from memory.embedding_codec import encode_embedding, decode_embedding
+from memory.embeddings import embed_text, embed_texts
+from memory.schema import CHARACTER_VECTOR_FIELDS, CHARACTER_TEXT_FIELDS
+from memory.snapshots import save_snapshot, load_snapshot
+from memory.vector_store import SharedVectorIndex
+from utils.config import (
+    MONGO_DB_NAME, CHARACTER_COLLECTION,
+    CHARACTER_INDEX_PATH, SNAPSHOT_EVERY_N_WRITES, DEFAULT_CAMPAIGN
+)
+
+MAX_NPC_MEMORIES = 50  # in-memory interactions kept per NPC
 
 
 class CharacterMemory:
-    def __init__(self):
-        # In-memory store for last 50 memories per NPC
-        self.npc_memories = {}
+    def __init__(self, snapshot_path=CHARACTER_INDEX_PATH, client=None, campaign_id=DEFAULT_CAMPAIGN):
+        self.campaign_id = check_campaign_id(campaign_id)
+
+        # One vector index holding every NPC interaction
+        self._index = SharedVectorIndex()
 
-        # FAISS indices per NPC
-        self.npc_indices = {}
+        # NPC name -> ids of their last 50 interactions (oldest first)
+        self.npc_ids = {}
+
+        # Newest Mongo _id reflected in the index (high-water mark)
+        self._watermark = None
+        self.snapshot_path = campaign_path(snapshot_path, campaign_id)
+        self._unsaved = 0
 
         # MongoDB connection for persistence
-        client = MongoClient(MONGO_URI)
+        client = client or get_client()
         db = client[MONGO_DB_NAME]
         self.collection = db[CHARACTER_COLLECTION]
 
-        # Load memories and initialize FAISS indices
+        # Load memories into the shared index
         self._load_existing_memories()
 
-    def _load_existing_memories(self):
-        """Load the last 50 interactions per NPC from MongoDB and build FAISS indices."""
-        npc_data = {}
-
-        for doc in self.collection.find({}, {"npc_name": 1, "interaction": 1, "embedding": 1}):
-            npc_name = doc["npc_name"]
-            if npc_name not in npc_data:
-                npc_data[npc_name] = []
-            npc_data[npc_name].append({
-                "text": doc["interaction"],
-                "embedding": np.array(doc["embedding"], dtype="float32")
-            })
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the shared interaction index."""
+        return self._index.nbytes
 
-        for npc_name, interactions in npc_data.items():
-            # Keep only the latest 50
-            interactions = interactions[-50:]
-            self.npc_memories[npc_name] = interactions
-
-            # Build FAISS index
-            if interactions:
-                dim = interactions[0]["embedding"].shape[0]
-                index = faiss.IndexFlatIP(dim)
-                embeddings = np.array([e["embedding"] for e in interactions], dtype="float32")
-                index.add(embeddings)
-                self.npc_indices[npc_name] = index
-
-        print(f"✅ Loaded FAISS memory for {len(npc_data)} NPC(s) from MongoDB")
-
-    def _rebuild_faiss_index(self, npc_name: str):
-        """Rebuild FAISS index for an NPC (when their memory list changes)."""
-        entries = self.npc_memories.get(npc_name, [])
-        if not entries:
+    def _load_existing_memories(self):
+        """
+        Load the last 50 interactions per NPC: from the on-disk snapshot if there
+        is one, then only documents newer than its watermark from MongoDB.
+        """
+        query = {}
+        snapshot = load_snapshot(self.snapshot_path) if self.snapshot_path else None
+        if snapshot is not None:
+            vectors, payloads, meta = snapshot
+            for (npc_name, text), vector in zip(payloads, vectors):
+                self._remember(npc_name, text, vector)
+            if meta.get("watermark"):
+                self._watermark = ObjectId(meta["watermark"])
+                query = {"_id": {"$gt": self._watermark}}
+
+        new_docs = 0
+        for doc in self.collection.find(scoped(self.campaign_id, query), CHARACTER_VECTOR_FIELDS).sort("_id", 1):
+            self._remember(
+                doc["npc_name"],
+                doc["interaction"],
+                decode_embedding(doc["embedding"])
+            )
+            self._watermark = doc["_id"]
+            new_docs += 1
+
+        self._unsaved += new_docs
+        self._maybe_snapshot(force=snapshot is None)
+
+        print(f"✅ Loaded FAISS memory for {len(self.npc_ids)} NPC(s) ({new_docs} new from MongoDB)")
+
+    def _maybe_snapshot(self, force=False):
+        if self._unsaved >= SNAPSHOT_EVERY_N_WRITES or (force and self._unsaved):
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """Write every NPC's retained interactions and the Mongo watermark to `snapshot_path`."""
+        if not self.snapshot_path or not self.npc_ids:
             return
-        dim = entries[0]["embedding"].shape[0]
-        index = faiss.IndexFlatIP(dim)
-        embeddings = np.array([e["embedding"] for e in entries], dtype="float32")
-        index.add(embeddings)
-        self.npc_indices[npc_name] = index
-
-    def add_interaction(self, npc_name: str, interaction_text: str):
-        """Add a new interaction to memory and persist it."""
+        payloads = []
+        ids = []
+        for npc_name, npc_ids in self.npc_ids.items():
+            for i in npc_ids:
+                payloads.append([npc_name, self._index.get(i)])
+                ids.append(i)
+        save_snapshot(
+            self.snapshot_path,
+            self._index.vectors_for(ids),
+            payloads,
+            {"watermark": str(self._watermark) if self._watermark else None, "dim": self._index.dim}
+        )
+        self._unsaved = 0
+
+    def _remember(self, npc_name: str, interaction_text: str, embedding_array):
+        """Insert one interaction into the shared index, evicting the NPC's oldest past 50."""
+        ids = self.npc_ids.setdefault(npc_name, deque())
+        ids.append(self._index.add(embedding_array, interaction_text))
+        if len(ids) > MAX_NPC_MEMORIES:
+            self._index.remove(ids.popleft())
+
+    def add_interaction(self, npc_name: str, interaction_text: str, uow=None):
+        """Add a new interaction to memory and persist it (or queue it on `uow`)."""
         embedding_array = np.array(embed_text(interaction_text), dtype="float32")
-        entry = {"text": interaction_text, "embedding": embedding_array}
 
         # In-memory store (limit to 50)
-        if npc_name not in self.npc_memories:
-            self.npc_memories[npc_name] = []
-        self.npc_memories[npc_name].append(entry)
-        if len(self.npc_memories[npc_name]) > 50:
-            self.npc_memories[npc_name] = self.npc_memories[npc_name][-50:]
-
-        # Rebuild FAISS index for this NPC
-        self._rebuild_faiss_index(npc_name)
+        self._remember(npc_name, interaction_text, embedding_array)
 
         # MongoDB persistence
         doc = {
+            CAMPAIGN_FIELD: self.campaign_id,
             "npc_name": npc_name,
             "interaction": interaction_text,
-            "embedding": embedding_array.tolist()
+            "embedding": encode_embedding(embedding_array)
         }
-        self.collection.insert_one(doc)
+        if uow is not None:
+            uow.insert_one(self.collection, doc)
+        else:
+            self.collection.insert_one(doc)
+        self._watermark = doc["_id"]
+        self._unsaved += 1
+        self._maybe_snapshot()
 
         # print(f"💬 Logged NPC interaction: {npc_name} -> {interaction_text[:50]}...")
 
+    def add_interactions(self, interactions, embeddings=None, uow=None):
+        """
+        Add several (npc_name, interaction_text) pairs and persist them together
+        (or queue them on `uow` for the turn's bulk flush).
+        `embeddings` is an optional (n, d) array already computed by the caller;
+        otherwise all texts are embedded in one batch.
+        """
+        if not interactions:
+            return
+        if embeddings is None:
+            embeddings = embed_texts([text for _, text in interactions])
+        embeddings = np.asarray(embeddings, dtype="float32")
+
+        docs = []
+        for (npc_name, interaction_text), embedding_array in zip(interactions, embeddings):
+            self._remember(npc_name, interaction_text, embedding_array)
+            docs.append({
+                CAMPAIGN_FIELD: self.campaign_id,
+                "npc_name": npc_name,
+                "interaction": interaction_text,
+                "embedding": encode_embedding(embedding_array)
+            })
+        if uow is not None:
+            uow.insert_many(self.collection, docs)
+        else:
+            self.collection.insert_many(docs)
+        self._watermark = docs[-1]["_id"]
+        self._unsaved += len(docs)
+        self._maybe_snapshot()
+
     def get_memory(self, npc_name: str, query: str = None, top_k: int = 5):
         """
         Retrieve up to `top_k` relevant memories for an NPC.
         If query is None, returns the last `top_k` interactions.
-        Uses prebuilt FAISS index for semantic similarity search.
+        Uses the shared index, filtered to this NPC's ids, for semantic search.
         """
-        if npc_name not in self.npc_memories or not self.npc_memories[npc_name]:
+        ids = self.npc_ids.get(npc_name)
+        if not ids:
             return []
 
-        entries = self.npc_memories[npc_name]
-        texts = [e["text"] for e in entries]
-
         # If no query, return last few
         if query is None:
-            return texts[-top_k:]
-
-        # Semantic recall using prebuilt FAISS index
-        index = self.npc_indices.get(npc_name)
-        if index is None or index.ntotal == 0:
-            return texts[-top_k:]
+            return [self._index.get(i) for i in list(ids)[-top_k:]]
 
-        query_emb = np.array([embed_text(query)], dtype="float32")
-        scores, indices = index.search(query_emb, top_k)
+        query_emb = np.array(embed_text(query), dtype="float32")
+        return [text for _, _, text in self._index.search(query_emb, top_k, ids=list(ids))]
 
-        return [texts[i] for i in indices[0] if 0 <= i < len(texts)]
+    def npc_names(self):
+        """Names of every NPC with interactions in memory."""
+        return list(self.npc_ids)
 
     def get_all_interactions(self, npc_name: str):
         """Fetch all persisted NPC interactions from MongoDB."""
-        docs = self.collection.find({"npc_name": npc_name})
+        docs = self.collection.find(scoped(self.campaign_id, {"npc_name": npc_name}), CHARACTER_TEXT_FIELDS).sort("_id", 1)
         return [doc["interaction"] for doc in docs]
@@ -0,0 +1,219 @@
+"""
+Hierarchical consolidation of per-turn memories into scenes and chapters.
+
+A background job groups every SCENE_SIZE consecutive turn summaries (leaving
+the newest CONSOLIDATION_LAG turns alone) into a scene summary, and every
+CHAPTER_SIZE scenes into a chapter summary, using `summarize_for_memory`.
+Each level is embedded, stored in the consolidated collection with links to
+its children (turn or scene _ids) and kept in a small exact index.
+
+Background passes run after every SCENE_SIZE new turns and stop after
+CONSOLIDATION_MAX_SUMMARIES summaries. Their summarizer calls share a
+process-wide budget of CONSOLIDATION_REQUESTS_PER_MINUTE, so bookkeeping
+never crowds live DM turns out of the API key's rate limit. A long existing
+history is consolidated gradually, or at once, offline:
+
+    python -m memory.consolidation --campaign default
+
+`candidates` goes coarse to fine: best chapters -> best scenes inside them
+(plus scenes not yet in a chapter) -> the _ids of those scenes' turns.
+PersistentMemory reads the turns together with its archive hits, from its
+cache of older memories or in one scoped query, and scores them exactly.
+Only a handful of scene/chapter vectors are scanned per query, however long
+the campaign gets.
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from llm.resilience import TokenBucket
+from memory.embedding_codec import encode_embedding, decode_embedding
+from memory.storage import scoped, check_campaign_id, get_client, CAMPAIGN_FIELD
+from memory.vector_store import SharedVectorIndex
+from utils.config import (
+    CONSOLIDATED_COLLECTION, SCENE_SIZE, CHAPTER_SIZE, CONSOLIDATION_LAG,
+    HIERARCHY_CHAPTER_PROBE, HIERARCHY_SCENE_PROBE, DEFAULT_CAMPAIGN,
+    CONSOLIDATION_MAX_SUMMARIES, CONSOLIDATION_REQUESTS_PER_MINUTE, MONGO_DB_NAME, MEMORY_COLLECTION
+)
+
+SCENE, CHAPTER = 1, 2
+
+# Shared by every campaign's background passes
+_budget = TokenBucket(CONSOLIDATION_REQUESTS_PER_MINUTE / 60, 1) if CONSOLIDATION_REQUESTS_PER_MINUTE else None
+
+
+class MemoryHierarchy:
+    def __init__(self, db, memories, scene_size=SCENE_SIZE, chapter_size=CHAPTER_SIZE, lag=CONSOLIDATION_LAG,
+                 campaign_id=DEFAULT_CAMPAIGN):
+        self.campaign_id = campaign_id
+        self.collection = db[CONSOLIDATED_COLLECTION]
+        self.memories = memories
+        self.scene_size = scene_size
+        self.chapter_size = chapter_size
+        self.lag = lag
+
+        self._levels = {SCENE: SharedVectorIndex(), CHAPTER: SharedVectorIndex()}
+        self._scene_ids = {}         # scene doc _id -> scene index id
+        self._unchaptered = []       # scene index ids not yet grouped into a chapter
+        self.covered_through = None  # _id of the newest turn inside a scene
+        self._turns_since_check = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-consolidation")
+        self._job = None
+        self._closing = threading.Event()
+
+        self._load()
+
+    def __len__(self):
+        return len(self._levels[SCENE]) + len(self._levels[CHAPTER])
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self._levels.values())
+
+    def _load(self):
+        chaptered = set()
+        for doc in self.collection.find(scoped(self.campaign_id)).sort("_id", 1):
+            entry = {"_id": doc["_id"], "summary": doc["summary"], "children": doc["children"]}
+            index_id = self._levels[doc["level"]].add(decode_embedding(doc["embedding"]), entry)
+            if doc["level"] == SCENE:
+                self._scene_ids[doc["_id"]] = index_id
+                self.covered_through = doc["children"][-1]
+            else:
+                chaptered.update(doc["children"])
+        self._unchaptered = [i for doc_id, i in self._scene_ids.items() if doc_id not in chaptered]
+
+    # --- consolidation ---
+    def note_turn(self):
+        """Call after each new turn memory; schedules a consolidation pass every `scene_size` turns."""
+        self._turns_since_check += 1
+        if self._turns_since_check < self.scene_size:
+            return
+        if self._job is not None and not self._job.done():
+            return
+        self._turns_since_check = 0
+        self._job = self._executor.submit(self._run_safely)
+
+    def _run_safely(self):
+        try:
+            self.consolidate(max_summaries=CONSOLIDATION_MAX_SUMMARIES, budget=_budget)
+        except Exception as e:
+            print(f"⚠️ Memory consolidation failed: {e}")
+
+    def _take_budget(self, budget):
+        """Wait for a summarizer slot from `budget`; False when closing."""
+        while not self._closing.is_set():
+            if budget is None or budget.try_acquire():
+                return True
+            self._closing.wait(1.0)
+        return False
+
+    def consolidate(self, max_summaries=None, budget=None):
+        """
+        Group complete runs of old turns into scenes, then scenes into
+        chapters, stopping after `max_summaries` summarizer calls (None: all).
+        Each call first takes a token from `budget` (a TokenBucket), if given.
+        Returns the number of summaries written.
+        """
+        from memory.embeddings import embed_texts
+        from memory.summarizer import summarize_for_memory
+
+        query = {"_id": {"$gt": self.covered_through}} if self.covered_through else {}
+        turns = list(self.memories.find(scoped(self.campaign_id, query), {"summary": 1}).sort("_id", 1))
+        ready = max(0, len(turns) - self.lag) // self.scene_size * self.scene_size
+        written = 0
+
+        def allowed():
+            return (max_summaries is None or written < max_summaries) and self._take_budget(budget)
+
+        for start in range(0, ready, self.scene_size):
+            if not allowed():
+                return written
+            group = turns[start:start + self.scene_size]
+            self._store(SCENE, [t["summary"] for t in group], [t["_id"] for t in group], summarize_for_memory, embed_texts)
+            written += 1
+
+        while len(self._unchaptered) >= self.chapter_size and allowed():
+            with self._lock:
+                group = self._unchaptered[:self.chapter_size]
+                scenes = [self._levels[SCENE].get(i) for i in group]
+            self._store(CHAPTER, [s["summary"] for s in scenes], [s["_id"] for s in scenes], summarize_for_memory, embed_texts)
+            written += 1
+        return written
+
+    def _store(self, level, texts, children, summarize, embed):
+        summary = summarize("\n".join(texts))
+        vector = np.asarray(embed([summary])[0], dtype="float32")
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        doc = {CAMPAIGN_FIELD: self.campaign_id, "level": level, "summary": summary, "embedding": encode_embedding(vector), "children": children}
+        self.collection.insert_one(doc)
+
+        entry = {"_id": doc["_id"], "summary": summary, "children": children}
+        with self._lock:
+            index_id = self._levels[level].add(vector, entry)
+            if level == SCENE:
+                self._scene_ids[doc["_id"]] = index_id
+                self._unchaptered.append(index_id)
+                self.covered_through = children[-1]
+            else:
+                self._unchaptered = self._unchaptered[len(children):]
+
+    def wait(self):
+        """Block until a running consolidation pass has finished."""
+        if self._job is not None:
+            self._job.result()
+
+    def close(self):
+        self._closing.set()  # a pass waiting for budget stops instead of holding up shutdown
+        self._executor.shutdown(wait=True)
+
+    # --- retrieval ---
+    def candidates(self, query_emb, below=None):
+        """
+        Return (scene/chapter (summary, score, vector) hits, _ids of the turns
+        inside the best scenes). Turns with _id >= `below` (already in the
+        exact window) are left out; the caller fetches and scores the rest.
+        """
+        with self._lock:
+            scenes, chapters = self._levels[SCENE], self._levels[CHAPTER]
+            if not len(scenes):
+                return [], []
+
+            chapter_hits = chapters.search(query_emb, HIERARCHY_CHAPTER_PROBE) if len(chapters) else []
+            candidate_scenes = list(self._unchaptered)
+            for _, _, chapter in chapter_hits:
+                candidate_scenes += [self._scene_ids[s] for s in chapter["children"] if s in self._scene_ids]
+            if not chapter_hits:
+                candidate_scenes = None  # no chapters yet: every scene is a candidate
+            scene_hits = scenes.search(query_emb, HIERARCHY_SCENE_PROBE, ids=candidate_scenes)
+
+            hits = [
+                (entry["summary"], score, chapters.vectors_for([i])[0]) for i, score, entry in chapter_hits
+            ] + [
+                (entry["summary"], score, scenes.vectors_for([i])[0]) for i, score, entry in scene_hits
+            ]
+            turn_ids = [t for _, _, entry in scene_hits for t in entry["children"] if below is None or t < below]
+        return hits, turn_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidate a campaign's whole turn history into scenes and chapters.")
+    parser.add_argument("--campaign", default=DEFAULT_CAMPAIGN)
+    args = parser.parse_args(argv)
+
+    db = get_client()[MONGO_DB_NAME]
+    hierarchy = MemoryHierarchy(db, db[MEMORY_COLLECTION], campaign_id=check_campaign_id(args.campaign))
+    try:
+        written = hierarchy.consolidate()
+    finally:
+        hierarchy.close()
+    print(f"✅ {args.campaign}: {written} scene/chapter summaries written "
+          f"({len(hierarchy._levels[SCENE])} scenes, {len(hierarchy._levels[CHAPTER])} chapters)")
+
+
+if __name__ == "__main__":
+    main()
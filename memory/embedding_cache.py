@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+KEY_BYTES = 16  # blake2b digest size used as the cache key
+
+
+def content_key(text: str, namespace: str = "") -> bytes:
+    """Hash `text` (scoped by model/backend namespace) into a fixed-size cache key."""
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(namespace.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.digest()
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only, memory-mapped embedding store that survives restarts.
+
+    Layout under `path`:
+    - meta.json:    {"dim": ..., "capacity": ..., "count": ...}
+    - keys.bin:     capacity x 16-byte content hashes (all-zero = empty row)
+    - vectors.bin:  capacity x dim float32 matrix
+
+    Rows are filled in order; once `capacity` rows are used, new embeddings
+    are simply not persisted (the in-process LRU still caches them).
+    `flush()` writes `count` only after both matrices are on disk, and a
+    reopened store trusts only that many rows, so rows written after the
+    last flush (possibly torn by a crash) are ignored and overwritten.
+    """
+
+    def __init__(self, path, capacity=50_000):
+        self.path = path
+        self.capacity = capacity
+        self.dim = None
+        self._keys = None
+        self._vectors = None
+        self._rows = {}
+        self._next = 0
+        self._flushed = 0
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.capacity = meta["capacity"]
+            self._open(meta["dim"], mode="r+", count=meta.get("count"))
+
+    def _open(self, dim, mode, count=None):
+        self.dim = dim
+        self._keys = np.memmap(
+            os.path.join(self.path, "keys.bin"), dtype=f"S{KEY_BYTES}", mode=mode, shape=(self.capacity,)
+        )
+        self._vectors = np.memmap(
+            os.path.join(self.path, "vectors.bin"), dtype="float32", mode=mode, shape=(self.capacity, dim)
+        )
+        # Stores written before `count` existed: trust every non-empty key
+        for row, key in enumerate(self._keys if count is None else self._keys[:count]):
+            if not key:
+                break
+            self._rows[bytes(key)] = row
+            self._next = row + 1
+        self._flushed = self._next
+
+    def _write_meta(self, count):
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "count": count}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _create(self, dim):
+        os.makedirs(self.path, exist_ok=True)
+        self.dim = dim
+        self._write_meta(0)
+        self._open(dim, mode="w+", count=0)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, key: bytes):
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors[row])
+
+    def put(self, key: bytes, vector):
+        if key in self._rows:
+            return
+        if self._vectors is None:
+            self._create(vector.shape[0])
+        if self._next >= self.capacity or vector.shape[0] != self.dim:
+            return
+        row = self._next
+        # Write the vector before the key so a crash never exposes a half-written row
+        self._vectors[row] = vector
+        self._keys[row] = key
+        self._rows[key] = row
+        self._next += 1
+
+    def flush(self):
+        """Write pending rows to disk, then record how many rows are valid."""
+        if self._vectors is None or self._next == self._flushed:
+            return
+        self._vectors.flush()
+        self._keys.flush()
+        self._write_meta(self._next)
+        self._flushed = self._next
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache: a bounded in-process LRU in front of an
+    optional DiskEmbeddingStore. Thread-safe.
+    """
+
+    def __init__(self, max_entries=4096, disk_store=None, namespace=""):
+        self.max_entries = max_entries
+        self.disk = disk_store
+        self.namespace = namespace
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_or_compute(self, text: str, compute):
+        """Return the cached embedding for `text`, calling `compute(text)` on a miss."""
+        key = content_key(text, self.namespace)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self.disk is not None:
+                vector = self.disk.get(key)
+                if vector is not None:
+                    vector.setflags(write=False)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+        vector = np.array(compute(text), dtype="float32")
+        vector.setflags(write=False)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put(key, vector)
+        return vector
+
+    def get_or_compute_many(self, texts, compute_many):
+        """
+        Return an (n, d) float32 array of embeddings for `texts`. All misses are
+        encoded with a single `compute_many(list_of_texts)` call.
+        """
+        keys = [content_key(t, self.namespace) for t in texts]
+        found = [None] * len(texts)
+        missing = {}  # key -> first position needing it
+        with self._lock:
+            for pos, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                elif self.disk is not None and (vector := self.disk.get(key)) is not None:
+                    vector.setflags(write=False)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                elif key in missing:
+                    # Duplicate text inside the same batch: encode it once
+                    self.hits += 1
+                    continue
+                else:
+                    missing[key] = pos
+                    continue
+                found[pos] = vector
+
+        if missing:
+            encoded = np.asarray(compute_many([texts[p] for p in missing.values()]), dtype="float32")
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vector = vector.copy()
+                    vector.setflags(write=False)
+                    self.misses += 1
+                    self._remember(key, vector)
+                    if self.disk is not None:
+                        self.disk.put(key, vector)
+                    missing[key] = vector
+            for pos, key in enumerate(keys):
+                if found[pos] is None:
+                    found[pos] = missing[key]
+
+        if not found:
+            return np.empty((0, 0), dtype="float32")
+        return np.stack(found)
+
+    def stats(self):
+        """Return hit/miss counters and current sizes."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "lru_size": len(self._lru),
+                "disk_size": len(self.disk) if self.disk is not None else 0,
+            }
+
+    def flush(self):
+        with self._lock:
+            if self.disk is not None:
+                self.disk.flush()
@@ -0,0 +1,65 @@
+"""
+Compact on-disk encoding for embeddings stored in MongoDB.
+
+Vectors are stored as a single `bson.Binary` in the `embedding` field instead
+of a BSON array of doubles (~11 bytes per element once keys and type tags are
+counted). The storage type is carried in a user-defined binary subtype:
+
+    0x80  float32, little-endian                      4 bytes/element
+    0x81  float16, little-endian                      2 bytes/element
+    0x82  int8 scalar-quantized, float32 scale prefix 1 byte/element + 4
+
+`decode_embedding` also accepts legacy list embeddings, so collections can be
+migrated lazily or with `python -m memory.migrate_embeddings`.
+"""
+import numpy as np
+from bson.binary import Binary
+
+from utils.config import EMBEDDING_STORAGE_DTYPE
+
+SUBTYPE_FLOAT32 = 0x80
+SUBTYPE_FLOAT16 = 0x81
+SUBTYPE_INT8 = 0x82
+
+STORAGE_SUBTYPES = {"float32": SUBTYPE_FLOAT32, "float16": SUBTYPE_FLOAT16, "int8": SUBTYPE_INT8}
+_SCALE = np.dtype("<f4")
+
+
+def encode_embedding(vector, dtype=EMBEDDING_STORAGE_DTYPE):
+    """Pack a 1-D vector into a Binary using `dtype` ("float32", "float16" or "int8")."""
+    if dtype not in STORAGE_SUBTYPES:
+        raise ValueError(f"Unsupported embedding storage dtype '{dtype}'")
+    vector = np.asarray(vector, dtype="float32")
+    if dtype == "float32":
+        data = vector.astype("<f4", copy=False).tobytes()
+    elif dtype == "float16":
+        data = vector.astype("<f2").tobytes()
+    else:
+        # Symmetric per-vector scale; the largest magnitude maps to +/-127
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        codes = np.clip(np.rint(vector / scale), -127, 127).astype("i1")
+        data = np.array(scale, dtype=_SCALE).tobytes() + codes.tobytes()
+    return Binary(data, STORAGE_SUBTYPES[dtype])
+
+
+def decode_embedding(value):
+    """
+    Return a float32 vector for a stored embedding. float32 binaries are
+    decoded as zero-copy read-only views over the document's bytes.
+    """
+    if isinstance(value, Binary):
+        if value.subtype == SUBTYPE_FLOAT32:
+            return np.frombuffer(value, dtype="<f4")
+        if value.subtype == SUBTYPE_FLOAT16:
+            return np.frombuffer(value, dtype="<f2").astype("float32")
+        if value.subtype == SUBTYPE_INT8:
+            scale = np.frombuffer(value, dtype=_SCALE, count=1)[0]
+            return np.frombuffer(value, dtype="i1", offset=_SCALE.itemsize).astype("float32") * scale
+        raise ValueError(f"Unknown embedding binary subtype {value.subtype:#x}")
+    # Legacy documents: BSON array of doubles
+    return np.asarray(value, dtype="float32")
+
+
+def is_packed(value):
+    return isinstance(value, Binary) and value.subtype in STORAGE_SUBTYPES.values()
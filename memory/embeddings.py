@@ -1,18 +1,131 @@
+import hashlib
 import os
+import threading
+
+import numpy as np
+from memory.embedding_cache import EmbeddingCache, DiskEmbeddingStore
+from utils.config import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_ENTRIES
 
 BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence")
 
 if BACKEND == "gemini":
-    import google.generativeai as genai
-    from utils.config import GEMINI_API_KEY
-    genai.configure(api_key=GEMINI_API_KEY)
+    MODEL_ID = "gemini:embed-text-3-large"
+elif BACKEND == "hash":
+    MODEL_ID = "hash:384"
+else:
+    MODEL_ID = "sentence:all-MiniLM-L6-v2"
+
+# The encoder is loaded on first use (or by warm_up), never at import time
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _load_backend():
+    """Import and initialize the embedding backend once; safe to call from any thread."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if BACKEND == "gemini":
+                    import google.generativeai as genai
+                    from utils.config import GEMINI_API_KEY
+                    genai.configure(api_key=GEMINI_API_KEY)
+                    _backend = genai
+                elif BACKEND == "hash":
+                    _backend = HashEncoder()
+                else:
+                    from sentence_transformers import SentenceTransformer
+                    _backend = SentenceTransformer("all-MiniLM-L6-v2")
+    return _backend
+
+
+class HashEncoder:
+    """
+    Model-free, deterministic stand-in encoder (EMBEDDING_BACKEND=hash): a unit
+    vector seeded by the text's hash. No semantics, but the same shape and
+    dtype as MiniLM, which is enough for offline benchmarks.
+    """
 
-    def embed_text(text: str) -> list[float]:
-        response = genai.embeddings.create(model="embed-text-3-large", input=text)
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+            v = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+            rows.append(v / np.linalg.norm(v))
+        return rows[0] if single else np.stack(rows)
+
+
+def _encode(text: str) -> list[float]:
+    backend = _load_backend()
+    if BACKEND == "gemini":
+        response = backend.embeddings.create(model="embed-text-3-large", input=text)
         return response.data[0].embedding
-else:
-    from sentence_transformers import SentenceTransformer
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    return backend.encode(text)
+
+
+def _encode_many(texts: list[str]):
+    backend = _load_backend()
+    if BACKEND == "gemini":
+        response = backend.embeddings.create(model="embed-text-3-large", input=texts)
+        return [d.embedding for d in response.data]
+    return backend.encode(texts, batch_size=64, convert_to_numpy=True)
+
+
+def warm_up(background=True, profiler=None):
+    """
+    Load the encoder ahead of the first embed call. With `background=True` this
+    runs on a daemon thread and returns it; callers that embed before it
+    finishes simply wait on the load lock.
+    """
+    def _run():
+        if profiler is None:
+            _load_backend()
+        else:
+            with profiler.stage(f"load encoder ({MODEL_ID})"):
+                _load_backend()
+
+    if not background:
+        _run()
+        return None
+    thread = threading.Thread(target=_run, name="embedding-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+# Content-hash cache: repeated inputs (and the same query used twice in one
+# turn) are encoded once. The disk tier is skipped when the path is empty.
+_cache = EmbeddingCache(
+    max_entries=EMBEDDING_CACHE_SIZE,
+    disk_store=DiskEmbeddingStore(
+        os.path.join(EMBEDDING_CACHE_PATH, MODEL_ID.replace(":", "_")),
+        capacity=EMBEDDING_CACHE_DISK_ENTRIES
+    ) if EMBEDDING_CACHE_PATH else None,
+    namespace=MODEL_ID
+)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Return the (read-only, float32) embedding for `text`, using the cache when possible."""
+    return _cache.get_or_compute(text, _encode)
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """
+    Embed many texts at once. Returns an (n, d) float32 array; every cache miss
+    is sent to the encoder in a single batched call.
+    """
+    return _cache.get_or_compute_many(list(texts), _encode_many)
+
+
+def embedding_cache_stats() -> dict:
+    """Hit/miss counters for the embedding cache."""
+    return _cache.stats()
+
 
-    def embed_text(text: str) -> list[float]:
-        return model.encode(text).tolist()
+def flush_embedding_cache():
+    """Persist new disk-cache entries (call on shutdown and with index snapshots)."""
+    _cache.flush()
@@ -0,0 +1,271 @@
+"""
+Local, model-free NPC and quest extraction from a player/DM exchange.
+
+Returns the same dict as llm/interaction_analyzer.analyze_interaction
+({"npcs": [...], "quests": [{quest_name, event_type, description,
+progress_status, progress, reward, mandatory}]}) plus a confidence score, so
+the analyzer only spends an LLM call when the local pass is unsure.
+
+- Known NPC and quest names (from CharacterMemory / QuestLog) are matched
+  in one pass over the text by an Aho–Corasick automaton, rebuilt only when
+  new names are added. NPCs also match by their distinctive name parts
+  ("Mira" for "Elder Mira"), capitalized, at lower confidence.
+- Unknown NPCs come from pattern rules: titles ("Captain Thorne"), speech
+  verbs ("Vell whispers"), "named X" and the player's "talk to X".
+- Quest events come from cue phrases in the sentence mentioning the quest
+  (start: "asks you to", "new quest"...; completion: "completed",
+  "fulfilled"...), and new quest names from quoted titles after "quest".
+- Confidence is the weakest finding's score, and drops to LOW when the text
+  talks about quests (quest, mission, task, bounty) but none was resolved.
+"""
+import re
+import threading
+from collections import deque
+
+STARTED, UPDATED, COMPLETED = "started", "updated", "completed"
+STATUS = {STARTED: "Started", UPDATED: "In Progress", COMPLETED: "Completed"}
+
+KNOWN_NAME, ALIAS, TALK_TO, TITLED, NAMED, SPEAKER = 1.0, 0.8, 0.9, 0.75, 0.7, 0.6
+LOW = 0.4
+
+_TITLES = {
+    "the", "old", "young", "elder", "captain", "sister", "brother", "lord", "lady", "sir", "dame",
+    "king", "queen", "prince", "princess", "master", "mistress", "father", "mother", "high",
+}
+_NOT_NAMES = {
+    "you", "he", "she", "they", "it", "we", "i", "the", "a", "an", "someone", "everyone", "nobody",
+    "this", "that", "there", "then", "as", "when", "suddenly", "finally",
+}
+_TITLED = re.compile(r"\b((?:Captain|Elder|Sister|Brother|Lord|Lady|Sir|Dame|Master|Mistress|Father|Mother|Old) [A-Z][a-z]+)\b")
+_SPEAKER = re.compile(
+    r"\b([A-Z][a-z]+(?: [A-Z][a-z]+)?),? (?:says|said|whispers|whispered|replies|replied|asks|asked|mutters|"
+    r"muttered|shouts|shouted|speaks|spoke|growls|growled|nods|nodded|smiles|smiled|warns|warned)\b"
+)
+_NAMED = re.compile(r"\b(?:named|called) ([A-Z][a-z]+(?: [A-Z][a-z]+)?)")
+_TALK_TO = re.compile(r"talk to\s+(.+)", re.IGNORECASE)
+_NEW_QUEST = re.compile(
+    r"\bquest(?: called| named| titled)?[:\s-]*[\"“‘']([^\"”’']{3,60})[\"”’']"
+    r"|\bQuest (?:Added|Started|Accepted)[:\s-]+([A-Z][^.\n!?]{2,60})",
+    re.IGNORECASE
+)
+_COMPLETED = re.compile(
+    r"\b(?:complet(?:e|ed|es)|finish(?:ed|es)?|fulfill(?:ed|s)?|accomplish(?:ed|es)?|turn(?:ed)? in|"
+    r"(?:is|are) (?:over|done)|succeed(?:ed|s)? in)\b",
+    re.IGNORECASE
+)
+_STARTED = re.compile(
+    r"\b(?:asks? you to|tasks? you|begs? you|implores? you|urges? you to|new quest|take on|accept(?:s|ed)?|"
+    r"embark(?:s|ed)? on|sets? you on)\b",
+    re.IGNORECASE
+)
+_QUEST_TALK = re.compile(r"\b(?:quests?|missions?|tasks?|errands?|bount(?:y|ies))\b", re.IGNORECASE)
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]?")
+
+
+class NameMatcher:
+    """
+    Aho–Corasick automaton over lower-cased patterns. `find` returns every
+    whole-word occurrence in one pass as (start, end, value), keeping the
+    longest match where occurrences overlap.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns:
+            node = 0
+            for ch in pattern.lower():
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), value))
+
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        lowered = text.lower()
+        hits, node = [], 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, value in self._out[node]:
+                start, end = i + 1 - length, i + 1
+                if (start == 0 or not lowered[start - 1].isalnum()) and (end == len(lowered) or not lowered[end].isalnum()):
+                    hits.append((start, end, value))
+
+        hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+        kept, last_end = [], -1
+        for start, end, value in hits:
+            if start >= last_end:
+                kept.append((start, end, value))
+                last_end = end
+        return kept
+
+
+def _aliases(name):
+    """Distinctive parts of a multi-word NPC name ("Elder Mira" -> ["Mira"])."""
+    parts = name.split()
+    if len(parts) < 2:
+        return []
+    return [p for p in parts if p.lower() not in _TITLES and len(p) >= 3]
+
+
+def _clean_name(name):
+    name = re.split(r"[.,!?;:\n]", name.strip())[0].strip()
+    return " ".join(name.split()[:4]).title()
+
+
+class InteractionExtractor:
+    """Thread-safe; `sync` or `add_*` teach it names, `extract` analyzes one exchange."""
+
+    def __init__(self, npc_names=(), quests=()):
+        self._npcs = set()
+        self._quests = {}  # name -> {"mandatory": bool, "progress_status": int, "active": bool}
+        self._matcher = None
+        self._lock = threading.Lock()
+        for name in npc_names:
+            self.add_npc(name)
+        for quest in quests:
+            if isinstance(quest, str):
+                self.add_quest(quest)
+            else:
+                self.add_quest(quest["quest_name"], quest.get("mandatory", False),
+                               quest.get("progress_status", 0), quest.get("active", True))
+
+    def add_npc(self, name):
+        name = name.strip()
+        with self._lock:
+            if name and name not in self._npcs:
+                self._npcs.add(name)
+                self._matcher = None
+
+    def add_quest(self, name, mandatory=False, progress_status=0, active=True):
+        name = name.strip()
+        with self._lock:
+            if not name:
+                return
+            if name not in self._quests:
+                self._matcher = None
+            self._quests[name] = {"mandatory": mandatory, "progress_status": progress_status, "active": active}
+
+    def sync(self, character_mem=None, quest_log=None):
+        """Pick up NPCs and quests the campaign's stores know about."""
+        if character_mem is not None:
+            for name in character_mem.npc_names():
+                self.add_npc(name)
+        if quest_log is not None:
+            for quest in quest_log.known_quests():
+                self.add_quest(quest["quest_name"], quest["mandatory"], quest["progress_status"], quest["active"])
+
+    def _compiled(self):
+        with self._lock:
+            if self._matcher is None:
+                patterns = [(name, ("quest", name, KNOWN_NAME)) for name in self._quests]
+                patterns += [(name, ("npc", name, KNOWN_NAME)) for name in self._npcs]
+                taken = {p.lower() for p, _ in patterns}
+                for name in self._npcs:
+                    for alias in _aliases(name):
+                        if alias.lower() not in taken:
+                            patterns.append((alias, ("alias", name, ALIAS)))
+                self._matcher = NameMatcher(patterns)
+            return self._matcher, dict(self._quests)
+
+    def extract(self, player_input, dm_response):
+        """Return (analysis dict, confidence in [0, 1])."""
+        matcher, known_quests = self._compiled()
+        npcs = {}     # name -> confidence
+        quests = {}   # name -> quest dict
+        confidences = []
+
+        def npc(name, confidence):
+            if confidence < KNOWN_NAME and (name.lower() in _NOT_NAMES or name.split()[0].lower() in _NOT_NAMES):
+                return
+            npcs[name] = max(npcs.get(name, 0.0), confidence)
+
+        # 1. Known names, one automaton pass over the DM response
+        for start, end, (kind, name, confidence) in matcher.find(dm_response):
+            if kind == "alias" and not dm_response[start].isupper():
+                continue
+            if kind == "quest":
+                quests[name] = self._quest_event(name, _sentence_at(dm_response, start), known_quests.get(name))
+            else:
+                npc(name, confidence)
+
+        # 2. Pattern rules for names not seen before
+        talk = _TALK_TO.search(player_input)
+        if talk:
+            name = _clean_name(talk.group(1))
+            # "talk to mira" -> the known "Elder Mira"
+            known = [n for _, _, (kind, n, _) in matcher.find(name) if kind in ("npc", "alias")]
+            if known:
+                npc(known[0], KNOWN_NAME)
+            elif name:
+                npc(name, TALK_TO)
+        for pattern, confidence in ((_TITLED, TITLED), (_NAMED, NAMED), (_SPEAKER, SPEAKER)):
+            for m in pattern.finditer(dm_response):
+                name = m.group(1)
+                if not any(name in known or known in name for known in npcs):
+                    npc(name, confidence)
+
+        for m in _NEW_QUEST.finditer(dm_response):
+            name = (m.group(1) or m.group(2)).strip()
+            if name and name not in quests and not any(name.lower() == q.lower() for q in quests):
+                quest = self._quest_event(name, _sentence_at(dm_response, m.start()), known_quests.get(name))
+                quests[name] = quest
+                confidences.append(0.8)
+
+        confidences += list(npcs.values())
+        if not quests and _QUEST_TALK.search(dm_response):
+            confidences.append(LOW)  # quest talk we could not resolve: let the LLM look
+
+        data = {"npcs": sorted(npcs, key=lambda n: -npcs[n]), "quests": list(quests.values())}
+        return data, min(confidences, default=1.0)
+
+    @staticmethod
+    def _quest_event(name, sentence, known):
+        if _COMPLETED.search(sentence):
+            event = COMPLETED
+        elif _STARTED.search(sentence) and not (known and known["active"]):
+            event = STARTED
+        else:
+            event = UPDATED if known else STARTED
+        if event == COMPLETED:
+            progress_status = 10
+        elif event == STARTED:
+            progress_status = 1
+        else:
+            progress_status = min(9, (known or {}).get("progress_status", 0) + 1)
+        return {
+            "quest_name": name,
+            "event_type": event,
+            "description": sentence.strip()[:200],
+            "progress_status": progress_status,
+            "progress": STATUS[event],
+            "reward": "unknown reward",
+            "mandatory": bool(known and known["mandatory"]),
+        }
+
+
+def _sentence_at(text, position):
+    """The sentence of `text` containing character `position`."""
+    for m in _SENTENCE.finditer(text):
+        if m.start() <= position < m.end():
+            return m.group(0)
+    return text
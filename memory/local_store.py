@@ -0,0 +1,438 @@
+"""
+Embedded document store implementing the subset of the pymongo API the game
+uses, so it runs (and is benchmarked) without a MongoDB cluster.
+
+With a `path`, every collection is persisted as an append-only JSON-lines
+operation log (Extended JSON via bson.json_util) that is replayed and
+compacted on open; without one, data lives only in memory. Each call that
+would hit a server (a find cursor's first batch, find_one, insert, update,
+a unit of work's batch) counts as one round-trip on the client. Each call
+is applied atomically, and a session's `with_transaction` undoes the batches
+written inside it if the callback raises.
+"""
+import os
+import threading
+from itertools import islice
+
+from bson import ObjectId, json_util
+from pymongo.errors import OperationFailure, DuplicateKeyError
+
+
+def _get(doc, field):
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches(doc, query):
+    for field, cond in query.items():
+        value = _get(doc, field)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$gt" and not (value is not None and value > arg):
+                    return False
+                if op == "$gte" and not (value is not None and value >= arg):
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$lte" and not (value is not None and value <= arg):
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$exists" and (_get(doc, field) is not None) != bool(arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    include = {k for k, v in projection.items() if v}
+    if include:
+        out = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if k not in projection}
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+
+
+class LocalCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        with self._collection._lock:
+            return self._run()
+
+    def explain(self):
+        """
+        Approximate MongoDB's plan choice. An index bounds the query fields
+        that form an equality prefix of its keys, plus at most one range on
+        the key right after; it provides the sort when the (single) sort key
+        is that next key. The index bounding the most fields wins. Fields it
+        does not bound become a FETCH filter, an unprovided sort a blocking
+        SORT stage, and no usable index a COLLSCAN.
+        """
+        query = self._query
+        sort_key = self._sort[0][0] if self._sort and len(self._sort) == 1 else None
+
+        def is_point(value):
+            return not isinstance(value, dict) or set(value) <= {"$eq", "$in"}
+
+        best = None
+        for name, keys in self._collection.index_keys().items():
+            bounded = []
+            while len(bounded) < len(keys) and keys[len(bounded)] in query and is_point(query[keys[len(bounded)]]):
+                bounded.append(keys[len(bounded)])
+            following = keys[len(bounded)] if len(bounded) < len(keys) else None
+            sorts = not self._sort or following == sort_key
+            if following is not None and following in query:
+                bounded.append(following)  # one range after the equality prefix
+            if bounded or (self._sort and sorts):
+                rank = (len(bounded), sorts)
+                if best is None or rank > best[0]:
+                    best = (rank, name, keys, bounded, sorts)
+
+        if best is None:
+            plan, sorts = {"stage": "COLLSCAN", "filter": query}, not self._sort
+        else:
+            _, name, keys, bounded, sorts = best
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": name, "keyPattern": dict.fromkeys(keys, 1)}}
+            residual = {k: v for k, v in query.items() if k not in bounded}
+            if residual:
+                plan["filter"] = residual
+        if not sorts:
+            plan = {"stage": "SORT", "sortPattern": dict(self._sort), "inputStage": plan}
+        return {"queryPlanner": {"winningPlan": plan}}
+
+    def _run(self):
+        self._collection.client.round_trips += 1
+        docs = self._collection._candidates(self._query)
+        if self._sort:
+            # Only single-key sorts are used by the game; _id order == insertion order
+            key, direction = self._sort[0]
+            if key == "_id":
+                docs = docs if direction == 1 else reversed(docs)
+            else:
+                docs = sorted(docs, key=lambda d: _get(d, key), reverse=direction == -1)
+        hits = (d for d in docs if _matches(d, self._query))
+        if self._limit:
+            hits = islice(hits, self._limit)
+        return iter([_project(d, self._projection) for d in hits])
+
+
+class LocalCollection:
+    def __init__(self, client, name, log_path=None):
+        self.client = client
+        self.name = name
+        self._docs = []
+        self._by_id = {}
+        self._lock = threading.RLock()
+        self._indexes = {}  # name -> [field, ...]; only consulted by explain()
+        self._log_path = log_path
+        self._log = None
+        if log_path:
+            self._replay()
+            self._log = open(log_path, "a", encoding="utf-8")
+
+    # --- persistence ---
+    def _replay(self):
+        """Rebuild the collection from its op log, compacting it if it has grown."""
+        entries = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json_util.loads(line)
+                    entries += 1
+                    if entry["op"] == "insert":
+                        self._docs.append(entry["doc"])
+                        self._by_id[entry["doc"]["_id"]] = entry["doc"]
+                    else:
+                        self._apply_update(entry["filter"], entry["update"], entry["many"])
+        if entries > 2 * max(len(self._docs), 1):
+            self._compact()
+
+    def _compact(self):
+        tmp = f"{self._log_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for doc in self._docs:
+                f.write(json_util.dumps({"op": "insert", "doc": doc}) + "\n")
+        os.replace(tmp, self._log_path)
+
+    def _append_log(self, entries):
+        if self._log is None:
+            return
+        self._log.write("".join(json_util.dumps(e) + "\n" for e in entries))
+        self._log.flush()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # --- writes ---
+    def _candidates(self, query):
+        """Documents that may match `query`, in insertion order; _id lookups skip the scan."""
+        key = query.get("_id")
+        if key is None:
+            return self._docs
+        if isinstance(key, dict):
+            if set(key) != {"$in"}:
+                return self._docs
+            ids = key["$in"]
+        else:
+            ids = [key]
+        found = [self._by_id[i] for i in set(ids) if i in self._by_id]
+        return sorted(found, key=lambda d: d["_id"])
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._by_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} dup key: {{ _id: {doc['_id']!r} }}")
+        stored = dict(doc)
+        self._docs.append(stored)
+        self._by_id[stored["_id"]] = stored
+        return stored
+
+    def insert_one(self, doc):
+        with self._lock:
+            self.client.round_trips += 1
+            stored = self._insert(doc)
+            self._append_log([{"op": "insert", "doc": stored}])
+        return InsertOneResult(doc["_id"])
+
+    def insert_many(self, docs):
+        with self._lock:
+            self.client.round_trips += 1
+            stored = [self._insert(doc) for doc in docs]
+            self._append_log([{"op": "insert", "doc": d} for d in stored])
+        return InsertManyResult([d["_id"] for d in stored])
+
+    def find(self, query=None, projection=None):
+        return LocalCursor(self, query, projection)
+
+    def find_one(self, query=None, projection=None):
+        with self._lock:
+            self.client.round_trips += 1
+            for doc in self._candidates(query or {}):
+                if _matches(doc, query or {}):
+                    return _project(doc, projection)
+        return None
+
+    def _apply_update(self, query, update, many, undo=None):
+        matched = 0
+        for doc in self._candidates(query):
+            if _matches(doc, query):
+                if undo is not None:
+                    undo.append(("update", doc, dict(doc)))
+                doc.update(update.get("$set", {}))
+                matched += 1
+                if not many:
+                    break
+        return matched
+
+    def _update(self, query, update, many):
+        with self._lock:
+            self.client.round_trips += 1
+            matched = self._apply_update(query, update, many)
+            self._append_log([{"op": "update", "filter": query, "update": update, "many": many}])
+        return UpdateResult(matched, matched)
+
+    def update_one(self, query, update):
+        return self._update(query, update, many=False)
+
+    def update_many(self, query, update):
+        return self._update(query, update, many=True)
+
+    def write_ops(self, ops, session=None):
+        """
+        The local bulk_write: apply ("insert" | "update_one" | "update_many",
+        filter, doc) tuples, as queued by TurnUnitOfWork, in one round-trip.
+
+        All or nothing: a failing op undoes the ones before it. Inside a
+        session's transaction the batch is logged only once it commits.
+        """
+        with self._lock:
+            self.client.round_trips += 1
+            undo, log = [], []
+            try:
+                for kind, query, doc in ops:
+                    if kind == "insert":
+                        stored = self._insert(doc)
+                        undo.append(("insert", stored, None))
+                        log.append({"op": "insert", "doc": stored})
+                    elif kind in ("update_one", "update_many"):
+                        many = kind == "update_many"
+                        self._apply_update(query, doc, many, undo)
+                        log.append({"op": "update", "filter": query, "update": doc, "many": many})
+                    else:
+                        raise NotImplementedError(f"write op not supported by the local store: {kind}")
+            except Exception:
+                self._rollback(undo)
+                raise
+            if session is not None and session.in_transaction:
+                session._writes.append((self, undo, log))
+            else:
+                self._append_log(log)
+
+    def _rollback(self, undo):
+        """Revert the changes recorded by write_ops, newest first."""
+        with self._lock:
+            for kind, doc, before in reversed(undo):
+                if kind == "insert":
+                    del self._by_id[doc["_id"]]
+                    for i in range(len(self._docs) - 1, -1, -1):
+                        if self._docs[i] is doc:
+                            del self._docs[i]
+                            break
+                else:
+                    doc.clear()
+                    doc.update(before)
+
+    def create_indexes(self, models):
+        """Record index definitions (the local store always scans; see explain())."""
+        names = []
+        for model in models:
+            spec = model.document
+            self._indexes[spec["name"]] = list(spec["key"])
+            names.append(spec["name"])
+        return names
+
+    def index_keys(self):
+        return {"_id_": ["_id"], **self._indexes}
+
+    def index_information(self):
+        return {name: {"key": [(k, 1) for k in keys]} for name, keys in self.index_keys().items()}
+
+    def drop_index(self, name):
+        if name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]")
+        del self._indexes[name]
+
+    def count_documents(self, query):
+        with self._lock:
+            self.client.round_trips += 1
+            return sum(1 for d in self._docs if _matches(d, query))
+
+
+class LocalDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                log_path = None
+                if self.client.path:
+                    directory = os.path.join(self.client.path, self.name)
+                    os.makedirs(directory, exist_ok=True)
+                    log_path = os.path.join(directory, f"{name}.jsonl")
+                self._collections[name] = LocalCollection(self.client, name, log_path)
+            return self._collections[name]
+
+    def close(self):
+        for collection in self._collections.values():
+            collection.close()
+
+
+class LocalSession:
+    """
+    Session for the local store. Each call is atomic on its own;
+    `with_transaction` also rolls back the unit-of-work batches written
+    inside it when the callback raises, and logs them only once it returns.
+    """
+
+    def __init__(self):
+        self._writes = None  # [(collection, undo, log)] while a transaction is open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def in_transaction(self):
+        return self._writes is not None
+
+    def with_transaction(self, callback):
+        self._writes = []
+        try:
+            result = callback(self)
+        except BaseException:
+            for collection, undo, _ in reversed(self._writes):
+                collection._rollback(undo)
+            raise
+        else:
+            for collection, _, log in self._writes:
+                with collection._lock:
+                    collection._append_log(log)
+            return result
+        finally:
+            self._writes = None
+
+
+class LocalMongoClient:
+    """
+    Drop-in for MongoClient(...). With `path=None` all data lives in this
+    object (used by benchmarks); otherwise it is persisted under `path`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.round_trips = 0
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def start_session(self):
+        return LocalSession()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = LocalDatabase(self, name)
+            return self._databases[name]
+
+    def close(self):
+        for database in self._databases.values():
+            database.close()
@@ -0,0 +1,103 @@
+"""
+Migration of documents written before campaigns existed.
+
+Sets `campaign_id` on every document in the indexed collections that has
+none, so the campaign-scoped reads (and the indexes leading with
+`campaign_id`) see them, and drops the pre-campaign indexes those replaced.
+Safe to re-run: tagged documents are skipped.
+
+`migrate_once()` runs when the shared client is created (see
+memory/storage.py): the first start after an upgrade assigns untagged
+documents to DEFAULT_CAMPAIGN and records a marker in the migrations
+collection, so later starts cost one find_one. Run it by hand to assign them
+to another campaign, or to preview:
+
+    python -m memory.migrate_campaigns                   # assign to DEFAULT_CAMPAIGN
+    python -m memory.migrate_campaigns --campaign old-save --dry-run
+"""
+import argparse
+import time
+
+from pymongo.errors import DuplicateKeyError
+
+from memory.schema import INDEXES
+from memory.storage import CAMPAIGN_FIELD, check_campaign_id
+from utils.config import (
+    MONGO_DB_NAME, DEFAULT_CAMPAIGN, CHARACTER_COLLECTION, QUEST_COLLECTION, MIGRATIONS_COLLECTION
+)
+
+MARKER_ID = "campaign_ids"
+_UNTAGGED = {CAMPAIGN_FIELD: {"$exists": False}}
+
+# Indexes from before every index led with campaign_id, or that no query uses any more
+LEGACY_INDEXES = {
+    CHARACTER_COLLECTION: ["npc_name_id"],
+    QUEST_COLLECTION: ["quest_state", "quest_name_state", "campaign_quest_name_state"],
+}
+
+
+def backfill_campaign_ids(db, campaign_id=DEFAULT_CAMPAIGN, dry_run=False):
+    """Assign untagged documents to `campaign_id`; returns {collection: documents (to be) updated}."""
+    counts = {}
+    for collection in INDEXES:
+        if dry_run:
+            counts[collection] = db[collection].count_documents(_UNTAGGED)
+        else:
+            counts[collection] = db[collection].update_many(_UNTAGGED, {"$set": {CAMPAIGN_FIELD: campaign_id}}).modified_count
+    return counts
+
+
+def drop_legacy_indexes(db, dry_run=False):
+    """Drop the pre-campaign indexes still present; returns [(collection, index name)]."""
+    dropped = []
+    for collection, names in LEGACY_INDEXES.items():
+        present = db[collection].index_information()
+        for name in names:
+            if name in present:
+                if not dry_run:
+                    db[collection].drop_index(name)
+                dropped.append((collection, name))
+    return dropped
+
+
+def migrate(db, campaign_id=DEFAULT_CAMPAIGN, dry_run=False):
+    """Backfill, drop legacy indexes and (unless `dry_run`) record the marker."""
+    counts = backfill_campaign_ids(db, campaign_id, dry_run)
+    dropped = drop_legacy_indexes(db, dry_run)
+    if not dry_run:
+        try:
+            db[MIGRATIONS_COLLECTION].insert_one({"_id": MARKER_ID, "campaign_id": campaign_id, "at": time.time()})
+        except DuplicateKeyError:
+            pass  # another process finished first
+    return counts, dropped
+
+
+def migrate_once(db):
+    """Run `migrate` with DEFAULT_CAMPAIGN unless its marker exists."""
+    if db[MIGRATIONS_COLLECTION].find_one({"_id": MARKER_ID}) is not None:
+        return
+    counts, dropped = migrate(db)
+    if any(counts.values()) or dropped:
+        print(f"ℹ️ Assigned {sum(counts.values())} pre-campaign document(s) to campaign '{DEFAULT_CAMPAIGN}' "
+              f"and dropped {len(dropped)} legacy index(es)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign documents without a campaign to one.")
+    parser.add_argument("--campaign", default=DEFAULT_CAMPAIGN)
+    parser.add_argument("--dry-run", action="store_true", help="Count documents and indexes without writing")
+    args = parser.parse_args(argv)
+
+    from memory.storage import get_client
+    db = get_client()[MONGO_DB_NAME]
+    counts, dropped = migrate(db, check_campaign_id(args.campaign), args.dry_run)
+    for name, count in counts.items():
+        print(f"✅ {name}: {count} document(s) -> campaign {args.campaign}")
+    for collection, name in dropped:
+        print(f"✅ {collection}: dropped legacy index {name}")
+    if args.dry_run:
+        print("ℹ️ Dry run: nothing was written")
+
+
+if __name__ == "__main__":
+    main()
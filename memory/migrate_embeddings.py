@@ -0,0 +1,62 @@
+"""
+One-shot migration of stored embeddings to the packed binary encoding.
+
+Rewrites every document in the memories and characters collections whose
+`embedding` is still a BSON array (or packed with a different dtype) using
+memory/embedding_codec.py, in batches of one bulk write each, and reports the
+stored size before and after. Safe to re-run: converted documents are skipped.
+
+    python -m memory.migrate_embeddings                  # EMBEDDING_STORAGE_DTYPE
+    python -m memory.migrate_embeddings --dtype int8 --dry-run
+"""
+import argparse
+
+import bson
+
+from memory.embedding_codec import encode_embedding, decode_embedding, is_packed, STORAGE_SUBTYPES
+from memory.unit_of_work import TurnUnitOfWork
+from utils.config import MONGO_DB_NAME, MEMORY_COLLECTION, CHARACTER_COLLECTION, EMBEDDING_STORAGE_DTYPE
+
+
+def migrate_collection(collection, dtype, batch_size=500, dry_run=False):
+    """Convert one collection; returns (docs converted, bytes before, bytes after)."""
+    target = STORAGE_SUBTYPES[dtype]
+    converted = before = after = 0
+    uow = TurnUnitOfWork()
+
+    for doc in collection.find({}, {"embedding": 1}):
+        value = doc.get("embedding")
+        if value is None or (is_packed(value) and value.subtype == target):
+            continue
+        packed = encode_embedding(decode_embedding(value), dtype)
+        before += len(bson.encode({"embedding": value}))
+        after += len(bson.encode({"embedding": packed}))
+        converted += 1
+        if not dry_run:
+            uow.update_one(collection, {"_id": doc["_id"]}, {"$set": {"embedding": packed}})
+            if converted % batch_size == 0:
+                uow.flush()
+
+    uow.flush()
+    return converted, before, after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert stored embeddings to packed binary.")
+    parser.add_argument("--dtype", choices=sorted(STORAGE_SUBTYPES), default=EMBEDDING_STORAGE_DTYPE)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report sizes without writing")
+    args = parser.parse_args(argv)
+
+    from memory.storage import get_client
+    db = get_client()[MONGO_DB_NAME]
+    for name in (MEMORY_COLLECTION, CHARACTER_COLLECTION):
+        converted, before, after = migrate_collection(db[name], args.dtype, args.batch_size, args.dry_run)
+        saved = f" ({after / before:.0%} of original)" if before else ""
+        print(f"✅ {name}: {converted} document(s) -> {args.dtype}, embedding bytes {before:,} -> {after:,}{saved}")
+    if args.dry_run:
+        print("ℹ️ Dry run: nothing was written")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,28 @@
 import json
 import re
 
-def parse_llm_output(llm_text: str):
+def _find_json_tail(llm_text: str):
+    """Return the regex match for the trailing JSON block, or None."""
+    # Match JSON inside triple backticks or at the end
+    json_match = re.search(r'```json\s*(\{.*?\})\s*```', llm_text, flags=re.DOTALL)
+    if not json_match:
+        json_match = re.search(r'(\{.*\})\s*$', llm_text, flags=re.DOTALL)
+    return json_match
+
+
+def parse_llm_output(llm_text: str, include_summary: bool = False):
     """
     Parses LLM output into:
     - dm_text: narrative for player
     - npcs: list of dicts {npc_name, interaction, context}
     - quests: list of dicts {quest_name, progress, description, reward, mandatory}
+    - memory_summary: str or None (only returned when include_summary=True)
     """
 
-    # Match JSON inside triple backticks or at the end
-    json_match = re.search(r'```json\s*(\{.*?\})\s*```', llm_text, flags=re.DOTALL)
-    if not json_match:
-        json_match = re.search(r'(\{.*\})\s*$', llm_text, flags=re.DOTALL)
-
+    json_match = _find_json_tail(llm_text)
     if not json_match:
         # No JSON found
-        return llm_text.strip(), [], []
+        return _result(llm_text.strip(), [], [], None, include_summary)
 
     json_text = json_match.group(1)
     dm_text = llm_text[:json_match.start()].strip()
@@ -25,7 +31,7 @@ def parse_llm_output(llm_text: str):
         data = json.loads(json_text)
     except json.JSONDecodeError:
         print("⚠️ JSON decode failed in parse_llm_output")
-        return dm_text, [], []
+        return _result(dm_text, [], [], None, include_summary)
 
     npcs = data.get("npcs", [])
     quests_raw = data.get("quests", [])
@@ -48,4 +54,91 @@ def parse_llm_output(llm_text: str):
                 "mandatory": mandatory
             })
 
+    memory_summary = data.get("memory_summary")
+    if not isinstance(memory_summary, str) or not memory_summary.strip():
+        memory_summary = None
+
+    return _result(dm_text, npcs, quests, memory_summary, include_summary)
+
+
+def _result(dm_text, npcs, quests, memory_summary, include_summary):
+    if include_summary:
+        return dm_text, npcs, quests, memory_summary
     return dm_text, npcs, quests
+
+
+class StreamingResponseParser:
+    """
+    Incrementally splits a streamed DM response into narrative and JSON tail.
+
+    `feed(chunk)` returns the narrative text that is safe to show right away;
+    output is held back from the first `{` or ``` fence on, since that is
+    where the JSON block starts. `finish()` returns any narrative still held
+    and `result()` parses the complete text with `parse_llm_output`.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = 0      # chars of the buffer already released as narrative
+        self._held = False     # True once the JSON tail has started
+        self._started = False  # True once non-whitespace narrative was released
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        if self._held:
+            return ""
+
+        pending = self._buffer[self._emitted:]
+        cut = len(pending)
+        for i, ch in enumerate(pending):
+            if ch == "{":
+                cut, self._held = i, True
+                break
+            if ch == "`":
+                fence = pending[i:i + 3]
+                if fence == "```":
+                    cut, self._held = i, True
+                    break
+                if i + len(fence) == len(pending):
+                    # Possibly the start of a fence split across chunks: wait
+                    cut = i
+                    break
+
+        # Trailing whitespace waits for more narrative (it may precede the JSON)
+        keep = len(pending[:cut].rstrip())
+        self._emitted += keep
+        return self._release(pending[:keep])
+
+    def _release(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def finish(self) -> str:
+        """Return narrative that was held back but is not part of the JSON tail."""
+        json_match = _find_json_tail(self._buffer)
+        end = json_match.start() if json_match else len(self._buffer)
+        remainder = self._buffer[self._emitted:end].rstrip() if end > self._emitted else ""
+        self._emitted = max(self._emitted, end)
+        self._held = True
+        return self._release(remainder)
+
+    @property
+    def text(self) -> str:
+        """The raw response received so far."""
+        return self._buffer
+
+    def narrative(self, chunks):
+        """Wrap a chunk iterator, yielding only narrative text as it becomes available."""
+        for chunk in chunks:
+            text = self.feed(chunk)
+            if text:
+                yield text
+        text = self.finish()
+        if text:
+            yield text
+
+    def result(self, include_summary: bool = False):
+        """Parse the full response: (dm_text, npcs, quests[, memory_summary])."""
+        return parse_llm_output(self._buffer, include_summary=include_summary)
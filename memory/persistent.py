@@ -1,64 +1,272 @@
-import os
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-import faiss
-from pymongo import MongoClient
-from memory.embeddings import embed_text
-from utils.config import MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION_NAME
+from bson import ObjectId
+from memory.storage import get_client, scoped, campaign_path, check_campaign_id, CAMPAIGN_FIELD
+from memory.embedding_codec import encode_embedding, decode_embedding
+from memory.embeddings import embed_text, embed_texts
+from memory.schema import MEMORY_VECTOR_FIELDS, MEMORY_SUMMARY_FIELDS
+from memory.snapshots import save_snapshot, load_snapshot
+from memory.vector_store import RingVectorIndex
+from utils.config import (
+    MONGO_DB_NAME, MONGO_COLLECTION_NAME,
+    MEMORY_INDEX_PATH, SNAPSHOT_EVERY_N_WRITES,
+    MEMORY_ARCHIVE_ENABLED, MEMORY_ARCHIVE_PATH, ARCHIVE_TOP_K, ARCHIVE_RERANK_FACTOR,
+    MEMORY_CONSOLIDATION_ENABLED, OLDER_MEMORY_CACHE_SIZE, DEFAULT_CAMPAIGN
+)
 
-MAX_FAISS_ENTRIES = 500  # FAISS keeps last 500 entries
+MAX_FAISS_ENTRIES = 500  # vector window keeps last 500 entries
+ARCHIVE_BATCH_SIZE = 1000  # documents per batch when streaming history into the archive
 
 class PersistentMemory:
-    def __init__(self):
-        self.client = MongoClient(MONGO_URI)
+    """
+    Long-term memory in tiers: an exact vector window over the newest
+    `max_entries` summaries; (when enabled) a MemoryHierarchy of scene and
+    chapter summaries searched coarse to fine; and an ArchiveIndex over the
+    full history for memories that have left the window but are not yet
+    consolidated (or all of them, without the hierarchy).
+
+    Older tiers return candidate _ids; their summaries and exact vectors come
+    from an LRU of decoded documents, and misses from one campaign-scoped
+    Mongo read that runs while the window is searched.
+    """
+
+    def __init__(self, max_entries=MAX_FAISS_ENTRIES, snapshot_path=MEMORY_INDEX_PATH, client=None,
+                 archive_path=MEMORY_ARCHIVE_PATH, use_archive=MEMORY_ARCHIVE_ENABLED,
+                 use_hierarchy=MEMORY_CONSOLIDATION_ENABLED, campaign_id=DEFAULT_CAMPAIGN):
+        self.campaign_id = check_campaign_id(campaign_id)
+        self.client = client or get_client()
         self.db = self.client[MONGO_DB_NAME]
         self.collection = self.db[MONGO_COLLECTION_NAME]
 
-        self._index = None
-        self.dim = None
-        self.memory_cache = []  # cache for FAISS
+        # Fixed-size ring buffer of normalized embeddings -> summaries
+        self._window = RingVectorIndex(max_entries)
+        # Mongo _ids of the window entries, oldest first
+        self._window_keys = deque(maxlen=max_entries)
+
+        # Newest Mongo _id reflected in the window (high-water mark)
+        self._watermark = None
+        self.snapshot_path = campaign_path(snapshot_path, campaign_id)
+        self._unsaved = 0
+        # Set before the window loads: a cold load saves a snapshot, which also saves the archive
+        self.archive_path = campaign_path(archive_path, campaign_id)
+        self._archive = None
 
         self._load_latest_faiss_entries()
 
+        if use_archive:
+            self._open_archive()
+
+        # _id -> (summary, vector) of memories older than the window
+        self._older_docs = OrderedDict()
+        self._older_lock = threading.Lock()
+        self._lookup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-lookup")
+
+        self._hierarchy = None
+        if use_hierarchy:
+            from memory.consolidation import MemoryHierarchy
+            self._hierarchy = MemoryHierarchy(self.db, self.collection, campaign_id=campaign_id)
+
+    @property
+    def dim(self):
+        return self._window.dim
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by the in-memory tiers (window, hierarchy, archive)."""
+        size = self._window.nbytes
+        if self._hierarchy is not None:
+            size += self._hierarchy.nbytes
+        if self._archive is not None:
+            size += self._archive.nbytes
+        return size
+
     def _load_latest_faiss_entries(self):
-        """Load last MAX_FAISS_ENTRIES from MongoDB into FAISS."""
-        docs = list(self.collection.find().sort("_id", -1).limit(MAX_FAISS_ENTRIES))
-        docs.reverse()
+        """
+        Fill the vector window: load the on-disk snapshot if there is one, then
+        fetch only documents newer than its watermark from MongoDB.
+        """
+        query = {}
+        snapshot = load_snapshot(self.snapshot_path) if self.snapshot_path else None
+        if snapshot is not None and "keys" not in snapshot[2]:
+            snapshot = None  # written before window keys were tracked; rebuild from MongoDB
+        if snapshot is not None:
+            vectors, summaries, meta = snapshot
+            self._window.load(vectors, summaries)
+            self._window_keys.extend(ObjectId(k) for k in meta["keys"])
+            if meta.get("watermark"):
+                self._watermark = ObjectId(meta["watermark"])
+                query = {"_id": {"$gt": self._watermark}}
 
-        self.memory_cache = docs
+        docs = list(
+            self.collection.find(scoped(self.campaign_id, query), MEMORY_VECTOR_FIELDS)
+            .sort("_id", -1)
+            .limit(self._window.capacity)
+        )
+        docs.reverse()
 
+        for d in docs:
+            self._window.add(decode_embedding(d["embedding"]), d["summary"])
+            self._window_keys.append(d["_id"])
         if docs:
-            self.dim = len(docs[0]["embedding"])
-            self._index = faiss.IndexFlatIP(self.dim)
-            vectors = np.array([d["embedding"] for d in docs], dtype="float32")
-            self._index.add(vectors)
+            self._watermark = docs[-1]["_id"]
+            self._unsaved += len(docs)
+            self._maybe_snapshot(force=snapshot is None)
+
+    def _maybe_snapshot(self, force=False):
+        if self._unsaved >= SNAPSHOT_EVERY_N_WRITES or (force and self._unsaved):
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """Write the vector window and its Mongo watermark to `snapshot_path`."""
+        if not self.snapshot_path or len(self._window) == 0:
+            return
+        save_snapshot(
+            self.snapshot_path,
+            self._window.vectors(),
+            self._window.payloads(),
+            {
+                "watermark": str(self._watermark) if self._watermark else None,
+                "dim": self.dim,
+                "keys": [str(k) for k in self._window_keys]
+            }
+        )
+        self._unsaved = 0
+        if self._archive is not None and self.archive_path:
+            self._archive.save(self.archive_path)
+
+    # --- archive tier ---
+    def _history(self, after=None):
+        """Yield (keys, vectors) batches of every stored memory newer than `after`, oldest first."""
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        keys, vectors = [], []
+        for doc in self.collection.find(scoped(self.campaign_id, query), {"embedding": 1}).sort("_id", 1):
+            keys.append(doc["_id"].binary)
+            vectors.append(decode_embedding(doc["embedding"]))
+            if len(keys) >= ARCHIVE_BATCH_SIZE:
+                yield keys, np.stack(vectors)
+                keys, vectors = [], []
+        if keys:
+            yield keys, np.stack(vectors)
 
-    def add_memory(self, summary, embedding):
-        """Add a summarized memory to MongoDB and FAISS."""
+    def _open_archive(self):
+        """Load the saved archive, then stream in anything stored since (large gaps rebuild in the background)."""
+        from memory.archive_index import ArchiveIndex
+
+        self._archive = ArchiveIndex(source=self._history)
+        if self.archive_path:
+            self._archive.load(self.archive_path)
+        self._archive.catch_up(after=self._archive.last_key)
+
+    def _archive_candidates(self, query_emb, top_k, above=None):
+        """_ids of approximate archive hits older than the window (and newer than `above`), to re-rank exactly."""
+        if self._archive is None or len(self._window) < self._window.capacity or not self._window_keys:
+            return []
+        floor = self._window_keys[0]
+        if above is not None and above >= floor:
+            return []
+        candidates = self._archive.search(
+            query_emb, top_k * ARCHIVE_RERANK_FACTOR,
+            below=floor.binary, above=above.binary if above is not None else None
+        )
+        return [ObjectId(key) for key, _ in candidates]
+
+    def fetch_older(self, ids):
+        """{_id: (summary, vector)} for stored memories; cached ones skip MongoDB."""
+        found, missing = {}, []
+        with self._older_lock:
+            for _id in ids:
+                doc = self._older_docs.get(_id)
+                if doc is None:
+                    missing.append(_id)
+                else:
+                    self._older_docs.move_to_end(_id)
+                    found[_id] = doc
+        if missing:
+            fetched = {
+                doc["_id"]: (doc["summary"], decode_embedding(doc["embedding"]))
+                for doc in self.collection.find(scoped(self.campaign_id, {"_id": {"$in": missing}}), MEMORY_VECTOR_FIELDS)
+            }
+            found.update(fetched)
+            with self._older_lock:
+                self._older_docs.update(fetched)
+                while len(self._older_docs) > OLDER_MEMORY_CACHE_SIZE:
+                    self._older_docs.popitem(last=False)
+        return found
+
+    def close(self):
+        """Stop archive maintenance and consolidation (waits for running jobs)."""
+        self._lookup.shutdown(wait=True)
+        if self._archive is not None:
+            self._archive.close()
+        if self._hierarchy is not None:
+            self._hierarchy.close()
+
+    def add_memory(self, summary, embedding, uow=None):
+        """
+        Add a summarized memory to MongoDB and the vector window.
+        With a TurnUnitOfWork, the insert is queued for the turn's bulk flush.
+        """
         embedding = np.array(embedding, dtype="float32")
         norm = np.linalg.norm(embedding)
         if norm > 0:
             embedding = embedding / norm
 
-        doc = {"summary": summary, "embedding": embedding.tolist()}
-        self.collection.insert_one(doc)
+        doc = {CAMPAIGN_FIELD: self.campaign_id, "summary": summary, "embedding": encode_embedding(embedding)}
+        if uow is not None:
+            uow.insert_one(self.collection, doc)
+        else:
+            self.collection.insert_one(doc)
 
-        # Update FAISS index
-        if self._index is None:
-            self.dim = embedding.shape[0]
-            self._index = faiss.IndexFlatIP(self.dim)
-            self.memory_cache = []
+        # O(1): writes one ring slot, evicting the oldest entry when full
+        self._window.add(embedding, summary)
+        self._window_keys.append(doc["_id"])
+        if self._archive is not None:
+            self._archive.add(doc["_id"].binary, embedding)
+        if self._hierarchy is not None:
+            self._hierarchy.note_turn()
+        self._watermark = doc["_id"]
+        self._unsaved += 1
+        self._maybe_snapshot()
 
-        self.memory_cache.append(doc)
-        if len(self.memory_cache) > MAX_FAISS_ENTRIES:
-            self.memory_cache.pop(0)
+    def add_memories(self, summaries, embeddings=None, uow=None):
+        """
+        Add several summaries at once. `embeddings` is an optional (n, d) array
+        already computed by the caller; otherwise they are embedded in one batch.
+        """
+        if not summaries:
+            return
+        if embeddings is None:
+            embeddings = embed_texts(summaries)
+        embeddings = np.array(embeddings, dtype="float32")
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms > 0, norms, 1)
 
-        vectors = np.array([d["embedding"] for d in self.memory_cache], dtype="float32")
-        self._index.reset()
-        self._index.add(vectors)
+        docs = [
+            {CAMPAIGN_FIELD: self.campaign_id, "summary": summary, "embedding": encode_embedding(emb)}
+            for summary, emb in zip(summaries, embeddings)
+        ]
+        if uow is not None:
+            uow.insert_many(self.collection, docs)
+        else:
+            self.collection.insert_many(docs)
+
+        for doc, summary, emb in zip(docs, summaries, embeddings):
+            self._window.add(emb, summary)
+            self._window_keys.append(doc["_id"])
+            if self._archive is not None:
+                self._archive.add(doc["_id"].binary, emb)
+            if self._hierarchy is not None:
+                self._hierarchy.note_turn()
+        self._watermark = docs[-1]["_id"]
+        self._unsaved += len(docs)
+        self._maybe_snapshot()
 
     def retrieve(self, query, top_k=3):
         """Retrieve top-k semantically similar summaries."""
-        if self._index is None or len(self.memory_cache) == 0:
+        if len(self._window) == 0:
             return []
 
         query_emb = np.array(embed_text(query), dtype="float32")
@@ -66,15 +274,58 @@ class PersistentMemory:
         if norm > 0:
             query_emb = query_emb / norm
 
-        distances, indices = self._index.search(np.array([query_emb], dtype="float32"), top_k)
-        results = []
-        for idx in indices[0]:
-            if idx < len(self.memory_cache):
-                results.append(self.memory_cache[idx]["summary"])
-        return results
+        return [summary for summary, _, _ in self._search(query_emb, top_k)]
+
+    def retrieve_scored(self, query, top_k=50):
+        """
+        Like `retrieve`, but returns (summary, score, vector) tuples so callers
+        can threshold and de-duplicate (e.g. MMR) before building a prompt.
+        """
+        if len(self._window) == 0:
+            return []
+
+        query_emb = np.array(embed_text(query), dtype="float32")
+        norm = np.linalg.norm(query_emb)
+        if norm > 0:
+            query_emb = query_emb / norm
+
+        return self._search(query_emb, top_k)
+
+    def _search(self, query_emb, top_k):
+        # Older tiers (and their Mongo read, if any) run alongside the window search
+        older = None
+        if self._hierarchy is not None or self._archive is not None:
+            older = self._lookup.submit(self._search_older, query_emb, top_k)
+        hits = [
+            (summary, score, self._window.get_vector(entry_id))
+            for entry_id, score, summary in self._window.search(query_emb, top_k)
+        ]
+        older = older.result() if older is not None else []
+        if older:
+            hits = sorted(hits + older, key=lambda h: -h[1])[:top_k]
+        return hits
+
+    def _search_older(self, query_emb, top_k):
+        """Hierarchy and archive hits, re-ranked exactly after one (cached) read of their turns."""
+        older, turn_ids, covered = [], [], None
+        if self._hierarchy is not None:
+            floor = self._window_keys[0] if self._window_keys else None
+            older, turn_ids = self._hierarchy.candidates(query_emb, below=floor)
+            covered = self._hierarchy.covered_through
+        archived_ids = self._archive_candidates(query_emb, min(top_k, ARCHIVE_TOP_K), above=covered)
+        if not (turn_ids or archived_ids):
+            return older
+
+        docs = self.fetch_older(turn_ids + archived_ids)
+
+        def ranked(ids, k):
+            hits = [(docs[i][0], float(docs[i][1] @ query_emb), docs[i][1]) for i in ids if i in docs]
+            return sorted(hits, key=lambda h: -h[1])[:k]
+
+        return older + ranked(turn_ids, top_k) + ranked(archived_ids, min(top_k, ARCHIVE_TOP_K))
 
     def get_recent_memories(self, n=5):
         """Retrieve last N entries from MongoDB for conversational continuity."""
-        docs = list(self.collection.find().sort("_id", -1).limit(n))
+        docs = list(self.collection.find(scoped(self.campaign_id), MEMORY_SUMMARY_FIELDS).sort("_id", -1).limit(n))
         docs.reverse()
         return [d["summary"] for d in docs]
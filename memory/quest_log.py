@@ -1,24 +1,106 @@
-from pymongo import MongoClient
-from utils.config import MONGO_URI, MONGO_DB_NAME, QUEST_COLLECTION, REWARD_COLLECTION
+import threading
+
+from memory.schema import REWARD_FIELDS
+from memory.storage import get_client, scoped, check_campaign_id, CAMPAIGN_FIELD
+from utils.config import MONGO_DB_NAME, QUEST_COLLECTION, REWARD_COLLECTION, DEFAULT_CAMPAIGN
 
 class QuestLog:
-    def __init__(self):
-        client = MongoClient(MONGO_URI)
+    """
+    Quest and reward state, held in memory and written through to MongoDB.
+
+    Non-abandoned quests, the names of abandoned ones and all rewards are
+    loaded once; lookups by name are dict hits, every mutation is applied
+    locally and persisted with a single write, and the prompt strings are
+    rebuilt only after state changes.
+    """
+
+    def __init__(self, client=None, campaign_id=DEFAULT_CAMPAIGN):
+        self.campaign_id = check_campaign_id(campaign_id)
+        client = client or get_client()
         db = client[MONGO_DB_NAME]
         self.collection = db[QUEST_COLLECTION]
         self.rewards = db[REWARD_COLLECTION]
 
+        self._lock = threading.RLock()
+        self.reload()
+
+    def reload(self):
+        """(Re)load quest and reward state from MongoDB."""
+        with self._lock:
+            self._quests = {}         # _id -> quest doc, in insertion order
+            self._ids_by_name = {}    # quest_name -> [_id, ...] in insertion order
+            self._abandoned = set()   # names of abandoned quests
+            for quest in self.collection.find(scoped(self.campaign_id)):
+                if quest["abandoned"]:
+                    self._abandoned.add(quest["quest_name"])
+                else:
+                    self._cache_quest(quest)
+
+            self._rewards = list(self.rewards.find(scoped(self.campaign_id), REWARD_FIELDS))
+            self._quest_entries = None
+            self._rewards_context = None
+
+    def _cache_quest(self, quest):
+        self._quests[quest["_id"]] = quest
+        self._ids_by_name.setdefault(quest["quest_name"], []).append(quest["_id"])
+        self._quest_entries = None
+
+    def _first_by_name(self, quest_name, active_only):
+        for quest_id in self._ids_by_name.get(quest_name, ()):
+            quest = self._quests[quest_id]
+            if quest["abandoned"]:
+                continue
+            if active_only and (not quest["active"] or quest["completed"]):
+                continue
+            return quest
+        return None
+
+    @staticmethod
+    def _is_active(quest):
+        return quest["active"] and not quest["completed"] and not quest["abandoned"]
+
     def get_active_quests(self):
         """Return all active quests."""
-        return list(self.collection.find({"active": True, "completed": False, "abandoned": False}))
+        with self._lock:
+            return [dict(q) for q in self._quests.values() if self._is_active(q)]
+
+    def known_quests(self):
+        """Name, mandatory flag, progress and active state of every non-abandoned quest."""
+        with self._lock:
+            return [
+                {k: q[k] for k in ("quest_name", "mandatory", "progress_status", "active")}
+                for q in self._quests.values()
+            ]
 
     def get_active_quest_by_name(self, quest_name):
         """Return a specific active quest by name."""
-        return self.collection.find_one({"quest_name": quest_name, "active": True, "completed": False, "abandoned": False})
+        with self._lock:
+            quest = self._first_by_name(quest_name, active_only=True)
+            return dict(quest) if quest else None
+
+    def quest_status(self, quest_name):
+        """Return 'active', 'completed' or 'abandoned' for a quest the log knows, else None."""
+        with self._lock:
+            if self._first_by_name(quest_name, active_only=True):
+                return "active"
+            if self._first_by_name(quest_name, active_only=False):
+                return "completed"
+            return "abandoned" if quest_name in self._abandoned else None
+
+    def get_quest_entries(self):
+        """Return active quests formatted for the prompt (cached until quest state changes)."""
+        with self._lock:
+            if self._quest_entries is None:
+                self._quest_entries = [
+                    f"- {q['quest_name']} (Progress: {q['progress_status']}/10)\nSummary: {q.get('progress_summary', '')}"
+                    for q in self._quests.values() if self._is_active(q)
+                ]
+            return list(self._quest_entries)
 
-    def add_quest(self, quest_name, summary, reward, mandatory=False):
+    def add_quest(self, quest_name, summary, reward, mandatory=False, uow=None):
         """Add a new quest and return the inserted document id."""
         quest_data = {
+            CAMPAIGN_FIELD: self.campaign_id,
             "quest_name": quest_name,
             "summary": summary,
             "progress_status": 1,           # 1-10
@@ -30,67 +112,84 @@ class QuestLog:
             "abandoned": False,
             "mandatory": mandatory          # True = main story, False = optional
         }
-        result = self.collection.insert_one(quest_data)
-        inserted_id = result.inserted_id
+        if uow is not None:
+            inserted_id = uow.insert_one(self.collection, quest_data)
+        else:
+            inserted_id = self.collection.insert_one(quest_data).inserted_id
         print(f"✅ Quest added to DB: '{quest_name}' (id: {inserted_id})")
         # Optionally return full quest data + id
         quest_data["_id"] = inserted_id
+        with self._lock:
+            self._cache_quest(dict(quest_data))
         return quest_data
 
-    def update_progress(self, quest_name, increment=1, new_summary=None):
-        quest = self.collection.find_one({
-            "quest_name": quest_name,
-            "abandoned": False
-        })
-        if not quest:
-            return None
-
-        new_status = min(10, quest.get("progress_status", 1) + increment)
-        updates = {
-            "$set": {
+    def update_progress(self, quest_name, increment=1, new_summary=None, uow=None):
+        with self._lock:
+            quest = self._first_by_name(quest_name, active_only=False)
+            if not quest:
+                return None
+
+            new_status = min(10, quest.get("progress_status", 1) + increment)
+            changes = {
                 "progress_status": new_status,
                 "progress_summary": new_summary or quest.get("progress_summary", "")
             }
-        }
 
-        if new_status >= 10:
-            updates["$set"].update({
-                "completed": True,
-                "active": False
-            })
-        self.collection.update_one({"_id": quest["_id"]}, updates)
-        updated_quest = self.collection.find_one({"_id": quest["_id"]})
+            if new_status >= 10:
+                changes.update({
+                    "completed": True,
+                    "active": False
+                })
 
-        if updated_quest["completed"] and not updated_quest.get("reward_collected", False):
-            self._issue_reward(updated_quest)
+            # Reward goes out first so reward_collected is only persisted once it exists
+            if changes.get("completed", quest["completed"]) and not quest.get("reward_collected", False):
+                self._issue_reward(quest, uow)
+                changes["reward_collected"] = True
 
-        return updated_quest
+            if uow is not None:
+                uow.update_one(self.collection, {"_id": quest["_id"]}, {"$set": changes})
+            else:
+                self.collection.update_one({"_id": quest["_id"]}, {"$set": changes})
+            quest.update(changes)
+            self._quest_entries = None
+            return dict(quest)
 
 
-    def abandon_all_quests(self):
+    def abandon_all_quests(self, uow=None):
         """Abandon all active quests."""
-        self.collection.update_many(
-            {"active": True, "completed": False},
-            {"$set": {"active": False, "abandoned": True}}
-        )
+        query = scoped(self.campaign_id, {"abandoned": False, "active": True, "completed": False})
+        update = {"$set": {"active": False, "abandoned": True}}
+        if uow is not None:
+            uow.update_many(self.collection, query, update)
+        else:
+            self.collection.update_many(query, update)
+        with self._lock:
+            for quest_id, quest in list(self._quests.items()):
+                if quest["active"] and not quest["completed"]:
+                    del self._quests[quest_id]
+                    self._ids_by_name[quest["quest_name"]].remove(quest_id)
+                    self._abandoned.add(quest["quest_name"])
+            self._quest_entries = None
 
-    def _issue_reward(self, quest):
+    def _issue_reward(self, quest, uow=None):
         if quest.get("reward_collected"):
             return
         reward_data = {
+            CAMPAIGN_FIELD: self.campaign_id,
             "quest_name": quest["quest_name"],
             "reward": quest["reward"],
             "description": f"Reward from quest '{quest['quest_name']}'"
         }
-        self.rewards.insert_one(reward_data)
-        self.collection.update_one(
-            {"_id": quest["_id"]},
-            {"$set": {"reward_collected": True}}
-        )
+        if uow is not None:
+            uow.insert_one(self.rewards, reward_data)
+        else:
+            self.rewards.insert_one(reward_data)
+        self._rewards.append(reward_data)
+        self._rewards_context = None
 
     def get_rewards_context(self):
         """Return all obtained rewards as a string for prompt context."""
-        rewards = list(self.rewards.find({}))
-        if not rewards:
-            return ""
-        return "\n".join([f"- {r['reward']} ({r['description']})" for r in rewards])
+        with self._lock:
+            if self._rewards_context is None:
+                self._rewards_context = "\n".join([f"- {r['reward']} ({r['description']})" for r in self._rewards])
+            return self._rewards_context
@@ -0,0 +1,133 @@
+"""
+Collection indexes, read projections and the query-plan check.
+
+`ensure_indexes()` runs when the shared client is created (see
+memory/storage.py); `create_indexes` is idempotent, so this costs one
+round-trip per collection at startup. `check_query_plans()` explains every
+hot query and reports any whose winning plan is a COLLSCAN, sorts in memory,
+or filters fetched documents on a field the index does not bound:
+
+    python -m memory.schema            # against the configured backend
+    python -m pytest tests             # the same check, on the local store and on MongoDB when reachable
+"""
+import sys
+
+from pymongo import ASCENDING, IndexModel
+
+from memory.storage import CAMPAIGN_FIELD
+from utils.config import (
+    MONGO_DB_NAME, MEMORY_COLLECTION, CHARACTER_COLLECTION, QUEST_COLLECTION,
+    REWARD_COLLECTION, CONSOLIDATED_COLLECTION, DEFAULT_CAMPAIGN
+)
+
+_CAMPAIGN = (CAMPAIGN_FIELD, ASCENDING)
+_ID = ("_id", ASCENDING)
+
+# Every index leads with campaign_id: all reads are scoped to one campaign
+INDEXES = {
+    MEMORY_COLLECTION: [
+        # Window / archive loads and get_recent_memories, by _id within a campaign
+        IndexModel([_CAMPAIGN, _ID], name="campaign_id"),
+    ],
+    CHARACTER_COLLECTION: [
+        IndexModel([_CAMPAIGN, _ID], name="campaign_id"),
+        # get_all_interactions(npc) in insertion order
+        IndexModel([_CAMPAIGN, ("npc_name", ASCENDING), _ID], name="campaign_npc_name_id"),
+    ],
+    QUEST_COLLECTION: [
+        # QuestLog.reload() (campaign prefix) and abandon_all_quests()
+        IndexModel(
+            [_CAMPAIGN, ("abandoned", ASCENDING), ("active", ASCENDING), ("completed", ASCENDING)],
+            name="campaign_quest_state"
+        ),
+        # Lookups by name are served by the in-memory QuestLog, so quest_name is not indexed
+    ],
+    REWARD_COLLECTION: [
+        IndexModel([_CAMPAIGN], name="campaign"),
+    ],
+    CONSOLIDATED_COLLECTION: [
+        IndexModel([_CAMPAIGN, _ID], name="campaign_id"),
+    ],
+}
+
+# Read projections: only fetch `embedding` where a vector index is rebuilt from it
+MEMORY_VECTOR_FIELDS = {"summary": 1, "embedding": 1}
+MEMORY_SUMMARY_FIELDS = {"_id": 0, "summary": 1}
+CHARACTER_VECTOR_FIELDS = {"npc_name": 1, "interaction": 1, "embedding": 1}
+CHARACTER_TEXT_FIELDS = {"_id": 0, "interaction": 1}
+REWARD_FIELDS = {"_id": 0, "reward": 1, "description": 1}
+
+# Queries the game issues at startup or every turn: (collection, filter, projection, sort)
+_SOME_ID = {"$gt": None}
+_C = {CAMPAIGN_FIELD: DEFAULT_CAMPAIGN}
+HOT_QUERIES = [
+    (MEMORY_COLLECTION, {**_C, "_id": _SOME_ID}, MEMORY_VECTOR_FIELDS, [("_id", -1)]),
+    (MEMORY_COLLECTION, _C, MEMORY_SUMMARY_FIELDS, [("_id", -1)]),
+    (MEMORY_COLLECTION, {**_C, "_id": {"$in": []}}, MEMORY_VECTOR_FIELDS, None),  # archive / hierarchy drill-down
+    (CHARACTER_COLLECTION, {**_C, "_id": _SOME_ID}, CHARACTER_VECTOR_FIELDS, [("_id", 1)]),
+    (CHARACTER_COLLECTION, {**_C, "npc_name": "?"}, CHARACTER_TEXT_FIELDS, [("_id", 1)]),
+    (QUEST_COLLECTION, _C, None, None),
+    (QUEST_COLLECTION, {**_C, "abandoned": False, "active": True, "completed": False}, None, None),
+    (REWARD_COLLECTION, _C, REWARD_FIELDS, None),
+    (CONSOLIDATED_COLLECTION, _C, None, [("_id", 1)]),
+]
+
+
+def ensure_indexes(db):
+    """Create any missing indexes from INDEXES on `db`."""
+    for collection, models in INDEXES.items():
+        db[collection].create_indexes(models)
+
+
+def _plan_nodes(plan):
+    yield plan
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _plan_nodes(plan[key])
+    for child in plan.get("inputStages", ()):
+        yield from _plan_nodes(child)
+
+
+def plan_problems(plan):
+    """What makes a winning plan slow: COLLSCAN, an in-memory SORT, or a FETCH filter."""
+    problems = []
+    for node in _plan_nodes(plan):
+        stage = node.get("stage")
+        if stage == "COLLSCAN":
+            problems.append("COLLSCAN")
+        elif stage == "SORT":
+            problems.append("in-memory SORT")
+        elif stage == "FETCH" and node.get("filter"):
+            problems.append(f"unindexed filter {sorted(node['filter'])}")
+    return problems
+
+
+def check_query_plans(db):
+    """Explain every hot query; return [(collection, filter, problems)] for those with a slow plan."""
+    from bson import ObjectId
+
+    offenders = []
+    for collection, query, projection, sort in HOT_QUERIES:
+        query = {k: ({"$gt": ObjectId("0" * 24)} if v is _SOME_ID else v) for k, v in query.items()}
+        cursor = db[collection].find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        problems = plan_problems(cursor.explain()["queryPlanner"]["winningPlan"])
+        if problems:
+            offenders.append((collection, query, problems))
+    return offenders
+
+
+def main():
+    from memory.storage import get_client
+
+    offenders = check_query_plans(get_client()[MONGO_DB_NAME])
+    for collection, query, problems in offenders:
+        print(f"❌ {', '.join(problems)} on {collection}: {query}")
+    if offenders:
+        sys.exit(1)
+    print(f"✅ All {len(HOT_QUERIES)} hot queries use an index")
+
+
+if __name__ == "__main__":
+    main()
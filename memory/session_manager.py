@@ -0,0 +1,201 @@
+"""
+Per-campaign game state for a process that hosts many players.
+
+Each campaign gets its own PersistentMemory, CharacterMemory, QuestLog,
+recent-summary cache and write-behind pipeline, all scoped to its
+campaign_id and sharing the one process-wide storage client. Hot campaigns
+stay in memory; when more than `max_campaigns` are open, or their indexes
+exceed `memory_budget_mb`, the least recently used idle campaign is evicted:
+its pending writes are drained, its snapshots saved and its stores closed.
+The next `session()` for it reloads from the snapshots (plus anything newer
+in the database).
+
+    manager = SessionManager()
+    with manager.session("party-42") as campaign:
+        campaign.quest_log.get_active_quests()
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from memory.storage import get_client, check_campaign_id
+from utils.config import CAMPAIGN_MEMORY_BUDGET_MB, MAX_HOT_CAMPAIGNS, RECENT_CACHE_SIZE
+
+
+class CampaignState:
+    """Everything one campaign needs in memory between turns."""
+
+    def __init__(self, campaign_id, client=None, snapshot_dir=None):
+        from memory.persistent import PersistentMemory
+        from memory.character_memory import CharacterMemory
+        from memory.quest_log import QuestLog
+        from memory.interaction_extractor import InteractionExtractor
+        from memory.write_behind import WriteBehindPipeline
+
+        self.campaign_id = campaign_id
+        self.client = client or get_client()
+        memory_paths, character_paths = {}, {}
+        if snapshot_dir is not None:
+            # campaign_path() places these under snapshot_dir/campaigns/<campaign_id>/
+            memory_paths = {
+                "snapshot_path": os.path.join(snapshot_dir, "memory_index"),
+                "archive_path": os.path.join(snapshot_dir, "memory_archive"),
+            }
+            character_paths = {"snapshot_path": os.path.join(snapshot_dir, "character_index")}
+        self.persistent_mem = PersistentMemory(client=self.client, campaign_id=campaign_id, **memory_paths)
+        self.character_mem = CharacterMemory(client=self.client, campaign_id=campaign_id, **character_paths)
+        self.quest_log = QuestLog(client=self.client, campaign_id=campaign_id)
+        self.recent_cache = deque(self.persistent_mem.get_recent_memories(RECENT_CACHE_SIZE), maxlen=RECENT_CACHE_SIZE)
+        # Local NPC/quest extractor knowing this campaign's names; TurnEngine keeps it up to date
+        self.extractor = InteractionExtractor()
+        self.extractor.sync(self.character_mem, self.quest_log)
+        self.pipeline = WriteBehindPipeline(name=f"turn-finalizer-{campaign_id}")
+
+        # Serializes turns within the campaign; different campaigns run in parallel
+        self.lock = threading.RLock()
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def nbytes(self):
+        """Approximate bytes held by this campaign's in-memory indexes."""
+        return self.persistent_mem.nbytes + self.character_mem.nbytes
+
+    def close(self):
+        """Finish queued writes, snapshot the indexes and stop background workers."""
+        from memory.embeddings import flush_embedding_cache
+
+        self.pipeline.drain()
+        self.persistent_mem.save_snapshot()
+        self.character_mem.save_snapshot()
+        flush_embedding_cache()
+        self.persistent_mem.close()
+
+
+class SessionManager:
+    """LRU cache of CampaignState objects under a count and memory budget."""
+
+    def __init__(self, client=None, memory_budget_mb=CAMPAIGN_MEMORY_BUDGET_MB, max_campaigns=MAX_HOT_CAMPAIGNS,
+                 snapshot_dir=None):
+        self.client = client
+        self.snapshot_dir = snapshot_dir
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.max_campaigns = max_campaigns
+        self._campaigns = OrderedDict()  # campaign_id -> CampaignState, least recently used first
+        self._opening = {}               # campaign_id -> lock held while it is loaded or evicted
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._campaigns)
+
+    def __contains__(self, campaign_id):
+        with self._lock:
+            return campaign_id in self._campaigns
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(state.nbytes for state in self._campaigns.values())
+
+    def _lease(self, state):
+        state.leases += 1
+        state.last_used = time.monotonic()
+        self._campaigns.move_to_end(state.campaign_id)
+        return state
+
+    def acquire(self, campaign_id):
+        """Return the campaign's state, loading it if needed; pair with `release`."""
+        check_campaign_id(campaign_id)
+        with self._lock:
+            state = self._campaigns.get(campaign_id)
+            if state is not None:
+                return self._lease(state)
+            opening = self._opening.setdefault(campaign_id, threading.Lock())
+
+        # Load outside the manager lock so other campaigns are not blocked;
+        # the per-campaign lock also waits out an eviction still flushing it
+        with opening:
+            with self._lock:
+                state = self._campaigns.get(campaign_id)
+                if state is not None:
+                    return self._lease(state)
+            state = CampaignState(campaign_id, self.client, self.snapshot_dir)
+            with self._lock:
+                self._campaigns[campaign_id] = state
+                self._lease(state)
+                victims = self._pick_victims()
+        self._close(victims)
+        return state
+
+    def release(self, state):
+        with self._lock:
+            state.leases -= 1
+            state.last_used = time.monotonic()
+
+    @contextmanager
+    def session(self, campaign_id):
+        """Lease a campaign for one turn (or a whole CLI session); it is not evicted while leased."""
+        state = self.acquire(campaign_id)
+        try:
+            yield state
+        finally:
+            self.release(state)
+
+    def _pick_victims(self):
+        """Remove LRU idle campaigns until back under budget (caller holds the manager lock)."""
+        victims = []
+        total = sum(state.nbytes for state in self._campaigns.values())
+        for campaign_id, state in list(self._campaigns.items()):
+            if len(self._campaigns) <= self.max_campaigns and total <= self.memory_budget:
+                break
+            if state.leases:
+                continue
+            opening = self._opening.setdefault(campaign_id, threading.Lock())
+            if not opening.acquire(blocking=False):
+                continue
+            del self._campaigns[campaign_id]
+            total -= state.nbytes
+            victims.append((state, opening))
+        return victims
+
+    def _close(self, victims):
+        for state, opening in victims:
+            try:
+                with state.lock:
+                    state.close()
+                self.evictions += 1
+            except Exception as e:
+                print(f"⚠️ Failed to evict campaign '{state.campaign_id}': {e}")
+            finally:
+                opening.release()
+
+    def evict(self, campaign_id):
+        """Flush and unload one campaign now (no-op if it is not loaded or is leased)."""
+        with self._lock:
+            state = self._campaigns.get(campaign_id)
+            if state is None or state.leases:
+                return False
+            opening = self._opening.setdefault(campaign_id, threading.Lock())
+            if not opening.acquire(blocking=False):
+                return False
+            del self._campaigns[campaign_id]
+        self._close([(state, opening)])
+        return True
+
+    def evict_idle(self, max_idle_s):
+        """Unload every unleased campaign not used for `max_idle_s` seconds."""
+        cutoff = time.monotonic() - max_idle_s
+        with self._lock:
+            idle = [cid for cid, s in self._campaigns.items() if not s.leases and s.last_used < cutoff]
+        return sum(self.evict(cid) for cid in idle)
+
+    def close(self):
+        """Flush and unload every campaign (call on shutdown)."""
+        with self._lock:
+            states = list(self._campaigns.values())
+            self._campaigns.clear()
+        for state in states:
+            state.close()
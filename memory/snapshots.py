@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(path, vectors, payloads, meta):
+    """
+    Atomically write an index snapshot to directory `path`:
+    - vectors.npy:   (n, d) float32 matrix (loaded back memory-mapped)
+    - payloads.json: list of n JSON-serializable payloads, row-aligned
+    - meta.json:     `meta` plus format version and row count
+    """
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, "vectors.npy"), np.ascontiguousarray(vectors, dtype="float32"))
+    with open(os.path.join(tmp, "payloads.json"), "w", encoding="utf-8") as f:
+        json.dump(payloads, f, ensure_ascii=False)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({**meta, "format": SNAPSHOT_FORMAT, "count": len(payloads)}, f)
+
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_snapshot(path):
+    """
+    Return (vectors, payloads, meta) for a snapshot directory, or None if it is
+    missing or unreadable. `vectors` is a read-only memory map.
+    """
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            return None
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "payloads.json"), encoding="utf-8") as f:
+            payloads = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if len(payloads) != meta["count"] or (len(payloads) and vectors.shape[0] != len(payloads)):
+        return None
+    return vectors, payloads, meta
@@ -0,0 +1,131 @@
+"""
+Process-wide storage client.
+
+PersistentMemory, CharacterMemory and QuestLog share the client returned by
+`get_client()`, so the game holds one tuned connection pool instead of one
+MongoClient per store (which also lets a TurnUnitOfWork transaction span all
+of their collections). With STORAGE_BACKEND=local the same interface is
+served by the embedded document store in memory/local_store.py.
+"""
+import os
+import re
+import threading
+
+from pymongo import monitoring
+
+from utils.config import (
+    STORAGE_BACKEND, LOCAL_STORAGE_PATH, MONGO_URI,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_COMPRESSORS,
+    MONGO_DB_NAME, ENSURE_INDEXES, DEFAULT_CAMPAIGN
+)
+
+CAMPAIGN_FIELD = "campaign_id"
+_CAMPAIGN_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_client = None
+_lock = threading.Lock()
+
+
+class _CommandCounter(monitoring.CommandListener):
+    """pymongo CommandListener counting commands sent to the server (one per round-trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+_commands = _CommandCounter()
+
+
+def create_client(backend=STORAGE_BACKEND):
+    """Build a new client for `backend` ("mongo" or "local")."""
+    if backend == "local":
+        from memory.local_store import LocalMongoClient
+        return LocalMongoClient(path=LOCAL_STORAGE_PATH)
+    if backend == "mongo":
+        from pymongo import MongoClient
+        options = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        }
+        if MONGO_COMPRESSORS:
+            options["compressors"] = MONGO_COMPRESSORS
+        return MongoClient(MONGO_URI, event_listeners=[_commands], **options)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected 'mongo' or 'local')")
+
+
+def get_client():
+    """
+    Return the shared client, creating it on first use together with its
+    indexes and the pending campaign_id migration (memory/migrate_campaigns.py).
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_client()
+                if ENSURE_INDEXES:
+                    from memory.schema import ensure_indexes
+                    from memory.migrate_campaigns import migrate_once
+                    ensure_indexes(_client[MONGO_DB_NAME])
+                    migrate_once(_client[MONGO_DB_NAME])
+    return _client
+
+
+def round_trips(client=None):
+    """Commands sent so far by `client` (default: the shared one), process-wide."""
+    client = client or _client
+    # LocalMongoClient counts its own; on a MongoClient attribute access would return a Database
+    count = vars(client).get("round_trips") if client is not None else None
+    return _commands.count if count is None else count
+
+
+def set_client(client):
+    """Replace the shared client (e.g. with a LocalMongoClient in benchmarks)."""
+    global _client
+    with _lock:
+        _client = client
+
+
+def check_campaign_id(campaign_id):
+    """Campaign ids end up in file paths, so only allow [A-Za-z0-9_-]{1,64}."""
+    if not isinstance(campaign_id, str) or not _CAMPAIGN_ID.match(campaign_id):
+        raise ValueError(f"Invalid campaign id: {campaign_id!r}")
+    return campaign_id
+
+
+def scoped(campaign_id, query=None):
+    """Return `query` restricted to one campaign's documents."""
+    return {CAMPAIGN_FIELD: campaign_id, **(query or {})}
+
+
+def campaign_path(path, campaign_id):
+    """
+    On-disk location of a per-campaign snapshot: `path` itself for the
+    default campaign, storage/campaigns/<id>/<name> for the others.
+    """
+    if not path or campaign_id == DEFAULT_CAMPAIGN:
+        return path
+    check_campaign_id(campaign_id)
+    return os.path.join(os.path.dirname(path), "campaigns", campaign_id, os.path.basename(path))
+
+
+def close_client():
+    """Close the shared client; the next get_client() opens a fresh one."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -1,9 +1,14 @@
 from llm.story_engine import generate_response
 
-def summarize_for_memory(text: str) -> str:
+def summarize_for_memory(text: str, memory_summary: str = None) -> str:
     """
     Summarizes a DM response into a concise form suitable for persistent memory.
+    If the DM already returned a `memory_summary` (single-call turn mode), it is
+    used as-is and no extra LLM call is made.
     """
+    if memory_summary and memory_summary.strip():
+        return memory_summary.strip().replace("\n", " ")
+
     prompt = f"""
 You are an AI assistant tasked with summarizing game events.
 Summarize the following text into 1-2 sentences, preserving key characters, events, and locations:
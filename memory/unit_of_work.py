@@ -0,0 +1,93 @@
+import threading
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, UpdateMany
+
+from memory.local_store import LocalCollection
+
+
+def to_pymongo(op):
+    """A queued ("insert" | "update_one" | "update_many", filter, doc) tuple as a pymongo write model."""
+    kind, query, doc = op
+    if kind == "insert":
+        return InsertOne(doc)
+    return (UpdateOne if kind == "update_one" else UpdateMany)(query, doc)
+
+
+class TurnUnitOfWork:
+    """
+    Collects one turn's Mongo mutations across collections and flushes them as
+    one ordered `bulk_write` per collection (optionally inside a single
+    transaction), instead of a round-trip per insert/update.
+
+    Operations are queued as (kind, filter, doc) tuples and only turned into
+    pymongo write models for a real MongoDB collection; the local store
+    applies the tuples itself. Documents get their `_id` client-side when
+    queued, so callers can use it right away. Thread-safe: the foreground and
+    the write-behind worker may queue into the same unit of work.
+    """
+
+    def __init__(self, client=None, transactional=False):
+        self.client = client
+        self.transactional = transactional
+        self.round_trips = 0
+        self._batches = {}  # id(collection) -> (collection, [ops])
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(ops) for _, ops in self._batches.values())
+
+    def _queue(self, collection, op):
+        with self._lock:
+            self._batches.setdefault(id(collection), (collection, []))[1].append(op)
+
+    def insert_one(self, collection, doc):
+        doc.setdefault("_id", ObjectId())
+        self._queue(collection, ("insert", None, doc))
+        return doc["_id"]
+
+    def insert_many(self, collection, docs):
+        return [self.insert_one(collection, doc) for doc in docs]
+
+    def update_one(self, collection, query, update):
+        self._queue(collection, ("update_one", query, update))
+
+    def update_many(self, collection, query, update):
+        self._queue(collection, ("update_many", query, update))
+
+    def flush(self):
+        """
+        Write everything queued so far. Returns the number of round-trips used.
+
+        The queue is emptied either way; if a write fails in transactional
+        mode, none of the batches is applied.
+        """
+        with self._lock:
+            batches = list(self._batches.values())
+            self._batches = {}
+        if not batches:
+            return 0
+
+        before = self.round_trips
+        if self.transactional and self.client is not None:
+            with self.client.start_session() as session:
+                session.with_transaction(lambda s: self._write(batches, s))
+        else:
+            self._write(batches, None)
+        return self.round_trips - before
+
+    def _write(self, batches, session):
+        for collection, ops in batches:
+            if isinstance(collection, LocalCollection):
+                collection.write_ops(ops, session=session)
+            else:
+                collection.bulk_write([to_pymongo(op) for op in ops], ordered=True, session=session)
+            self.round_trips += 1
@@ -0,0 +1,220 @@
+import numpy as np
+
+
+def _top_k(scores, top_k):
+    """Return positions of the `top_k` highest scores, best first."""
+    k = min(top_k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype="int64")
+    if k < scores.shape[0]:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(scores.shape[0])
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class RingVectorIndex:
+    """
+    Fixed-size window of vectors backed by a preallocated float32 ring buffer.
+
+    Every entry gets a monotonically increasing id and lives in slot
+    `id % capacity`, so one insert writes one row and evicts (overwrites) the
+    oldest entry once the window is full. Insert cost does not depend on the
+    capacity; search is an exact inner-product scan over the filled rows.
+    """
+
+    def __init__(self, capacity, dim=None):
+        self.capacity = capacity
+        self.dim = None
+        self._vectors = None
+        self._ids = np.full(capacity, -1, dtype="int64")
+        self._payloads = [None] * capacity
+        self._next_id = 0
+        if dim is not None:
+            self._allocate(dim)
+
+    def _allocate(self, dim):
+        self.dim = dim
+        self._vectors = np.zeros((self.capacity, dim), dtype="float32")
+
+    def __len__(self):
+        return min(self._next_id, self.capacity)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the vector buffer and id array (payloads not counted)."""
+        return self._ids.nbytes + (self._vectors.nbytes if self._vectors is not None else 0)
+
+    def add(self, vector, payload):
+        """Insert one vector, evicting the oldest entry if the window is full. Returns its id."""
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        if self._vectors is None:
+            self._allocate(vector.shape[0])
+
+        entry_id = self._next_id
+        slot = entry_id % self.capacity
+        self._vectors[slot] = vector
+        self._ids[slot] = entry_id
+        self._payloads[slot] = payload
+        self._next_id += 1
+        return entry_id
+
+    def get(self, entry_id):
+        """Return the payload for `entry_id`, or None if it has been evicted."""
+        slot = entry_id % self.capacity
+        if self._ids[slot] != entry_id:
+            return None
+        return self._payloads[slot]
+
+    def get_vector(self, entry_id):
+        """Return the vector for `entry_id`, or None if it has been evicted."""
+        slot = entry_id % self.capacity
+        if self._ids[slot] != entry_id:
+            return None
+        return self._vectors[slot]
+
+    def payloads(self):
+        """Return payloads in insertion order (oldest first)."""
+        size = len(self)
+        if self._next_id <= self.capacity:
+            return self._payloads[:size]
+        start = self._next_id % self.capacity
+        return self._payloads[start:] + self._payloads[:start]
+
+    def vectors(self):
+        """Return the stored vectors in insertion order (oldest first)."""
+        size = len(self)
+        if self._vectors is None:
+            return np.empty((0, 0), dtype="float32")
+        if self._next_id <= self.capacity:
+            return self._vectors[:size]
+        start = self._next_id % self.capacity
+        return np.concatenate([self._vectors[start:], self._vectors[:start]])
+
+    def load(self, vectors, payloads):
+        """Bulk-fill an empty window from oldest-first arrays (keeps the newest `capacity`)."""
+        vectors = vectors[-self.capacity:]
+        payloads = list(payloads[-self.capacity:])
+        if not payloads:
+            return
+        if self._vectors is None:
+            self._allocate(vectors.shape[1])
+        n = len(payloads)
+        self._vectors[:n] = vectors
+        self._ids[:n] = np.arange(n)
+        self._payloads[:n] = payloads
+        self._next_id = n
+
+    def search(self, query, top_k):
+        """Return up to `top_k` (id, score, payload) tuples ranked by inner product."""
+        size = len(self)
+        if size == 0:
+            return []
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        scores = self._vectors[:size] @ query
+        return [
+            (int(self._ids[slot]), float(scores[slot]), self._payloads[slot])
+            for slot in _top_k(scores, top_k)
+        ]
+
+
+class SharedVectorIndex:
+    """
+    Growable id-mapped vector store shared by many owners (e.g. all NPCs).
+
+    Ids are row numbers in a float32 slab that doubles when full, so inserts
+    are amortized O(1). Removed ids go on a free list and are reused, so
+    retention limits are enforced without rebuilding anything. `search` can
+    be restricted to a subset of ids, which makes per-owner lookups a
+    filtered scan over just that owner's rows.
+    """
+
+    def __init__(self, dim=None, initial_capacity=1024):
+        self.dim = None
+        self._capacity = initial_capacity
+        self._vectors = None
+        self._payloads = []
+        self._live = []
+        self._free = []
+        self._size = 0
+        if dim is not None:
+            self._allocate(dim)
+
+    def _allocate(self, dim):
+        self.dim = dim
+        self._vectors = np.zeros((self._capacity, dim), dtype="float32")
+
+    def _grow(self):
+        self._capacity *= 2
+        grown = np.zeros((self._capacity, self.dim), dtype="float32")
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def __len__(self):
+        return self._size - len(self._free)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the vector slab (payloads not counted)."""
+        return self._vectors.nbytes if self._vectors is not None else 0
+
+    def add(self, vector, payload):
+        """Insert one vector and return its id."""
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        if self._vectors is None:
+            self._allocate(vector.shape[0])
+
+        if self._free:
+            entry_id = self._free.pop()
+            self._payloads[entry_id] = payload
+            self._live[entry_id] = True
+        else:
+            if self._size == self._capacity:
+                self._grow()
+            entry_id = self._size
+            self._payloads.append(payload)
+            self._live.append(True)
+            self._size += 1
+
+        self._vectors[entry_id] = vector
+        return entry_id
+
+    def remove(self, entry_id):
+        """Drop `entry_id`; its row is reused by a later insert."""
+        if not self._live[entry_id]:
+            return
+        self._live[entry_id] = False
+        self._payloads[entry_id] = None
+        self._free.append(entry_id)
+
+    def get(self, entry_id):
+        """Return the payload stored under `entry_id`, or None if it was removed."""
+        if entry_id >= self._size or not self._live[entry_id]:
+            return None
+        return self._payloads[entry_id]
+
+    def vectors_for(self, ids):
+        """Return the (len(ids), d) matrix of vectors stored under `ids`."""
+        if self._vectors is None:
+            return np.empty((0, 0), dtype="float32")
+        return self._vectors[np.asarray(ids, dtype="int64")]
+
+    def search(self, query, top_k, ids=None):
+        """
+        Return up to `top_k` (id, score, payload) tuples ranked by inner product.
+        If `ids` is given, only those entries are considered.
+        """
+        if self._vectors is None:
+            return []
+        if ids is None:
+            ids = [i for i in range(self._size) if self._live[i]]
+        ids = np.asarray(ids, dtype="int64")
+        if ids.shape[0] == 0:
+            return []
+
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        scores = self._vectors[ids] @ query
+        return [
+            (int(ids[pos]), float(scores[pos]), self._payloads[ids[pos]])
+            for pos in _top_k(scores, top_k)
+        ]
@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WriteBehindPipeline:
+    """
+    Runs post-response bookkeeping (summaries, embeddings, Mongo writes) off
+    the turn's critical path.
+
+    - One worker thread per pipeline (i.e. per campaign), so tasks run in
+      submission order and never race each other.
+    - At most `max_pending` tasks may be queued; `submit` blocks beyond that,
+      which keeps a slow database from building an unbounded backlog.
+    - Each task is tagged with the state it writes ("story", "npc", "quests"),
+      so the next turn can `wait_for` only what it is about to read.
+    """
+
+    def __init__(self, name="turn-finalizer", max_pending=8):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn, *args, keys=(), **kwargs):
+        """Queue `fn(*args, **kwargs)`; `keys` name the state it writes. Returns a Future."""
+        if self._closed:
+            raise RuntimeError("WriteBehindPipeline is closed")
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._run, fn, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            for key in keys:
+                self._latest[key] = future
+        return future
+
+    def _run(self, fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ Background write failed ({getattr(fn, '__name__', fn)}): {e}")
+            raise
+        finally:
+            self._slots.release()
+
+    def wait_for(self, *keys):
+        """Block until the latest task touching any of `keys` has finished."""
+        with self._lock:
+            futures = [self._latest.get(key) for key in keys]
+        for future in futures:
+            if future is not None:
+                # Failures were already reported by the worker
+                future.exception()
+
+    def drain(self):
+        """Finish every queued task and stop the worker (call on exit)."""
+        self._closed = True
+        self._executor.shutdown(wait=True)
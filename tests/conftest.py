@@ -0,0 +1,7 @@
+# Model-free, network-free backends; must run before any memory.* / llm.* import
+import os
+
+from benchmarks.harness import use_offline_environment
+
+use_offline_environment()
+os.environ.setdefault("STORAGE_BACKEND", "local")
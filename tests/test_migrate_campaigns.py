@@ -0,0 +1,37 @@
+from pymongo import ASCENDING, IndexModel
+
+from memory.local_store import LocalMongoClient
+from memory.migrate_campaigns import migrate, migrate_once
+from memory.schema import ensure_indexes
+from utils.config import CHARACTER_COLLECTION, DEFAULT_CAMPAIGN, MEMORY_COLLECTION
+
+
+def _db():
+    db = LocalMongoClient()["test"]
+    ensure_indexes(db)
+    db[CHARACTER_COLLECTION].create_indexes([IndexModel([("npc_name", ASCENDING), ("_id", ASCENDING)], name="npc_name_id")])
+    db[MEMORY_COLLECTION].insert_many([{"summary": "old"}, {"summary": "older"}])
+    return db
+
+
+def test_startup_migration_runs_once():
+    db = _db()
+    migrate_once(db)
+    assert {d.get("campaign_id") for d in db[MEMORY_COLLECTION].find()} == {DEFAULT_CAMPAIGN}
+    assert "npc_name_id" not in db[CHARACTER_COLLECTION].index_information()
+
+    # Marker recorded: later starts leave the database alone
+    db[MEMORY_COLLECTION].insert_one({"summary": "written by an old process"})
+    migrate_once(db)
+    assert db[MEMORY_COLLECTION].count_documents({"campaign_id": {"$exists": False}}) == 1
+
+
+def test_dry_run_writes_nothing():
+    db = _db()
+    counts, dropped = migrate(db, "old-save", dry_run=True)
+    assert counts[MEMORY_COLLECTION] == 2 and dropped == [(CHARACTER_COLLECTION, "npc_name_id")]
+    assert db[MEMORY_COLLECTION].count_documents({"campaign_id": {"$exists": False}}) == 2
+    assert "npc_name_id" in db[CHARACTER_COLLECTION].index_information()
+
+    migrate_once(db)  # no marker yet
+    assert db[MEMORY_COLLECTION].count_documents({"campaign_id": DEFAULT_CAMPAIGN}) == 2
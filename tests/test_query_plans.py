@@ -0,0 +1,91 @@
+"""
+Every hot query (memory/schema.py HOT_QUERIES) must be served by an index:
+no COLLSCAN, no in-memory SORT, no filter on fetched documents. Checked on
+the local store's plan model and, when one is reachable, on a real MongoDB
+(MONGO_TEST_URI, default mongodb://localhost:27017).
+
+    python -m pytest tests
+"""
+import os
+import uuid
+
+import pytest
+from bson import ObjectId
+
+from memory.local_store import LocalMongoClient
+from memory.schema import INDEXES, check_query_plans, ensure_indexes
+from utils.config import CHARACTER_COLLECTION, MEMORY_COLLECTION, QUEST_COLLECTION
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017")
+
+
+def _offending_collections(db):
+    return {collection for collection, _, _ in check_query_plans(db)}
+
+
+def _seed(db):
+    db[MEMORY_COLLECTION].insert_many([{"campaign_id": "default", "summary": f"turn {i}", "embedding": b""} for i in range(5)])
+    db[CHARACTER_COLLECTION].insert_one({"campaign_id": "default", "npc_name": "?", "interaction": "hello"})
+    db[QUEST_COLLECTION].insert_one(
+        {"campaign_id": "default", "quest_name": "q", "active": True, "completed": False, "abandoned": False}
+    )
+
+
+@pytest.fixture
+def mongo_db():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no MongoDB at {MONGO_TEST_URI}")
+    name = f"dnd_plan_test_{uuid.uuid4().hex[:8]}"
+    try:
+        yield client[name]
+    finally:
+        client.drop_database(name)
+        client.close()
+
+
+def test_local_hot_queries_use_indexes():
+    db = LocalMongoClient()["test"]
+    ensure_indexes(db)
+    assert check_query_plans(db) == []
+
+
+def test_local_missing_index_is_reported():
+    db = LocalMongoClient()["test"]
+    for collection, models in INDEXES.items():
+        db[collection].create_indexes([m for m in models if m.document["name"] != "campaign_npc_name_id"])
+    assert _offending_collections(db) == {CHARACTER_COLLECTION}
+
+
+def test_local_plan_shapes():
+    collection = LocalMongoClient()["test"][MEMORY_COLLECTION]
+    collection.create_indexes(INDEXES[MEMORY_COLLECTION])
+
+    plan = collection.find({"campaign_id": "a", "_id": {"$gt": ObjectId()}}).sort("_id", -1).explain()
+    assert plan["queryPlanner"]["winningPlan"] == {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "campaign_id", "keyPattern": {"campaign_id": 1, "_id": 1}}
+    }
+    # The index leads with campaign_id, but cannot serve a sort on another key...
+    plan = collection.find({"campaign_id": "a"}).sort("summary", 1).explain()["queryPlanner"]["winningPlan"]
+    assert plan["stage"] == "SORT" and plan["inputStage"]["stage"] == "FETCH"
+    # ...or bound a field it does not contain
+    plan = collection.find({"campaign_id": "a", "summary": "x"}).explain()["queryPlanner"]["winningPlan"]
+    assert plan["filter"] == {"summary": "x"}
+    # Without the campaign, only the _id_ index can help
+    plan = collection.find({"summary": "x"}).explain()["queryPlanner"]["winningPlan"]
+    assert plan["stage"] == "COLLSCAN"
+
+
+def test_mongo_hot_queries_use_indexes(mongo_db):
+    _seed(mongo_db)
+    ensure_indexes(mongo_db)
+    assert check_query_plans(mongo_db) == []
+
+    mongo_db[CHARACTER_COLLECTION].drop_index("campaign_npc_name_id")
+    assert CHARACTER_COLLECTION in _offending_collections(mongo_db)
@@ -0,0 +1,82 @@
+"""
+QuestLog state transitions: accepted -> progressed -> completed (reward
+issued once) or abandoned, and the same state after a reload.
+"""
+import pytest
+
+from memory.local_store import LocalMongoClient
+from memory.quest_log import QuestLog
+from memory.unit_of_work import TurnUnitOfWork
+from utils.config import MONGO_DB_NAME, REWARD_COLLECTION
+
+
+@pytest.fixture
+def client():
+    return LocalMongoClient()
+
+
+@pytest.fixture
+def log(client):
+    return QuestLog(client=client, campaign_id="quests")
+
+
+def test_new_quest_is_active(log):
+    log.add_quest("The Lost Amulet", "Find it", "gold")
+
+    assert log.quest_status("The Lost Amulet") == "active"
+    assert log.quest_status("Unknown") is None
+    assert [q["quest_name"] for q in log.get_active_quests()] == ["The Lost Amulet"]
+
+
+def test_progress_then_completion_issues_the_reward_once(log, client):
+    log.add_quest("The Lost Amulet", "Find it", "gold")
+
+    quest = log.update_progress("The Lost Amulet", increment=3, new_summary="Found a map")
+    assert quest["progress_status"] == 4 and quest["progress_summary"] == "Found a map"
+    assert log.get_rewards_context() == ""
+
+    quest = log.update_progress("The Lost Amulet", increment=10)
+    assert quest["progress_status"] == 10 and quest["completed"] and not quest["active"]
+    assert quest["reward_collected"]
+    assert log.quest_status("The Lost Amulet") == "completed"
+    assert log.get_active_quests() == [] and log.get_quest_entries() == []
+
+    log.update_progress("The Lost Amulet", increment=1)
+    assert client[MONGO_DB_NAME][REWARD_COLLECTION].count_documents({"quest_name": "The Lost Amulet"}) == 1
+    assert "gold" in log.get_rewards_context()
+
+
+def test_abandon_leaves_completed_quests_alone(log):
+    log.add_quest("The Lost Amulet", "Find it", "gold")
+    log.add_quest("Rats in the Cellar", "Clear them", "ale")
+    log.update_progress("The Lost Amulet", increment=10)
+
+    log.abandon_all_quests()
+
+    assert log.quest_status("Rats in the Cellar") == "abandoned"
+    assert log.quest_status("The Lost Amulet") == "completed"
+    assert log.get_active_quest_by_name("Rats in the Cellar") is None
+
+
+def test_reload_restores_every_state(log, client):
+    log.add_quest("The Lost Amulet", "Find it", "gold")
+    log.add_quest("Rats in the Cellar", "Clear them", "ale")
+    log.update_progress("The Lost Amulet", increment=10)
+    log.abandon_all_quests()
+    log.add_quest("Ferry the Crown", "Cross the river", "title")
+
+    reloaded = QuestLog(client=client, campaign_id="quests")
+    for name in ("The Lost Amulet", "Rats in the Cellar", "Ferry the Crown"):
+        assert reloaded.quest_status(name) == log.quest_status(name)
+    assert reloaded.get_rewards_context() == log.get_rewards_context()
+    assert QuestLog(client=client, campaign_id="other").quest_status("Ferry the Crown") is None
+
+
+def test_transitions_queued_in_a_unit_of_work_persist_on_flush(log, client):
+    with TurnUnitOfWork() as uow:
+        log.add_quest("The Lost Amulet", "Find it", "gold", uow=uow)
+        log.update_progress("The Lost Amulet", increment=10, uow=uow)
+        assert QuestLog(client=client, campaign_id="quests").quest_status("The Lost Amulet") is None
+
+    assert uow.round_trips == 2  # quests, rewards
+    assert QuestLog(client=client, campaign_id="quests").quest_status("The Lost Amulet") == "completed"
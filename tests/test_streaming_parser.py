@@ -0,0 +1,48 @@
+"""
+StreamingResponseParser when the start of the JSON tail arrives split
+across chunks.
+"""
+import json
+
+import pytest
+
+from memory.npc_and_quest_parser import StreamingResponseParser
+
+NARRATIVE = "The gate creaks open. A hooded figure waits."
+TAIL = {"npcs": [{"name": "Mira", "context": "waits at the gate"}], "quests": []}
+
+
+def _feed(chunks):
+    parser = StreamingResponseParser()
+    shown = "".join(parser.narrative(chunks))
+    return parser, shown
+
+
+@pytest.mark.parametrize("split", [1, 2, 3])
+def test_fence_split_across_chunks_is_never_shown(split):
+    fence = "```json\n"
+    body = f"{NARRATIVE}\n{fence}{json.dumps(TAIL)}\n```"
+    cut = len(NARRATIVE) + 1 + split
+    parser, shown = _feed([body[:cut], body[cut:]])
+
+    assert shown == NARRATIVE
+    dm_text, npcs, quests = parser.result()
+    assert dm_text == NARRATIVE
+    assert npcs == TAIL["npcs"] and quests == []
+
+
+def test_brace_in_a_later_chunk_holds_back_the_rest():
+    body = f"{NARRATIVE}\n{json.dumps(TAIL)}"
+    chunks = [body[i:i + 5] for i in range(0, len(body), 5)]
+    parser = StreamingResponseParser()
+
+    released = [parser.feed(chunk) for chunk in chunks]
+    assert "{" not in "".join(released)
+    assert "".join(released) + parser.finish() == NARRATIVE
+    assert parser.result()[1] == TAIL["npcs"]
+
+
+def test_lone_backticks_are_released_once_no_fence_follows():
+    parser, shown = _feed(["Use the `", "key` on the door."])
+
+    assert shown == "Use the `key` on the door."
@@ -0,0 +1,96 @@
+"""
+Quest updates found by the local extractor when the DM's JSON lists none.
+"""
+import json
+
+import pytest
+
+from llm import turn_engine
+from llm.turn_engine import TurnEngine
+from memory.local_store import LocalMongoClient
+from memory.session_manager import CampaignState
+from utils.config import MONGO_DB_NAME, QUEST_COLLECTION
+from utils.metrics import Metrics
+
+EMPTY_JSON = json.dumps({"npcs": [], "quests": []})
+
+
+@pytest.fixture
+def campaign(tmp_path):
+    state = CampaignState("quests", client=LocalMongoClient(), snapshot_dir=str(tmp_path))
+    yield state
+    state.close()
+
+
+def _play(campaign, monkeypatch, reply, player_input="look around"):
+    monkeypatch.setattr(turn_engine, "generate_response", lambda prompt, stream=False: f"{reply}\n{EMPTY_JSON}")
+    offered = []
+    engine = TurnEngine(campaign, metrics=Metrics(), write_behind=False, stream=False)
+    engine.play(player_input, confirm_quest=lambda quest: offered.append(quest["quest_name"]) or True)
+    return offered
+
+
+def _quest_docs(campaign, name):
+    return list(campaign.client[MONGO_DB_NAME][QUEST_COLLECTION].find({"quest_name": name}))
+
+
+def test_completed_quest_is_not_offered_again(campaign, monkeypatch):
+    campaign.quest_log.add_quest("The Lost Amulet", "Find it", "gold")
+    campaign.quest_log.update_progress("The Lost Amulet", increment=10)
+    campaign.extractor.sync(quest_log=campaign.quest_log)
+
+    offered = _play(campaign, monkeypatch, 'You have completed "The Lost Amulet".')
+
+    assert offered == []
+    assert campaign.quest_log.get_active_quest_by_name("The Lost Amulet") is None
+    assert len(_quest_docs(campaign, "The Lost Amulet")) == 1
+
+
+def test_abandoned_quest_is_not_offered_again(campaign, monkeypatch):
+    campaign.quest_log.add_quest("The Lost Amulet", "Find it", "gold")
+    campaign.extractor.sync(quest_log=campaign.quest_log)
+    campaign.quest_log.abandon_all_quests()
+
+    offered = _play(campaign, monkeypatch, 'The elder asks you to take on the quest "The Lost Amulet" again.')
+
+    assert offered == []
+    assert campaign.quest_log.quest_status("The Lost Amulet") == "abandoned"
+
+
+def test_completed_event_completes_an_active_quest(campaign, monkeypatch):
+    campaign.quest_log.add_quest("The Lost Amulet", "Find it", "gold")
+    campaign.extractor.sync(quest_log=campaign.quest_log)
+
+    offered = _play(campaign, monkeypatch, 'You have completed "The Lost Amulet".')
+
+    assert offered == []
+    assert campaign.quest_log.quest_status("The Lost Amulet") == "completed"
+    assert "The Lost Amulet" in campaign.quest_log.get_rewards_context()
+
+
+def test_new_quest_is_offered_once(campaign, monkeypatch):
+    reply = 'The elder asks you to recover the quest "The Sunken Bell".'
+    assert _play(campaign, monkeypatch, reply) == ["The Sunken Bell"]
+    assert campaign.quest_log.quest_status("The Sunken Bell") == "active"
+
+    # Mentioned again while active: progressed, not offered
+    assert _play(campaign, monkeypatch, 'You search for "The Sunken Bell" near the docks.') == []
+    assert campaign.quest_log.get_active_quest_by_name("The Sunken Bell")["progress_status"] == 2
+
+
+def test_unsure_extraction_falls_back_to_the_llm_analyzer(campaign, monkeypatch):
+    from llm import interaction_analyzer
+
+    analysis = {"npcs": [], "quests": [{"quest_name": "Rat Cellar", "event_type": "started", "description": "Clear it"}]}
+    prompts = []
+    monkeypatch.setattr(interaction_analyzer, "generate_response",
+                        lambda prompt, model=None: prompts.append(prompt) or json.dumps(analysis))
+
+    # Quest talk the extractor cannot resolve to a name
+    offered = _play(campaign, monkeypatch, "The innkeeper mentions a bounty on the rats in her cellar.")
+
+    assert len(prompts) == 1
+    assert offered == ["Rat Cellar"]
+    # ...and the extractor learned the name for next time
+    data, _ = campaign.extractor.extract("", "Back to the Rat Cellar.")
+    assert [q["quest_name"] for q in data["quests"]] == ["Rat Cellar"]
@@ -0,0 +1,74 @@
+"""
+A failed TurnUnitOfWork flush on the local store: a transactional flush
+leaves no batch applied, in memory or in the persisted op log.
+"""
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from memory.local_store import LocalMongoClient
+from memory.unit_of_work import TurnUnitOfWork
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = LocalMongoClient(path=str(tmp_path))
+    yield client
+    client.close()
+
+
+def _queue_turn(uow, db, existing_reward_id):
+    """A quest insert and update, then a reward insert that collides with an existing _id."""
+    quest_id = uow.insert_one(db["quests"], {"quest_name": "The Lost Amulet", "progress_status": 1})
+    uow.update_one(db["quests"], {"_id": quest_id}, {"$set": {"progress_status": 10}})
+    uow.update_many(db["quests"], {"quest_name": "Rats in the Cellar"}, {"$set": {"abandoned": True}})
+    uow.insert_one(db["rewards"], {"_id": existing_reward_id, "reward": "gold"})
+
+
+def test_failed_transactional_flush_rolls_back_every_batch(client, tmp_path):
+    db = client["game"]
+    db["quests"].insert_one({"quest_name": "Rats in the Cellar", "abandoned": False})
+    reward_id = db["rewards"].insert_one({"reward": "ale"}).inserted_id
+
+    uow = TurnUnitOfWork(client=client, transactional=True)
+    _queue_turn(uow, db, reward_id)
+    with pytest.raises(DuplicateKeyError):
+        uow.flush()
+
+    assert db["quests"].count_documents({}) == 1
+    assert db["quests"].find_one({})["abandoned"] is False
+    assert db["rewards"].count_documents({}) == 1
+    assert uow.flush() == 0  # nothing left queued
+
+    client.close()
+    reopened = LocalMongoClient(path=str(tmp_path))["game"]
+    assert [q["quest_name"] for q in reopened["quests"].find({})] == ["Rats in the Cellar"]
+    assert reopened["quests"].find_one({})["abandoned"] is False
+
+
+def test_failed_batch_is_all_or_nothing_without_a_transaction(client):
+    db = client["game"]
+    existing = db["quests"].insert_one({"quest_name": "Rats in the Cellar"}).inserted_id
+
+    uow = TurnUnitOfWork()
+    uow.insert_one(db["quests"], {"quest_name": "The Lost Amulet"})
+    uow.update_one(db["quests"], {"_id": existing}, {"$set": {"progress_status": 5}})
+    uow.insert_one(db["quests"], {"_id": existing, "quest_name": "duplicate"})
+    with pytest.raises(DuplicateKeyError):
+        uow.flush()
+
+    assert [q["quest_name"] for q in db["quests"].find({})] == ["Rats in the Cellar"]
+    assert "progress_status" not in db["quests"].find_one({"_id": existing})
+
+
+def test_transactional_flush_persists_on_success(client, tmp_path):
+    db = client["game"]
+    with TurnUnitOfWork(client=client, transactional=True) as uow:
+        quest_id = uow.insert_one(db["quests"], {"quest_name": "The Lost Amulet", "progress_status": 1})
+        uow.update_one(db["quests"], {"_id": quest_id}, {"$set": {"progress_status": 10}})
+        uow.insert_one(db["rewards"], {"reward": "gold"})
+
+    assert uow.round_trips == 2
+    client.close()
+    reopened = LocalMongoClient(path=str(tmp_path))["game"]
+    assert reopened["quests"].find_one({"_id": quest_id})["progress_status"] == 10
+    assert reopened["rewards"].count_documents({}) == 1
@@ -0,0 +1,55 @@
+"""
+RingVectorIndex once the window wraps: eviction of the oldest entries and
+oldest-first ordering across the wrap point.
+"""
+import numpy as np
+
+from memory.vector_store import RingVectorIndex
+
+
+def _unit(i, dim=8):
+    vector = np.zeros(dim, dtype="float32")
+    vector[i % dim] = 1.0
+    return vector
+
+
+def _filled(capacity, count):
+    index = RingVectorIndex(capacity)
+    for i in range(count):
+        index.add(_unit(i), f"turn {i}")
+    return index
+
+
+def test_add_evicts_the_oldest_entry_once_full():
+    index = _filled(4, 6)
+
+    assert len(index) == 4
+    assert index.get(0) is None and index.get(1) is None
+    assert index.get_vector(1) is None
+    assert [index.get(i) for i in range(2, 6)] == ["turn 2", "turn 3", "turn 4", "turn 5"]
+
+
+def test_payloads_and_vectors_stay_oldest_first_across_the_wrap():
+    index = _filled(4, 6)
+
+    assert index.payloads() == ["turn 2", "turn 3", "turn 4", "turn 5"]
+    np.testing.assert_array_equal(index.vectors(), np.stack([_unit(i) for i in range(2, 6)]))
+
+
+def test_search_returns_live_ids_only():
+    index = _filled(4, 6)
+
+    # turn 1 (evicted) and turn 5 share a direction; only the live one may come back
+    hits = index.search(_unit(5), top_k=4)
+    assert hits[0][0] == 5 and hits[0][2] == "turn 5"
+    assert {entry_id for entry_id, _, _ in hits} == {2, 3, 4, 5}
+
+
+def test_load_keeps_the_newest_capacity_entries_and_continues_the_ring():
+    vectors = np.stack([_unit(i) for i in range(6)])
+    index = RingVectorIndex(4)
+    index.load(vectors, [f"turn {i}" for i in range(6)])
+
+    assert index.payloads() == ["turn 2", "turn 3", "turn 4", "turn 5"]
+    assert index.add(_unit(6), "turn 6") == 4
+    assert index.payloads() == ["turn 3", "turn 4", "turn 5", "turn 6"]
@@ -0,0 +1,285 @@
+"""
+Turn metrics: per-stage latency histograms plus prompt/response sizes and
+Mongo round-trips, with a pluggable exporter.
+
+TurnEngine fills one TurnRecord per turn (stages may finish on the
+write-behind thread) and hands it to `Metrics.record_turn` once the turn's
+last write has been flushed. Histograms use fixed, Prometheus-style
+cumulative buckets, so they cost O(buckets) memory however long the process
+runs. Exporters:
+
+- "jsonl": one JSON line per turn (every stage duration and size) appended
+  to METRICS_PATH, for offline analysis and regression hunting.
+- "prometheus": a text-format endpoint at http://METRICS_HOST:METRICS_PORT/metrics.
+- "none": histograms are still kept in memory (`Metrics.snapshot()`).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.config import METRICS_EXPORTER, METRICS_PATH, METRICS_HOST, METRICS_PORT
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHARS_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+PREFIX = "dnd_"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (thread-safe)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None when empty)."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank, seen = q * self.count, 0
+            for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+                seen += n
+                if seen >= rank:
+                    return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            return {"count": self.count, "sum": self.sum, "buckets": dict(zip(self.buckets, self.counts))}
+
+
+class TurnRecord:
+    """Durations and sizes collected during one turn."""
+
+    def __init__(self, campaign_id=None):
+        self.campaign_id = campaign_id
+        self.started = time.time()
+        self.stages = {}  # stage -> seconds
+        self.values = {}  # e.g. prompt_chars -> 1834
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, name, value):
+        with self._lock:
+            self.values[name] = value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "ts": self.started,
+                "campaign_id": self.campaign_id,
+                "stages_ms": {name: round(s * 1000, 3) for name, s in self.stages.items()},
+                **self.values,
+            }
+
+
+class Metrics:
+    """Histogram registry for turns; `exporter` (optional) receives every finished TurnRecord."""
+
+    def __init__(self, exporter=None):
+        self.stages = {}  # stage -> Histogram of seconds
+        self.sizes = {
+            "prompt_chars": Histogram(CHARS_BUCKETS),
+            "response_chars": Histogram(CHARS_BUCKETS),
+            "mongo_round_trips": Histogram(COUNT_BUCKETS),
+        }
+        self.turns = 0
+        self.failed_turns = 0
+        self._lock = threading.Lock()
+        self.exporter = exporter
+        if exporter is not None:
+            exporter.start(self)
+
+    def _stage(self, name):
+        with self._lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = Histogram(SECONDS_BUCKETS)
+            return histogram
+
+    def record_turn(self, record, failed=False):
+        for name, seconds in record.stages.items():
+            self._stage(name).observe(seconds)
+        for name, histogram in self.sizes.items():
+            if name in record.values:
+                histogram.observe(record.values[name])
+        with self._lock:
+            self.turns += 1
+            self.failed_turns += failed
+        if self.exporter is not None:
+            try:
+                self.exporter.export_turn(record)
+            except Exception as e:
+                print(f"⚠️ Metrics export failed: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            stages = dict(self.stages)
+            turns, failed = self.turns, self.failed_turns
+        return {
+            "turns": turns,
+            "failed_turns": failed,
+            "stages": {name: h.snapshot() for name, h in stages.items()},
+            **{name: h.snapshot() for name, h in self.sizes.items()},
+        }
+
+    def render_prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, h, labels=""):
+            snap = h.snapshot()
+            cumulative = 0
+            for bound, n in snap["buckets"].items():
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {snap["count"]}')
+            braces = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{braces} {snap['sum']:.6f}")
+            lines.append(f"{name}_count{braces} {snap['count']}")
+
+        with self._lock:
+            stages = sorted(self.stages.items())
+            turns, failed = self.turns, self.failed_turns
+        lines += [f"# TYPE {PREFIX}turns_total counter", f"{PREFIX}turns_total {turns}",
+                  f"# TYPE {PREFIX}failed_turns_total counter", f"{PREFIX}failed_turns_total {failed}",
+                  f"# TYPE {PREFIX}turn_stage_seconds histogram"]
+        for stage, h in stages:
+            histogram(f"{PREFIX}turn_stage_seconds", h, f'stage="{stage}",')
+        for name, h in self.sizes.items():
+            lines.append(f"# TYPE {PREFIX}turn_{name} histogram")
+            histogram(f"{PREFIX}turn_{name}", h)
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+# --- exporters ---
+class MetricsExporter:
+    """Exporter interface: `start` once with the registry, `export_turn` per finished turn."""
+
+    def start(self, metrics):
+        pass
+
+    def export_turn(self, record):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonLinesExporter(MetricsExporter):
+    """Appends one JSON object per turn to `path`."""
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export_turn(self, record):
+        line = json.dumps(record.to_dict())
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class PrometheusExporter(MetricsExporter):
+    """Serves `Metrics.render_prometheus()` at /metrics from a daemon thread."""
+
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self, metrics):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics at http://{self.host}:{self.port}/metrics")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def create_exporter(name=METRICS_EXPORTER):
+    if name in ("", "none"):
+        return None
+    if name == "jsonl":
+        return JsonLinesExporter()
+    if name == "prometheus":
+        return PrometheusExporter()
+    raise ValueError(f"Unknown METRICS_EXPORTER '{name}' (expected 'none', 'jsonl' or 'prometheus')")
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Process-wide registry, created (with the configured exporter) on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics(create_exporter())
+    return _metrics
+
+
+def set_metrics(metrics):
+    global _metrics
+    with _metrics_lock:
+        _metrics = metrics
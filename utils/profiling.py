@@ -0,0 +1,45 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Records how long each startup stage takes (and on which thread), so
+    `--profile-startup` can show where import and init time goes.
+    Disabled profilers still run the wrapped code, they just record nothing.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.t0 = time.perf_counter()
+        self._records = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(label, start, time.perf_counter())
+
+    def mark(self, label):
+        """Record an instant (e.g. 'prompt ready')."""
+        now = time.perf_counter()
+        self._record(label, now, now)
+
+    def _record(self, label, start, end):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._records.append((label, threading.current_thread().name, start - self.t0, end - start))
+
+    def report(self):
+        """Return a human-readable table of recorded stages, in start order."""
+        with self._lock:
+            records = sorted(self._records, key=lambda r: r[2])
+        lines = [f"{'stage':<40} {'thread':<18} {'start (s)':>10} {'took (s)':>10}", "-" * 81]
+        for label, thread, start, took in records:
+            lines.append(f"{label:<40} {thread:<18} {start:>10.3f} {took:>10.3f}")
+        return "\n".join(lines)
@@ -1,18 +1,18 @@
+import atexit
 import os
+from types import SimpleNamespace
 from dotenv import load_dotenv
 import streamlit as st
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from interface.cli import get_player_input, display_output
-from memory.persistent import PersistentMemory
-from memory.character_memory import CharacterMemory
-from memory.quest_log import QuestLog
-from memory.npc_and_quest_parser import parse_llm_output
-from memory.summarizer import summarize_for_memory
-from memory.embeddings import embed_text
-from llm.story_engine import generate_response
-from llm.prompt_builder import build_prompt
+from memory.session_manager import SessionManager
+from memory.storage import check_campaign_id
+from memory.embeddings import warm_up, flush_embedding_cache
+from llm.context_assembler import ContextAssembler
+from llm.turn_engine import TurnEngine
+from utils.config import STORAGE_BACKEND, DEFAULT_CAMPAIGN
+from utils.metrics import get_metrics
 
 # ---- Load environment variables ----
 load_dotenv()
@@ -28,15 +28,35 @@ def get_secret(key: str):
 # ---- Secrets ----
 EMBEDDING_BACKEND = get_secret("EMBEDDING_BACKEND")
 GEMINI_API_KEY = get_secret("GEMINI_API_KEY")
-MONGODB_PASSWORD = get_secret("MONGODB_PASSWORD")
-
-# ---- Initialize memories and quest log ----
-persistent_mem = PersistentMemory()
-character_mem = CharacterMemory()
-quest_log = QuestLog()
+if STORAGE_BACKEND == "mongo":
+    MONGODB_PASSWORD = get_secret("MONGODB_PASSWORD")
 
 # ---- Streamlit UI ----
 st.set_page_config(page_title="Dungeons N Destiny", layout="wide")
+
+
+@st.cache_resource(show_spinner=False)
+def get_resources():
+    """
+    Process-wide game resources, built on the first run and reused by every
+    rerun and browser session: per-campaign memories and quest logs (hot
+    campaigns stay loaded), the context assembler and turn metrics. Only
+    per-session UI state lives in st.session_state.
+    """
+    # Load the encoder in the background while Mongo data loads
+    warm_up(background=True)
+    manager = SessionManager()
+    metrics = get_metrics()
+    # atexit runs these last-registered first: campaigns, metrics, then the embedding cache
+    atexit.register(flush_embedding_cache)
+    atexit.register(metrics.close)
+    atexit.register(manager.close)
+    return SimpleNamespace(manager=manager, assembler=ContextAssembler(), metrics=metrics)
+
+
+resources = get_resources()
+manager = resources.manager
+
 st.title("🛡️ Dungeons N Destiny: The Shattered Crown")
 st.markdown("Type your actions below. The AI Dungeon Master will respond to your adventure!")
 
@@ -47,6 +67,13 @@ if "quests" not in st.session_state:
     st.session_state.quests = []
 if "npc_history" not in st.session_state:
     st.session_state.npc_history = {}
+if "campaign_id" not in st.session_state:
+    # ?campaign=<id> picks a campaign; otherwise every browser session plays CAMPAIGN_ID
+    try:
+        st.session_state.campaign_id = check_campaign_id(st.query_params.get("campaign") or DEFAULT_CAMPAIGN)
+    except ValueError as e:
+        st.error(f"{e}. Campaign ids may only use letters, digits, '-' and '_' (at most 64).")
+        st.stop()
 
 # ---- Layout columns ----
 col1, col2 = st.columns([3, 2])
@@ -55,86 +82,37 @@ col1, col2 = st.columns([3, 2])
 with col1:
     player_input = st.text_input("Your action:", key="player_input")
     submit = st.button("Submit")
+    dm_stream = st.empty()
 
 # ---- Handle player input ----
 if submit and player_input:
-
-    # Detect NPC interaction
-    npc_name = None
-    if "talk to" in player_input.lower():
-        npc_name = player_input.split("talk to")[-1].strip().title()
-
-    # Working memory: last 5 summaries
-    working_context = "\n".join(persistent_mem.get_recent_memories(5))
-    retrieved_context = "\n".join(persistent_mem.retrieve(player_input, top_k=500))
-
-    # Include NPC previous interactions
-    if npc_name:
-        npc_history = "\n".join(character_mem.get_memory(npc_name))
-        if npc_history:
-            retrieved_context += f"\nPrevious {npc_name} Interactions:\n{npc_history}"
-            st.session_state.npc_history[npc_name] = npc_history
-
-    # Quest context for prompt
-    active_quests = quest_log.get_active_quests()
-    quest_context_text = ""
-    if active_quests:
-        quest_context_text = "\n".join([
-            f"- {q['quest_name']} (Progress: {q['progress_status']}/10)\n  Summary: {q.get('progress_summary', q['summary'])}"
-            for q in active_quests
-        ])
-        st.session_state.quests = active_quests
-
-    # Rewards context
-    reward_context = quest_log.get_rewards_context()
-
-    # Build prompt
-    prompt = build_prompt(
-        working_context + f"\nActive Quests:\n{quest_context_text}",
-        retrieved_context,
-        player_input,
-        reward_context=reward_context
-    )
-
-    # Generate DM response
-    response = generate_response(prompt)
-    dm_text, npcs, quests = parse_llm_output(response)
-
-    # ---- Update chat and memories ----
+    def render(chunks):
+        """Stream the DM narrative into the placeholder, then clear it."""
+        shown = ""
+        for chunk in chunks:
+            shown += chunk
+            dm_stream.markdown(f"**DM:** {shown}▌")
+        dm_stream.empty()
+
+    # One turn at a time per campaign; other players' campaigns are unaffected
+    with manager.session(st.session_state.campaign_id) as campaign, campaign.lock:
+        # Persist inline so the turn is stored before the page reruns
+        turn = TurnEngine(
+            campaign, assembler=resources.assembler, metrics=resources.metrics, write_behind=False
+        ).play(player_input, render=render)
+        active_quests = campaign.quest_log.get_active_quests()
+
+    # ---- Update chat, quest and NPC panels ----
     st.session_state.history.append(f"**You:** {player_input}")
-    st.session_state.history.append(f"**DM:** {dm_text}")  # Only DM text
-
-    # Update NPC memory
-    for npc in npcs:
-        character_mem.add_interaction(npc["npc_name"], npc["context"])
-        if npc["npc_name"] in st.session_state.npc_history:
-            st.session_state.npc_history[npc["npc_name"]] += f"\n{npc['context']}"
-        else:
-            st.session_state.npc_history[npc["npc_name"]] = npc["context"]
-
-    # Update quest memory
-    for quest in quests:
-        quest_name = quest["quest_name"]
-        is_mandatory = quest.get("mandatory", False)
-
-        if quest_log.get_active_quest_by_name(quest_name) is None:
-            quest_log.add_quest(
-                quest_name=quest_name,
-                summary=quest["description"],
-                reward=quest.get("reward", "unknown reward"),
-                mandatory=is_mandatory
-            )
+    st.session_state.history.append(f"**DM:** {turn.dm_text}")  # Only DM text
+    if turn.npc_history:
+        st.session_state.npc_history[turn.npc_name] = "\n".join(turn.npc_history)
+    for npc_name, context in turn.interactions:
+        if npc_name in st.session_state.npc_history:
+            st.session_state.npc_history[npc_name] += f"\n{context}"
         else:
-            quest_log.update_progress(
-                quest_name,
-                increment=1,
-                new_summary=quest["description"]
-            )
-
-    # Summarize and persist DM text
-    summary = summarize_for_memory(dm_text)
-    summary_emb = embed_text(summary)
-    persistent_mem.add_memory(summary, summary_emb)
+            st.session_state.npc_history[npc_name] = context
+    st.session_state.quests = active_quests
 
 # ---- Display chat in left column (below input) ----
 with col1: